@@ -1,5 +1,7 @@
+import time
 from fastapi import APIRouter
 from app.dtos.actions import ResolveActionIn, ResolveActionOut, TimelineItem
+from app.infra.metrics import STAGE_SECONDS
 from app.managers.action_manager import ActionManager
 from app.managers.narration_manager import NarrationManager
 
@@ -8,9 +10,16 @@ am = ActionManager()                                                      # Unit
 nm = NarrationManager()
 
 @router.post("/resolve", response_model=ResolveActionOut)
-def resolve_action(inp: ResolveActionIn):
-    pb = am.build_playbook(inp.actionId)
-    narration = nm.build_lines(inp.actionId, pb["timeline"])
+async def resolve_action(inp: ResolveActionIn):
+    t0 = time.perf_counter()
+    with STAGE_SECONDS.labels("actions", "graph").time():
+        pb = await am.build_playbook(inp.actionId)
+    with STAGE_SECONDS.labels("actions", "narration").time():
+        narration = nm.build_lines(inp.actionId, pb["timeline"])
+    if inp.with_audio:
+        with STAGE_SECONDS.labels("actions", "audio").time():
+            narration = await nm.attach_audio(narration)
+    STAGE_SECONDS.labels("actions", "total").observe(time.perf_counter() - t0)
     return ResolveActionOut(
         actionId=inp.actionId,
         timeline=[TimelineItem(**x) for x in pb["timeline"]],
@@ -1,28 +1,67 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Query
-from tempfile import NamedTemporaryFile
-import shutil
-from app.managers.document_ingest_pg import ingest_pdf_to_pg
+from app.config.settings import settings
+from app.dtos.docs import IngestJobAccepted, IngestJobOut
+from app.managers.ingest_job_manager import ingest_jobs
+import asyncio
+import os
+import uuid
 
 router = APIRouter(prefix="/docs", tags=["docs"])
 
-@router.post("/ingest-pdf")
-def ingest_pdf(
+@router.post("/ingest-pdf", status_code=202, response_model=IngestJobAccepted)
+async def ingest_pdf(
     file: UploadFile = File(...),
     model_id: str | None = Query(None),
     model_name: str | None = Query(None),
     subject: str | None = Query(None),
+    doc_key: str | None = Query(None, description="Re-ingests with the same key replace the document; default: the filename within model_id"),
 ):
+    """
+    Queue a PDF for background ingest and return a job id immediately.
+    Poll GET /docs/jobs/{job_id} for progress.
+    """
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(400, "Only PDF supported.")
 
-    with NamedTemporaryFile(delete=True, suffix=".pdf") as tmp:
-        shutil.copyfileobj(file.file, tmp)
-        tmp.flush()
-        res = ingest_pdf_to_pg(
-            tmp.name,
-            title=file.filename,
-            subject=subject,
-            model_id=model_id,
-            model_name=model_name,
+    # stream the upload to the spool dir chunk by chunk; workers read it from there
+    path = ingest_jobs.spool_path()
+    try:
+        with open(path, "wb") as out:
+            while chunk := await file.read(settings.INGEST_UPLOAD_CHUNK_BYTES):
+                await asyncio.to_thread(out.write, chunk)
+        job_id = await ingest_jobs.submit(
+            path,
+            file.filename,
+            {"model_id": model_id, "model_name": model_name, "subject": subject, "doc_key": doc_key},
         )
-    return res
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+    return IngestJobAccepted(
+        job_id=job_id,
+        status="queued",
+        status_url=f"/docs/jobs/{job_id}",
+    )
+
+@router.get("/jobs/{job_id}", response_model=IngestJobOut)
+async def ingest_job_status(job_id: str):
+    job = await ingest_jobs.status(job_id) if _is_job_id(job_id) else None
+    if job is None:
+        raise HTTPException(404, "Unknown job.")
+    return IngestJobOut(**job)
+
+@router.post("/jobs/{job_id}/cancel", response_model=IngestJobOut)
+async def cancel_ingest_job(job_id: str):
+    if not _is_job_id(job_id) or await ingest_jobs.cancel(job_id) is None:
+        raise HTTPException(404, "Unknown job.")
+    return IngestJobOut(**(await ingest_jobs.status(job_id)))
+
+def _is_job_id(job_id: str) -> bool:
+    # ingest_job.id is a uuid: anything else is unknown, not a database error
+    try:
+        uuid.UUID(job_id)
+    except ValueError:
+        return False
+    return True
@@ -1,76 +1,210 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from app.config.settings import settings
 from app.dtos.qa import (
     AskAboutPartIn, 
     AskAboutPartOut, 
+    AskBatchIn,
+    AskBatchOut,
+    AskBatchResult,
     FindPartByFunctionIn, 
     FindPartByFunctionOut,
     AskAboutPartAudioIn,
-    AskAboutPartAudioOut
+    AskAboutPartAudioOut,
+    AudioIngressStats,
 )
 from app.managers.graph_manager import GraphManager
-from app.managers.rag_manager import ask_hybrid
-from app.clients.openai_client import client
-import base64, io
+from app.managers.rag_manager import ask_hybrid, ask_hybrid_batch, exhausted_answer
+from app.managers.speech_manager import transcribe_upload, open_cached, open_synthesized
+from app.infra.circuit_breaker import CircuitOpenError
+from app.infra import usage
+import base64
 
 router = APIRouter(prefix="/qa", tags=["qa"])
 graph = GraphManager()
 
 @router.post("/ask-about-part", response_model=AskAboutPartOut)
-def ask_about_part(inp: AskAboutPartIn):
+async def ask_about_part(inp: AskAboutPartIn):
     # Hybrid: pgvector + Neo4j
-    answer = ask_hybrid(
+    res = await ask_hybrid(
         question=inp.user_question,
         model_id=inp.model_id,
         model_name=inp.model_name,
         part_name=inp.part_name,
-        scene=None  # optional: pass scene from Unity later
+        scene=inp.scene,
     )
-    return AskAboutPartOut(response_text=answer)
+    return AskAboutPartOut(
+        response_text=res["answer"],
+        dropped_stages=res["dropped_stages"],
+        context=res.get("context"),
+        budget=res.get("budget"),
+    )
+
+@router.post("/ask-batch", response_model=AskBatchOut)
+async def ask_batch(inp: AskBatchIn):
+    """
+    Several questions about one model in one call (e.g. a guided tour's
+    "did you know" answers). Retrieval is shared across the batch; a
+    question that fails gets `error` instead of failing the others.
+    """
+    if not inp.questions:
+        raise HTTPException(400, "Provide at least one question.")
+    if len(inp.questions) > settings.QA_BATCH_MAX_QUESTIONS:
+        raise HTTPException(413, f"At most {settings.QA_BATCH_MAX_QUESTIONS} questions per batch.")
+
+    results = await ask_hybrid_batch(
+        [(q.user_question, q.part_name or inp.part_name) for q in inp.questions],
+        model_id=inp.model_id,
+        model_name=inp.model_name,
+        scene=inp.scene,
+    )
+    return AskBatchOut(results=[
+        AskBatchResult(index=i, error=res["error"]) if "error" in res else AskBatchResult(
+            index=i,
+            response_text=res["answer"],
+            dropped_stages=res["dropped_stages"],
+            context=res.get("context"),
+            budget=res.get("budget"),
+        )
+        for i, res in enumerate(results)
+    ])
 
 @router.post("/find-part-by-function", response_model=FindPartByFunctionOut)
-def find_part_by_function(inp: FindPartByFunctionIn):
-    part = graph.find_part_by_function(inp.user_question)
+async def find_part_by_function(inp: FindPartByFunctionIn):
+    part = await graph.find_part_by_function(inp.user_question)
     return FindPartByFunctionOut(part_name_to_highlight=part or "")
 
 @router.post("/ask-about-part-audio", response_model=AskAboutPartAudioOut)
-def ask_about_part_audio(inp: AskAboutPartAudioIn):
+async def ask_about_part_audio(inp: AskAboutPartAudioIn):
+    mode = usage.budget_mode()
+    if mode == usage.CACHED_ONLY:
+        return await _audio_reply(exhausted_answer(), None)
     try:
-        user_q = transcribe_audio(inp.audio_data)
+        audio_bytes = base64.b64decode(inp.audio_data)
+        user_q, stats = await transcribe_upload(audio_bytes, filename="audio.wav")
+    except CircuitOpenError:
+        raise  # 503 from the app-level handler
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Audio transcription failed: {e}")
 
-    text_response = ask_about_part(
+    return await _answer_audio(
         AskAboutPartIn(
             model_id=inp.model_id,
             model_name=inp.model_name,
-            part_name=inp.part_name, 
+            part_name=inp.part_name,
             scene=inp.scene,
             user_question=user_q,
-        )
-    ).response_text
+        ),
+        stats,
+        mode,
+    )
 
+@router.post("/ask-about-part-audio-raw", response_model=AskAboutPartAudioOut)
+async def ask_about_part_audio_raw(
+    request: Request,
+    model_id: str | None = Query(None),
+    model_name: str | None = Query(None),
+    part_name: str | None = Query(None),
+    scene: str | None = Query(None),
+):
+    """
+    Compact audio ingress, no base64. Either:
+      - raw body (Content-Type audio/ogg, audio/opus, audio/flac, audio/wav)
+        with context in the query string, or
+      - multipart/form-data with a `file` part and optional
+        model_id/model_name/part_name/scene form fields.
+    """
     try:
-        audio_reply = text_to_speech(text_response)
-    except Exception:
-        audio_reply = None
+        declared = int(request.headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPException(400, "Invalid Content-Length header.")
+    if declared > settings.AUDIO_MAX_UPLOAD_BYTES:
+        raise HTTPException(413, "Audio payload too large.")
+
+    content_type = request.headers.get("content-type", "")
+    filename = None
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(400, "Multipart body needs a 'file' part.")
+        data = await upload.read()
+        content_type, filename = upload.content_type, upload.filename
+        model_id = _form_text(form, "model_id") or model_id
+        model_name = _form_text(form, "model_name") or model_name
+        part_name = _form_text(form, "part_name") or part_name
+        scene = _form_text(form, "scene") or scene
+    else:
+        data = await request.body()
+
+    if not data:
+        raise HTTPException(400, "Empty audio payload.")
+    if len(data) > settings.AUDIO_MAX_UPLOAD_BYTES:
+        raise HTTPException(413, "Audio payload too large.")
+
+    mode = usage.budget_mode()
+    if mode == usage.CACHED_ONLY:
+        return await _audio_reply(exhausted_answer(), None)
+    try:
+        user_q, stats = await transcribe_upload(data, content_type, filename)
+    except CircuitOpenError:
+        raise  # 503 from the app-level handler
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Audio transcription failed: {e}")
+
+    return await _answer_audio(
+        AskAboutPartIn(
+            model_id=model_id,
+            model_name=model_name,
+            part_name=part_name,
+            scene=scene,
+            user_question=user_q,
+        ),
+        stats,
+        mode,
+    )
 
-    return AskAboutPartAudioOut(response_text=text_response, audio_reply=audio_reply)
+def _form_text(form, name: str) -> str | None:
+    # a file part under a context field's name is ignored, not used as text
+    value = form.get(name)
+    return value if isinstance(value, str) else None
 
-def transcribe_audio(base64_audio_data: str) -> str:
-    audio_bytes = base64.b64decode(base64_audio_data)
-    audio_file = io.BytesIO(audio_bytes)
-    audio_file.name = "audio.wav"
-    transcription = client.audio.transcriptions.create(
-        model="whisper-1",
-        file=audio_file
+async def _answer_audio(inp: AskAboutPartIn, stats: dict, mode: str) -> AskAboutPartAudioOut:
+    res = await ask_hybrid(
+        question=inp.user_question,
+        model_id=inp.model_id,
+        model_name=inp.model_name,
+        part_name=inp.part_name,
+        scene=inp.scene,
+        budget=mode,  # already checked (and counted) before Whisper
     )
-    return transcription.text
-
-def text_to_speech(text: str) -> str:
-    response = client.audio.speech.create(
-        model="tts-1",
-        voice="nova",
-        input=text,
-        response_format="wav"
+    return await _audio_reply(res, stats)
+
+async def _audio_reply(res: dict, stats: dict | None) -> AskAboutPartAudioOut:
+    # over budget the audio routes answer before Whisper: no transcript, no stats,
+    # and audio only if the clip is already cached
+    try:
+        audio_key, audio_reply = await _synthesize_base64(
+            res["answer"], cached_only=res.get("budget") == usage.CACHED_ONLY
+        )
+    except Exception:
+        audio_key, audio_reply = None, None
+
+    return AskAboutPartAudioOut(
+        response_text=res["answer"],
+        audio_reply=audio_reply,
+        audio_key=audio_key,
+        audio_stats=AudioIngressStats(**stats) if stats else None,
+        dropped_stages=res["dropped_stages"],
+        context=res.get("context"),
+        budget=res.get("budget"),
     )
-    return base64.b64encode(response.content).decode("utf-8")
+
+async def _synthesize_base64(text: str, cached_only: bool = False) -> tuple[str | None, str | None]:
+    if cached_only:
+        async with open_cached(text) as hit:
+            if hit is None:
+                return None, None
+            key, audio = hit
+            return key, base64.b64encode(audio).decode("utf-8")
+    async with open_synthesized(text) as (key, audio):
+        return key, base64.b64encode(audio).decode("utf-8")
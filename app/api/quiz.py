@@ -1,12 +1,15 @@
 from fastapi import APIRouter, HTTPException
 from app.dtos.quiz import GenerateQuizIn, GenerateQuizOut, MCQ
 from app.managers.quiz_manager import QuizManager
+from app.infra import usage
+from app.infra.circuit_breaker import CircuitOpenError
+from app.clients.openai_client import UpstreamRateLimited
 
 router = APIRouter(prefix="/quiz", tags=["quiz"])
 qm = QuizManager()
 
 @router.post("/generate", response_model=GenerateQuizOut)
-def generate_quiz(inp: GenerateQuizIn):
+async def generate_quiz(inp: GenerateQuizIn):
     """
     Generates MCQs strictly from the model-scoped graph context.
     No persistence; returns JSON for Unity to render.
@@ -14,14 +17,18 @@ def generate_quiz(inp: GenerateQuizIn):
     if not inp.model_id and not inp.model_name:
         raise HTTPException(400, "Provide either model_id or model_name")
 
+    mode = usage.budget_mode()
     try:
-        qs = qm.generate_quiz(
+        qs = await qm.generate_quiz(
             model_id=inp.model_id,
             model_name=inp.model_name,
             num_questions=inp.num_questions,
             difficulty=inp.difficulty,
             include_parts=inp.include_parts,
+            budget=mode,
         )
+    except (UpstreamRateLimited, CircuitOpenError):
+        raise  # mapped to 429 / 503 by the app-level handlers
     except Exception as e:
         # Surface a clean error up; logs can capture more detail if needed
         raise HTTPException(500, f"Quiz generation failed: {e}")
@@ -31,4 +38,5 @@ def generate_quiz(inp: GenerateQuizIn):
         model_name=inp.model_name,
         difficulty=inp.difficulty,
         questions=[MCQ(**x) for x in qs],
+        budget=None if mode == usage.OK else mode,
     )
@@ -0,0 +1,22 @@
+# app/api/tts.py
+
+import re
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from app.config.settings import settings
+from app.infra.tts_cache import tts_cache
+
+router = APIRouter(prefix="/tts", tags=["tts"])
+
+_KEY_RE = re.compile(r"[0-9a-f]{64}")
+
+
+@router.get("/{key}")
+async def get_tts_audio(key: str):
+    """Serve a cached TTS clip straight from disk (no base64, no re-synthesis)."""
+    if not _KEY_RE.fullmatch(key):
+        raise HTTPException(404, "Unknown audio key.")
+    path = tts_cache.get(key)
+    if path is None:
+        raise HTTPException(404, "Unknown audio key.")
+    return FileResponse(path, media_type=f"audio/{settings.TTS_FORMAT}")
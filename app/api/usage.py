@@ -0,0 +1,34 @@
+# app/api/usage.py
+
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.config.settings import settings
+from app.dtos.usage import UsageOut
+from app.infra.usage import budget_status
+from app.infra.usage_repository import query_usage
+
+router = APIRouter(tags=["usage"])
+
+
+@router.get("/usage", response_model=UsageOut)
+async def usage(
+    hours: float = Query(24.0, gt=0, le=24 * 90),
+    group_by: Literal["endpoint", "tenant", "model_id", "upstream_model", "kind", "request_id"] = "endpoint",
+    endpoint: Optional[str] = None,
+    tenant: Optional[str] = None,
+    model_id: Optional[str] = None,
+    request_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Upstream tokens and estimated cost from the usage log, plus budget standing."""
+    if not settings.USAGE_LOG_ENABLED:
+        raise HTTPException(status_code=404, detail="Usage log is disabled (USAGE_LOG_ENABLED).")
+    rows = await query_usage(
+        hours * 3600,
+        group_by,
+        {"endpoint": endpoint, "tenant": tenant, "model_id": model_id, "request_id": request_id},
+        limit,
+    )
+    return UsageOut(hours=hours, group_by=group_by, rows=rows, budgets=budget_status())
@@ -0,0 +1,199 @@
+# app/api/voice.py
+
+import asyncio
+import json
+import uuid
+from contextlib import AsyncExitStack
+from typing import Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from app.config.settings import settings
+from app.dtos.voice import VoiceSessionContext
+from app.managers.rag_manager import ask_hybrid, exhausted_answer
+from app.managers.speech_manager import transcribe_upload, open_synthesized
+from app.infra import usage
+
+router = APIRouter(prefix="/voice", tags=["voice"])
+
+
+class VoiceSession:
+    """
+    One voice session per headset connection.
+
+    Protocol (client -> server):
+      - text  {"type": "start", model_id, model_name, part_name, scene}
+      - text  {"type": "context", ...}    update any of the context fields
+      - bytes                             audio frames of the current utterance
+      - text  {"type": "end"}             utterance complete -> answer it
+      - text  {"type": "cancel"}          drop the in-flight reply
+
+    Protocol (server -> client):
+      - text  {"type": "ready", session_id}
+      - text  {"type": "transcript", text}
+      - text  {"type": "answer", text, dropped_stages}
+      - text  {"type": "audio_start", format, bytes, audio_key}
+      - bytes                             reply audio, VOICE_REPLY_CHUNK_BYTES each
+      - text  {"type": "audio_end"}
+      - text  {"type": "cancelled"} / {"type": "error", detail}
+
+    Barge-in: the first audio frame of a new utterance cancels whatever
+    reply is still being generated or streamed.
+    """
+
+    def __init__(self, ws: WebSocket):
+        self.ws = ws
+        self.session_id = str(uuid.uuid4())
+        self.ctx = VoiceSessionContext()
+        self.buf = bytearray()
+        self.turn: Optional[asyncio.Task] = None
+        self._send_lock = asyncio.Lock()
+
+    # ---------- sending ----------
+
+    async def send_json(self, payload: dict) -> None:
+        async with self._send_lock:
+            await self.ws.send_text(json.dumps(payload))
+
+    async def send_bytes(self, data: bytes) -> None:
+        async with self._send_lock:
+            await self.ws.send_bytes(data)
+
+    # ---------- turn handling ----------
+
+    def _busy(self) -> bool:
+        return self.turn is not None and not self.turn.done()
+
+    async def cancel_turn(self) -> bool:
+        if not self._busy():
+            return False
+        self.turn.cancel()
+        try:
+            await self.turn
+        except asyncio.CancelledError:
+            pass
+        # cancellation propagates into the in-flight OpenAI/DB awaits
+        await self.send_json({"type": "cancelled"})
+        return True
+
+    async def _answer(self, audio: bytes, ctx: VoiceSessionContext) -> None:
+        res = await self._text_answer(audio, ctx)
+        if res is None:
+            return
+        answer = res["answer"]
+        await self.send_json({
+            "type": "answer",
+            "text": answer,
+            "dropped_stages": res["dropped_stages"],
+        })
+
+        stack = AsyncExitStack()
+        try:
+            key, reply = await stack.enter_async_context(open_synthesized(answer))
+        except Exception:
+            # text answer already delivered; audio is best-effort
+            return
+
+        step = settings.VOICE_REPLY_CHUNK_BYTES
+        async with stack:
+            await self.send_json({
+                "type": "audio_start",
+                "format": settings.TTS_FORMAT,
+                "bytes": len(reply),
+                "audio_key": key,
+            })
+            for off in range(0, len(reply), step):
+                await self.send_bytes(bytes(reply[off:off + step]))
+        await self.send_json({"type": "audio_end"})
+
+    async def _text_answer(self, audio: bytes, ctx: VoiceSessionContext) -> Optional[dict]:
+        mode = usage.budget_mode()
+        if mode == usage.CACHED_ONLY:
+            # no transcript, no cached answer to find: don't pay for Whisper
+            return exhausted_answer()
+        try:
+            # container is sniffed from the bytes, so WAV/OGG-Opus/FLAC all work
+            question, _ = await transcribe_upload(audio)
+        except Exception as e:
+            await self.send_json({"type": "error", "detail": f"Audio transcription failed: {e}"})
+            return None
+        await self.send_json({"type": "transcript", "text": question})
+
+        return await ask_hybrid(
+            question=question,
+            model_id=ctx.model_id,
+            model_name=ctx.model_name,
+            part_name=ctx.part_name,
+            scene=ctx.scene,
+            budget=mode,
+        )
+
+    async def _run_turn(self, audio: bytes, ctx: VoiceSessionContext) -> None:
+        try:
+            await self._answer(audio, ctx)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self.send_json({"type": "error", "detail": f"Voice turn failed: {e}"})
+
+    # ---------- inbound frames ----------
+
+    async def on_audio(self, data: bytes) -> None:
+        if not self.buf and self._busy():
+            await self.cancel_turn()  # barge-in
+        if len(self.buf) + len(data) > settings.VOICE_MAX_UTTERANCE_BYTES:
+            self.buf.clear()
+            await self.send_json({"type": "error", "detail": "Utterance too large."})
+            return
+        self.buf.extend(data)
+
+    async def on_message(self, msg: dict) -> None:
+        kind = msg.get("type")
+        if kind in ("start", "context"):
+            fields = {k: v for k, v in msg.items() if k != "type"}
+            merged = {**self.ctx.model_dump(), **fields} if kind == "context" else fields
+            try:
+                self.ctx = VoiceSessionContext.model_validate(merged)
+            except ValidationError as e:
+                await self.send_json({"type": "error", "detail": str(e)})
+                return
+            if kind == "start":
+                await self.send_json({"type": "ready", "session_id": self.session_id})
+        elif kind == "end":
+            if not self.buf:
+                await self.send_json({"type": "error", "detail": "Empty utterance."})
+                return
+            await self.cancel_turn()
+            audio, self.buf = bytes(self.buf), bytearray()
+            self.turn = asyncio.create_task(self._run_turn(audio, self.ctx))
+        elif kind == "cancel":
+            self.buf.clear()
+            await self.cancel_turn()
+        else:
+            await self.send_json({"type": "error", "detail": f"Unknown message type: {kind!r}"})
+
+
+@router.websocket("/session")
+async def voice_session(ws: WebSocket):
+    await ws.accept()
+    session = VoiceSession(ws)
+    try:
+        while True:
+            frame = await ws.receive()
+            if frame["type"] == "websocket.disconnect":
+                break
+            if frame.get("bytes") is not None:
+                await session.on_audio(frame["bytes"])
+            elif frame.get("text") is not None:
+                try:
+                    msg = json.loads(frame["text"])
+                except ValueError:
+                    await session.send_json({"type": "error", "detail": "Invalid JSON."})
+                    continue
+                await session.on_message(msg if isinstance(msg, dict) else {})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if session.turn is not None and not session.turn.done():
+            session.turn.cancel()
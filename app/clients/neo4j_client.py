@@ -1,40 +1,126 @@
 # app/clients/neo4j_client.py
 
+import asyncio
 import os
-from neo4j import GraphDatabase
+import time
 from app.config.settings import settings
+from app.infra import slow_queries
+from app.infra.circuit_breaker import breakers
+from app.infra.metrics import NEO4J_SECONDS, NEO4J_SESSIONS, UPSTREAM_ERRORS
+from app.infra.tracing import approx_size, sanitize, span, statement
 
-class Neo4jClient:
-    def __init__(self):
-        uri = settings.NEO4J_URI
-        user = settings.NEO4J_USERNAME
-        password = settings.NEO4J_PASSWORD
+_neo4j = None  # the driver package, imported on first use (~0.25 s)
 
-        if not uri:
-            raise ValueError("NEO4J_URI is not set")
-        if not user or not password:
-            raise ValueError("NEO4J_USERNAME/NEO4J_PASSWORD not set")
 
-        # For Aura:
-        # - use neo4j+s:// (or bolt+s://) in NEO4J_URI
-        # - encryption is implied by the scheme
-        self._driver = GraphDatabase.driver(uri, auth=(user, password))
+def _load_driver_package():
+    global _neo4j
+    if _neo4j is None:
+        import neo4j
+        import neo4j.exceptions
+        _neo4j = neo4j
+    return _neo4j
 
+
+class Neo4jClient:
+    """
+    The driver is created on first use (or by warm_up() from the app
+    lifespan), not at import, so cold start doesn't wait for it and the
+    app still boots without Neo4j settings.
+    """
+
+    def __init__(self):
+        self._driver = None
+        self._init_lock = asyncio.Lock()
         # Optional: if you use multi-db, add NEO4J_DATABASE to settings
         self._database = os.getenv("NEO4J_DATABASE") or None
 
-    def run(self, cypher: str, params: dict | None = None):
+    async def warm_up(self):
+        """Import the driver package and create the driver; returns the driver."""
+        if self._driver is not None:
+            return self._driver
+        async with self._init_lock:
+            if self._driver is None:
+                uri = settings.NEO4J_URI
+                user = settings.NEO4J_USERNAME
+                password = settings.NEO4J_PASSWORD
+
+                if not uri:
+                    raise ValueError("NEO4J_URI is not set")
+                if not user or not password:
+                    raise ValueError("NEO4J_USERNAME/NEO4J_PASSWORD not set")
+
+                neo4j = await asyncio.to_thread(_load_driver_package)
+                # For Aura:
+                # - use neo4j+s:// (or bolt+s://) in NEO4J_URI
+                # - encryption is implied by the scheme
+                # Async driver: queries don't hold a worker thread while waiting on Aura.
+                self._driver = neo4j.AsyncGraphDatabase.driver(uri, auth=(user, password))
+        return self._driver
+
+    @property
+    def errors(self) -> tuple:
+        """Exception types callers should treat as "graph unavailable"."""
+        if _neo4j is None:
+            return (OSError,)  # no driver yet, so no driver errors either
+        return (_neo4j.exceptions.Neo4jError, _neo4j.exceptions.ServiceUnavailable, OSError)
+
+    def _is_outage(self, e: BaseException) -> bool:
+        # failures that say "Neo4j is unreachable", as opposed to a bad query
+        if isinstance(e, OSError):
+            return True
+        return _neo4j is not None and isinstance(
+            e, (_neo4j.exceptions.ServiceUnavailable, _neo4j.exceptions.SessionExpired)
+        )
+
+    async def run(self, cypher: str, params: dict | None = None, query: str = "adhoc"):
+        """
+        `query` labels the neo4j_query_seconds / upstream_errors_total series.
+        Raises CircuitOpenError (a ConnectionError) at once while Neo4j is marked down.
+        """
+        breaker = breakers["neo4j"]
+        breaker.check()
+        driver = await self.warm_up()
         params = params or {}
-        # Always open short-lived sessions; Aura likes that.
-        if self._database:
-            with self._driver.session(database=self._database) as session:
-                return list(session.run(cypher, params))
-        else:
-            with self._driver.session() as session:
-                return list(session.run(cypher, params))
-
-    def close(self):
-        self._driver.close()
+        with span(f"neo4j.{query}", **{"db.system": "neo4j"}) as sp:
+            if sp.sampled:
+                sp.set("db.statement", statement(cypher))
+                sp.set("db.params", sanitize(params))
+            t0 = time.perf_counter()
+            NEO4J_SESSIONS.inc()
+            try:
+                # Always open short-lived sessions; Aura likes that.
+                async with driver.session(database=self._database) as session:
+                    result = await session.run(cypher, params)
+                    records = [record async for record in result]
+            except Exception as e:
+                UPSTREAM_ERRORS.labels("neo4j", query).inc()
+                if self._is_outage(e):
+                    breaker.record_failure(e)
+                else:
+                    breaker.record_success()
+                raise
+            finally:
+                NEO4J_SESSIONS.dec()
+                elapsed = time.perf_counter() - t0
+                NEO4J_SECONDS.labels(query).observe(elapsed)
+            breaker.record_success()
+            if sp.sampled:
+                sp.set("db.rows", len(records))
+                sp.set("db.response_bytes", approx_size(records))
+            if slow_queries.is_slow(elapsed):
+                slow_queries.record_cypher(driver, self._database, query, cypher, params,
+                                           elapsed, len(records))
+            return records
+
+    async def ping(self) -> None:
+        """Connectivity check that bypasses the breaker (health probes)."""
+        driver = await self.warm_up()
+        await driver.verify_connectivity()
+
+    async def close(self):
+        if self._driver is not None:
+            await self._driver.close()
+            self._driver = None
 
 
 neo4j_client = Neo4jClient()
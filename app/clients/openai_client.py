@@ -1,10 +1,421 @@
-# This client will be used by all managers to connect to OpenAI , basically creates a langchain client (OK POOKIE ?)
+# app/clients/openai_client.py
+"""
+One gateway for every OpenAI call (chat, embeddings, Whisper, TTS).
+
+- a single pooled HTTP/2 keep-alive transport shared by all call types
+- per-model request/token budgets that follow the x-ratelimit-* response headers
+- a priority gate so interactive traffic (QA, audio) is admitted before
+  standard (quiz, narration) and background (ingest) work; background work
+  also leaves OPENAI_INTERACTIVE_RESERVE of the rate limit untouched
+- retries with full jitter on 429/5xx/connection errors, honoring Retry-After
+- fails fast with CircuitOpenError while the "openai" circuit breaker is open
+- every successful call is metered (tokens, audio seconds, TTS characters,
+  estimated cost) into app/infra/usage.py, attributed to the current request
+- nothing is built at import: the SDK (a large import) is loaded in a worker
+  thread and the HTTP client created on first use, or by warm_up() from the
+  app lifespan, so cold start doesn't pay for it
+
+Usage:
+    completion = await gateway.chat(messages, priority=Priority.INTERACTIVE)
+    vectors = await gateway.embed(texts, priority=Priority.BACKGROUND)
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import re
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
 
-from langchain_openai import ChatOpenAI
-from openai import OpenAI
 from app.config.settings import settings
+from app.infra.metrics import (
+    OPENAI_IN_FLIGHT,
+    OPENAI_QUEUE_WAIT_SECONDS,
+    OPENAI_REQUEST_SECONDS,
+    OPENAI_REQUESTS,
+    OPENAI_RETRIES,
+    OPENAI_WAITING,
+)
+from app.infra import usage
+from app.infra.circuit_breaker import breakers
+from app.infra.tracing import span
+
+if TYPE_CHECKING:
+    import httpx
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # QA, voice, audio
+    STANDARD = 1     # quiz, narration
+    BACKGROUND = 2   # ingest, quiz-bank / offline jobs
+
+
+# ---------- rate-limit budget (per model) ----------
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _parse_reset(value: Optional[str]) -> Optional[float]:
+    """OpenAI reset headers look like '20ms', '1s', '6m0s'."""
+    if not value:
+        return None
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(n) * _UNIT_SECONDS[u] for n, u in parts)
+
+
+def _int_header(headers: "httpx.Headers", name: str) -> Optional[int]:
+    try:
+        return int(headers[name])
+    except (KeyError, ValueError):
+        return None
+
+
+class _RateBudget:
+    """
+    Token-bucket view of one model's rate limit. Headers from each response
+    overwrite the local estimate; between responses we decrement locally.
+    """
+
+    def __init__(self):
+        self.limit_requests: Optional[int] = None
+        self.limit_tokens: Optional[int] = None
+        self.remaining_requests: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+        self.requests_reset_at = 0.0
+        self.tokens_reset_at = 0.0
+
+    def update(self, headers: "httpx.Headers") -> None:
+        now = time.monotonic()
+        self.limit_requests = _int_header(headers, "x-ratelimit-limit-requests") or self.limit_requests
+        self.limit_tokens = _int_header(headers, "x-ratelimit-limit-tokens") or self.limit_tokens
+        rr = _int_header(headers, "x-ratelimit-remaining-requests")
+        rt = _int_header(headers, "x-ratelimit-remaining-tokens")
+        if rr is not None:
+            self.remaining_requests = rr
+            self.requests_reset_at = now + (_parse_reset(headers.get("x-ratelimit-reset-requests")) or 1.0)
+        if rt is not None:
+            self.remaining_tokens = rt
+            self.tokens_reset_at = now + (_parse_reset(headers.get("x-ratelimit-reset-tokens")) or 1.0)
+
+    def _wait_for(self, est_tokens: int, priority: Priority) -> float:
+        """Seconds to wait before this call fits in the budget (0 = go now)."""
+        now = time.monotonic()
+        reserve = settings.OPENAI_INTERACTIVE_RESERVE if priority > Priority.INTERACTIVE else 0.0
+        wait = 0.0
+        if self.remaining_requests is not None and now < self.requests_reset_at:
+            floor = reserve * (self.limit_requests or 0)
+            if self.remaining_requests - 1 < floor:
+                wait = max(wait, self.requests_reset_at - now)
+        if self.remaining_tokens is not None and now < self.tokens_reset_at:
+            floor = reserve * (self.limit_tokens or 0)
+            if self.remaining_tokens - est_tokens < floor:
+                wait = max(wait, self.tokens_reset_at - now)
+        return wait
+
+    async def acquire(self, est_tokens: int, priority: Priority) -> None:
+        while True:
+            wait = self._wait_for(est_tokens, priority)
+            if wait <= 0:
+                break
+            await asyncio.sleep(min(wait, 1.0))
+        if self.remaining_requests is not None:
+            self.remaining_requests -= 1
+        if self.remaining_tokens is not None:
+            self.remaining_tokens -= est_tokens
+
+
+# ---------- priority admission ----------
+
+class _PriorityGate:
+    """At most `slots` upstream calls in flight; waiters are admitted by priority, then FIFO."""
+
+    def __init__(self, slots: int):
+        self._free = slots
+        self._waiters: List[Any] = []
+        self._seq = itertools.count()
+
+    def _release(self) -> None:
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._free += 1
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority):
+        t0 = time.perf_counter()
+        if self._free > 0 and not self._waiters:
+            self._free -= 1
+        else:
+            fut = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (int(priority), next(self._seq), fut))
+            OPENAI_WAITING.inc()
+            try:
+                await fut
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    self._release()  # slot was granted as we got cancelled
+                raise
+            finally:
+                OPENAI_WAITING.dec()
+        OPENAI_QUEUE_WAIT_SECONDS.labels(priority.name.lower()).observe(time.perf_counter() - t0)
+        OPENAI_IN_FLIGHT.inc()
+        try:
+            yield
+        finally:
+            OPENAI_IN_FLIGHT.dec()
+            self._release()
+
+
+# ---------- the gateway ----------
+
+class UpstreamRateLimited(Exception):
+    """429s from OpenAI outlasted our retries; the API maps this to a 429 for the client."""
+
+    def __init__(self, retry_after: str):
+        super().__init__("Upstream model is rate limited")
+        self.retry_after = retry_after
+
+
+_openai = None  # the SDK module, see _load_sdk()
+
+
+def _load_sdk():
+    global _openai
+    if _openai is None:
+        import openai
+        _openai = openai
+    return _openai
+
+
+def _estimate_tokens(*texts: str) -> int:
+    # ~4 chars/token is close enough; the rate-limit headers correct us
+    return max(1, sum(len(t) for t in texts) // 4)
+
+
+class OpenAIGateway:
+    def __init__(self):
+        self._budgets: Dict[str, _RateBudget] = {}
+        self._gate = _PriorityGate(settings.OPENAI_MAX_IN_FLIGHT)
+        self._breaker = breakers["openai"]
+        self._http = None
+        self._client = None
+        self._init_lock = asyncio.Lock()
+
+    async def warm_up(self):
+        """Import the SDK and build the shared client; returns the AsyncOpenAI client."""
+        if self._client is not None:
+            return self._client
+        async with self._init_lock:
+            if self._client is None:
+                # ~0.5 s of imports: keep them off the event loop
+                openai = await asyncio.to_thread(_load_sdk)
+                import httpx
+
+                self._http = httpx.AsyncClient(
+                    http2=True,
+                    limits=httpx.Limits(
+                        max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                        max_keepalive_connections=settings.OPENAI_MAX_CONNECTIONS,
+                        keepalive_expiry=settings.OPENAI_KEEPALIVE_S,
+                    ),
+                    timeout=httpx.Timeout(settings.OPENAI_TIMEOUT_S, connect=5.0),
+                )
+                # retries are ours (priority- and budget-aware), not the SDK's
+                self._client = openai.AsyncOpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    base_url=settings.OPENAI_BASE_URL,
+                    http_client=self._http,
+                    max_retries=0,
+                )
+        return self._client
+
+    def _budget(self, model: str) -> _RateBudget:
+        if model not in self._budgets:
+            self._budgets[model] = _RateBudget()
+        return self._budgets[model]
+
+    async def _call(
+        self,
+        kind: str,
+        model: str,
+        est_tokens: int,
+        priority: Priority,
+        fn: Callable[[], Awaitable[Any]],
+        meter: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """
+        fn performs one `with_raw_response` SDK call; we read the rate-limit
+        headers off it and return the parsed result. meter: usage counts the
+        response doesn't carry (TTS characters, audio seconds).
+        """
+        self._breaker.check()
+        await self.warm_up()
+        sdk = _openai
+        retryable = (
+            sdk.RateLimitError,
+            sdk.InternalServerError,
+            sdk.APIConnectionError,  # includes APITimeoutError
+        )
+        budget = self._budget(model)
+        latency = OPENAI_REQUEST_SECONDS.labels(kind, model)
+        attempt = 0
+        with span(f"openai.{kind}", model=model, priority=priority.name.lower(), est_tokens=est_tokens) as sp:
+            while True:
+                try:
+                    # rate budget first: a call parked on it must not hold a slot
+                    # that an interactive call could use
+                    await budget.acquire(est_tokens, priority)
+                    async with self._gate.slot(priority):
+                        with latency.time():
+                            raw = await fn()
+                    budget.update(raw.headers)
+                    OPENAI_REQUESTS.labels(kind, model, "ok").inc()
+                    self._breaker.record_success()
+                    res = raw.parse()
+                    counts = self._metered(res, meter)
+                    cost = usage.record(kind, model, **counts)
+                    if sp.sampled:
+                        sp.set("attempts", attempt + 1)
+                        sp.set("response_bytes", raw.http_response.num_bytes_downloaded)
+                        sp.set("usage", counts)
+                        sp.set("cost_usd", round(cost, 6))
+                    return res
+                except retryable as e:
+                    response = getattr(e, "response", None)
+                    if response is not None:
+                        budget.update(response.headers)
+                    if attempt >= settings.OPENAI_MAX_RETRIES:
+                        OPENAI_REQUESTS.labels(kind, model, "error").inc()
+                        sp.set("attempts", attempt + 1)
+                        if isinstance(e, sdk.RateLimitError):
+                            # up but busy: not an outage
+                            self._breaker.record_success()
+                            retry_after = response.headers.get("retry-after", "1") if response is not None else "1"
+                            raise UpstreamRateLimited(retry_after) from e
+                        self._breaker.record_failure(e)
+                        raise
+                    status = getattr(e, "status_code", None) or "conn"
+                    OPENAI_RETRIES.labels(kind, str(status)).inc()
+                    await asyncio.sleep(self._backoff(attempt, response))
+                    attempt += 1
+                except sdk.APIError:
+                    OPENAI_REQUESTS.labels(kind, model, "error").inc()
+                    self._breaker.record_success()  # reachable; the request itself was bad
+                    raise
+
+    @staticmethod
+    def _metered(res: Any, meter: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Usage counts for usage.record(): the response's own, else what the caller measured."""
+        counts = dict(meter or {})
+        u = getattr(res, "usage", None)
+        if u is not None:
+            inp = getattr(u, "prompt_tokens", None) or getattr(u, "input_tokens", None)
+            out = getattr(u, "completion_tokens", None) or getattr(u, "output_tokens", None)
+            seconds = getattr(u, "seconds", None)  # duration-billed transcription
+            if inp:
+                counts["input_tokens"] = int(inp)
+            if out:
+                counts["output_tokens"] = int(out)
+            if seconds:
+                counts["audio_seconds"] = float(seconds)
+        return counts
+
+    @staticmethod
+    def _backoff(attempt: int, response: Optional["httpx.Response"]) -> float:
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after", ""))
+                return retry_after + random.uniform(0, 0.25)
+            except ValueError:
+                pass
+        cap = settings.OPENAI_BACKOFF_BASE_S * (2 ** attempt)
+        return random.uniform(0, min(cap, settings.OPENAI_BACKOFF_MAX_S))  # full jitter
+
+    # ---------- public API ----------
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        model: Optional[str] = None,
+        temperature: float = 0.2,
+        response_format: Optional[Dict[str, str]] = None,
+        priority: Priority = Priority.INTERACTIVE,
+    ):
+        """Returns the SDK ChatCompletion."""
+        model = model or settings.LLM_MODEL
+        est = _estimate_tokens(*(m["content"] for m in messages)) + 512
+        kwargs: Dict[str, Any] = {"model": model, "temperature": temperature, "messages": messages}
+        if response_format:
+            kwargs["response_format"] = response_format
+        return await self._call(
+            "chat", model, est, priority,
+            lambda: self._client.chat.completions.with_raw_response.create(**kwargs),
+        )
+
+    async def embed(
+        self,
+        texts: List[str],
+        *,
+        model: Optional[str] = None,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> List[List[float]]:
+        model = model or settings.EMBEDDING_MODEL
+        res = await self._call(
+            "embeddings", model, _estimate_tokens(*texts), priority,
+            lambda: self._client.embeddings.with_raw_response.create(model=model, input=texts),
+        )
+        return [d.embedding for d in res.data]
+
+    async def transcribe(
+        self,
+        file,
+        *,
+        priority: Priority = Priority.INTERACTIVE,
+        audio_seconds: Optional[float] = None,
+    ) -> str:
+        """audio_seconds (when the caller decoded the clip) meters Whisper if the response doesn't."""
+        model = settings.WHISPER_MODEL
+
+        def go():
+            file.seek(0)  # the same buffer is re-sent on retry
+            return self._client.audio.transcriptions.with_raw_response.create(model=model, file=file)
+
+        meter = {"audio_seconds": audio_seconds} if audio_seconds else None
+        res = await self._call("transcription", model, 1, priority, go, meter)
+        return res.text
+
+    async def speech(self, text: str, *, priority: Priority = Priority.INTERACTIVE) -> bytes:
+        model = settings.TTS_MODEL
+        res = await self._call(
+            "speech", model, _estimate_tokens(text), priority,
+            lambda: self._client.audio.speech.with_raw_response.create(
+                model=model,
+                voice=settings.TTS_VOICE,
+                input=text,
+                response_format=settings.TTS_FORMAT,
+            ),
+            {"characters": len(text)},
+        )
+        return res.content
+
+    async def ping(self) -> None:
+        """Cheap authenticated call (model list) that bypasses the gate and breaker (health probes)."""
+        client = await self.warm_up()
+        await client.models.list()
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = self._client = None
 
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2, api_key=settings.OPENAI_API_KEY)
 
-# This new client gives us direct access to Whisper and TTS APIs
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+gateway = OpenAIGateway()
@@ -1,12 +1,21 @@
 # app/clients/postgres_client.py
+import time
 import psycopg
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
 from app.config.settings import settings
+from app.infra import slow_queries
+from app.infra.circuit_breaker import breakers
+from app.infra.metrics import POSTGRES_CONNECTIONS, POSTGRES_SECONDS, UPSTREAM_ERRORS
+from app.infra.tracing import sanitize, span, statement
 
-@contextmanager
-def get_conn():
+# label of the get_conn()/get_async_conn() block the cursor runs in
+_query: ContextVar[str] = ContextVar("pg_query", default="other")
+
+
+def _conninfo() -> dict:
     """
-    Get a Postgres connection.
+    Connection arguments for psycopg.
 
     Prefers SUPABASE_DB_URL (e.g. transaction pooler DSN).
     Falls back to PG_HOST/... for local development.
@@ -19,23 +28,185 @@ def get_conn():
             joiner = "&" if "?" in dsn else "?"
             dsn = f"{dsn}{joiner}sslmode=require"
 
-        conn = psycopg.connect(dsn, autocommit=False)
+        return {"conninfo": dsn}
+
+    # Local dev Postgres
+    return {
+        "host": settings.PG_HOST,
+        "port": settings.PG_PORT,
+        "dbname": settings.PG_DATABASE,
+        "user": settings.PG_USER,
+        "password": settings.PG_PASSWORD,
+    }
+
+
+# ---------- traced cursors ----------
+
+def _text(query, conn) -> str:
+    if isinstance(query, str):
+        return query
+    if isinstance(query, bytes):
+        return query.decode("utf-8", "replace")
+    return query.as_string(conn)  # sql.Composed
+
+
+def _result_bytes(cur) -> int | None:
+    """Exact size of the result set, skipped for very large results."""
+    res = cur.pgresult
+    if res is None or res.ntuples * res.nfields > 10_000:
+        return None
+    return sum(res.get_length(r, c) for r in range(res.ntuples) for c in range(res.nfields))
+
+
+def _describe(sp, cur, query, params) -> None:
+    if sp.sampled:
+        sp.set("db.operation", _query.get())
+        sp.set("db.statement", statement(_text(query, cur.connection)))
+        sp.set("db.params", sanitize(params))
+
+
+def _annotate(sp, cur) -> None:
+    if sp.sampled:
+        sp.set("db.rows", cur.rowcount)
+        sp.set("db.response_bytes", _result_bytes(cur))
+
+
+class _TracedCursor(psycopg.Cursor):
+    """One span per statement; statements over SLOW_QUERY_MS go to the slow-query log."""
+
+    def execute(self, query, params=None, **kwargs):
+        with span("postgres.execute", **{"db.system": "postgresql"}) as sp:
+            _describe(sp, self, query, params)
+            t0 = time.perf_counter()
+            super().execute(query, params, **kwargs)
+            elapsed = time.perf_counter() - t0
+            _annotate(sp, self)
+        if slow_queries.is_slow(elapsed):
+            text = _text(query, self.connection)
+            plan = slow_queries.sql_plan(self.connection, text, params)
+            slow_queries.record("postgres", _query.get(), text, params, elapsed, self.rowcount, plan)
+        return self
+
+    def executemany(self, query, params_seq, **kwargs):
+        params_seq = list(params_seq)
+        with span("postgres.executemany", **{"db.system": "postgresql"}) as sp:
+            _describe(sp, self, query, params_seq[:1])
+            sp.set("db.batch_size", len(params_seq))
+            t0 = time.perf_counter()
+            super().executemany(query, params_seq, **kwargs)
+            elapsed = time.perf_counter() - t0
+            sp.set("db.rows", self.rowcount)
+        if slow_queries.is_slow(elapsed):
+            text = _text(query, self.connection)
+            slow_queries.record("postgres", _query.get(), text, params_seq[:1], elapsed, self.rowcount)
+
+
+class _AsyncTracedCursor(psycopg.AsyncCursor):
+    async def execute(self, query, params=None, **kwargs):
+        with span("postgres.execute", **{"db.system": "postgresql"}) as sp:
+            _describe(sp, self, query, params)
+            t0 = time.perf_counter()
+            await super().execute(query, params, **kwargs)
+            elapsed = time.perf_counter() - t0
+            _annotate(sp, self)
+        if slow_queries.is_slow(elapsed):
+            text = _text(query, self.connection)
+            plan = await slow_queries.sql_plan_async(self.connection, text, params)
+            slow_queries.record("postgres", _query.get(), text, params, elapsed, self.rowcount, plan)
+        return self
+
+
+# ---------- connections ----------
+
+_breaker = breakers["postgres"]
+# connection refused/lost, server shutting down, statement timeouts
+_INFRA_ERRORS = (psycopg.OperationalError, OSError)
+
+
+def _outcome(error: BaseException | None = None) -> None:
+    if isinstance(error, _INFRA_ERRORS):
+        _breaker.record_failure(error)
     else:
-        # Local dev Postgres
-        conn = psycopg.connect(
-            host=settings.PG_HOST,
-            port=settings.PG_PORT,
-            dbname=settings.PG_DATABASE,
-            user=settings.PG_USER,
-            password=settings.PG_PASSWORD,
-            autocommit=False,
-        )
+        _breaker.record_success()
+
+
+async def ping() -> None:
+    """SELECT 1 on a fresh connection, bypassing the breaker (health probes)."""
+    conn = await psycopg.AsyncConnection.connect(**_conninfo(), autocommit=True)
+    try:
+        await conn.execute("SELECT 1")
+    finally:
+        await conn.close()
+
+
+@contextmanager
+def get_conn(query: str = "other"):
+    """
+    Get a Postgres connection (blocking; used by the ingest pipeline).
+    Commits on success, rolls back on error.
+    `query` labels the postgres_query_seconds / upstream_errors_total series.
+    Raises CircuitOpenError without connecting while Postgres is marked down.
+    """
+    _breaker.check()
+    t0 = time.perf_counter()
+    token = _query.set(query)
+    try:
+        with span(f"postgres.{query}", **{"db.system": "postgresql"}):
+            try:
+                conn = psycopg.connect(**_conninfo(), autocommit=False, cursor_factory=_TracedCursor)
+            except Exception as e:
+                UPSTREAM_ERRORS.labels("postgres", query).inc()
+                _outcome(e)
+                raise
+            gauge = POSTGRES_CONNECTIONS.labels("sync")
+            gauge.inc()
+            try:
+                yield conn
+                conn.commit()
+                _outcome()
+            except Exception as e:
+                UPSTREAM_ERRORS.labels("postgres", query).inc()
+                _outcome(e)
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+                gauge.dec()
+                POSTGRES_SECONDS.labels(query).observe(time.perf_counter() - t0)
+    finally:
+        _query.reset(token)
+
 
+@asynccontextmanager
+async def get_async_conn(query: str = "other"):
+    """Async twin of get_conn for request handlers."""
+    _breaker.check()
+    t0 = time.perf_counter()
+    token = _query.set(query)
     try:
-        yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
+        with span(f"postgres.{query}", **{"db.system": "postgresql"}):
+            try:
+                conn = await psycopg.AsyncConnection.connect(
+                    **_conninfo(), autocommit=False, cursor_factory=_AsyncTracedCursor
+                )
+            except Exception as e:
+                UPSTREAM_ERRORS.labels("postgres", query).inc()
+                _outcome(e)
+                raise
+            gauge = POSTGRES_CONNECTIONS.labels("async")
+            gauge.inc()
+            try:
+                yield conn
+                await conn.commit()
+                _outcome()
+            except Exception as e:
+                UPSTREAM_ERRORS.labels("postgres", query).inc()
+                _outcome(e)
+                await conn.rollback()
+                raise
+            finally:
+                await conn.close()
+                gauge.dec()
+                POSTGRES_SECONDS.labels(query).observe(time.perf_counter() - t0)
     finally:
-        conn.close()
+        _query.reset(token)
@@ -26,10 +26,185 @@ class Settings(BaseSettings):
     # IMPORTANT: match your pgvector schema (1536)
     EMBEDDING_MODEL: str = "text-embedding-3-small"
 
+    # Ingest embedding batches (packed across pages by tiktoken count)
+    EMBED_BATCH_MAX_TOKENS: int = 100_000  # API allows 300k tokens per request
+    EMBED_BATCH_MAX_INPUTS: int = 2048     # API max inputs per request
+    EMBED_CONCURRENCY: int = 4             # batches in flight per document
+
+    # Background ingest jobs (/docs/ingest-pdf)
+    INGEST_SPOOL_DIR: str = "./.ingest_spool"
+    INGEST_SPOOL_SWEEP_S: float = 300.0  # remove spool files of finished jobs (cancelled while queued, given up as stale)
+    INGEST_SPOOL_ORPHAN_S: float = 3600.0  # ... and of uploads that never became a job, once this old
+    INGEST_SPOOL_SHARED: bool = False    # INGEST_SPOOL_DIR is storage every app host mounts; else jobs stay on the uploading host
+    INGEST_WORKERS: int = 2
+    INGEST_POLL_S: float = 5.0           # idle workers re-check the jobs table
+    INGEST_HEARTBEAT_S: float = 2.0      # progress flush + cancel check
+    INGEST_JOB_STALE_S: float = 60.0     # heartbeat age after which a job is re-claimed
+    INGEST_JOB_MAX_ATTEMPTS: int = 3
+    INGEST_UPLOAD_CHUNK_BYTES: int = 1024 * 1024
+    INGEST_SAME_NAME_MIN_SIMILARITY: float = 0.3  # without doc_key: below this text similarity a same-named file is refused, not a revision
+
+    # PDF text extraction (process pool, see app/infra/pdf_extract.py)
+    PDF_EXTRACT_WORKERS: int = 0          # 0 = one per CPU
+    PDF_EXTRACT_PAGES_PER_TASK: int = 16  # page range handed to one worker call
+    PDF_EXTRACT_MIN_PAGES: int = 32       # smaller PDFs are extracted in-process
+
+    # Ingest chunking (app/infra/chunking.py), sizes in embedding tokens
+    CHUNK_MAX_TOKENS: int = 300
+    CHUNK_MIN_TOKENS: int = 150
+    CHUNK_OVERLAP_TOKENS: int = 40
+    CHUNK_SPAN_PAGES: bool = False  # let chunks run across page breaks
+
     MAX_CHUNKS: int = 8
     TOP_K_CHROMA: int = 6
     TOP_K_GRAPH: int = 6
 
+    # QA context packing between fusion and the prompt (app/infra/context_packer.py)
+    QA_CONTEXT_MAX_TOKENS: int = 1500       # all context blocks together, in LLM_MODEL tokens
+    QA_CONTEXT_MMR_LAMBDA: float = 0.7      # 1 = relevance only; lower favours diverse blocks
+    QA_CONTEXT_DUP_THRESHOLD: float = 0.8   # share of a block's token trigrams already picked that makes it a duplicate
+    QA_CONTEXT_MIN_BLOCK_TOKENS: int = 48   # a block truncated to fit must keep at least this much
+    QUIZ_CONTEXT_MAX_TOKENS: int = 3000     # graph snapshot in the quiz prompt, in LLM_MODEL tokens
+
+    # Re-ranking of dense hits (app/infra/rerank.py): over-fetch RERANK_CANDIDATES
+    # from ANN, re-score with exact cosine + meta boosts, keep TOP_K_CHROMA by MMR
+    RERANK_ENABLED: bool = True
+    RERANK_CANDIDATES: int = 40             # ANN rows fetched per question; ef_search is raised to match
+    RERANK_FETCH_EMBEDDINGS: bool = True    # fetch vectors for MMR (~6 KB/row at 1536-d); off = boosts only
+    RERANK_MMR_LAMBDA: float = 0.75         # 1 = relevance only; lower favours chunks unlike those picked
+    RERANK_PART_BOOST: float = 0.05         # added to the cosine when the chunk names the resolved part
+    RERANK_SCENE_BOOST: float = 0.03        # added when the chunk names the requested scene
+
+    # In-process vector tier (app/infra/vector_tier.py): ann_search for these
+    # models runs on a memory-mapped export of their chunks, shared by all
+    # workers on the host; every other model keeps going to pgvector
+    VECTOR_TIER_MODELS: list[str] = []      # e.g. ["jet-engine-v1"]; empty = off
+    VECTOR_TIER_DIR: str = "/dev/shm/ar-vectors"  # falls back to the temp dir where /dev/shm is missing
+    VECTOR_TIER_MAX_ROWS: int = 50_000      # a bigger model stays on pgvector (~6 KB/chunk at 1536-d)
+    VECTOR_TIER_MAX_AGE_S: float = 3600.0   # full re-export after this; picks up ingests made on other hosts
+    VECTOR_TIER_RETRY_S: float = 60.0       # pause after a failed export
+
+    # pgvector HNSW query tuning for ann_search (None = server default);
+    # see scripts/bench_retrieval.py for recall/latency trade-offs
+    ANN_EF_SEARCH: int | None = None        # hnsw.ef_search, pgvector default 40
+    ANN_ITERATIVE_SCAN: str | None = None   # hnsw.iterative_scan (pgvector >= 0.8): relaxed_order | strict_order
+
+    # Retrieval latency budget for ask_hybrid (ms). A stage that misses its
+    # deadline is dropped and the answer is built from the remaining hits.
+    QA_RETRIEVAL_BUDGET_MS: int = 2500
+    EMBED_DEADLINE_MS: int = 1200
+    ANN_DEADLINE_MS: int = 1000
+    GRAPH_DEADLINE_MS: int = 1500
+    # Hedged requests: fire a duplicate once a stage runs past its observed p95
+    HEDGE_ENABLED: bool = False
+    HEDGE_MIN_SAMPLES: int = 20       # p95 needs this many samples first
+    HEDGE_DEFAULT_DELAY_MS: int = 300  # used until then
+
+    # Batch QA (POST /qa/ask-batch): one embedding call, one ANN round trip and
+    # one graph fetch for all questions, then the answers concurrently
+    QA_BATCH_MAX_QUESTIONS: int = 20
+    QA_BATCH_CONCURRENCY: int = 4     # LLM calls in flight per batch
+
+    # OpenAI gateway (app/clients/openai_client.py)
+    OPENAI_BASE_URL: str | None = None    # e.g. the load-test fake server; None = api.openai.com
+    OPENAI_MAX_CONNECTIONS: int = 20      # shared HTTP/2 keep-alive pool
+    OPENAI_KEEPALIVE_S: float = 60.0
+    OPENAI_TIMEOUT_S: float = 60.0
+    OPENAI_MAX_IN_FLIGHT: int = 32        # admission slots, granted by priority
+    OPENAI_MAX_RETRIES: int = 3           # on 429 / 5xx / connection errors
+    OPENAI_BACKOFF_BASE_S: float = 0.5
+    OPENAI_BACKOFF_MAX_S: float = 8.0
+    OPENAI_INTERACTIVE_RESERVE: float = 0.2  # share of the rate limit non-interactive work leaves free
+
+    # Background health monitor (app/managers/health_monitor.py) and
+    # per-dependency circuit breakers (app/infra/circuit_breaker.py)
+    HEALTH_PROBE_INTERVAL_S: float = 15.0
+    HEALTH_PROBE_TIMEOUT_S: float = 3.0
+    HEALTH_PROBE_OPENAI: bool = True      # GET /models; off = judge OpenAI by real calls only
+    HEALTH_READY_DEPENDENCIES: list[str] = ["postgres", "openai"]  # Neo4j is optional for QA
+    CIRCUIT_FAILURE_THRESHOLD: int = 3    # consecutive failures that open a breaker
+    CIRCUIT_OPEN_S: float = 30.0          # fail-fast period before a trial call
+    CIRCUIT_TRIAL_TIMEOUT_S: float = 10.0 # a half-open trial without a verdict is retried after this
+
+    # Manager cache (app/infra/cache.py): embeddings, graph context, playbooks, quiz snapshots, answers
+    CACHE_BACKEND: str = "shm"        # shm (all workers on the host) | redis (all hosts) | memory (per worker: misses other workers' invalidations) | off
+    CACHE_MAX_BYTES: int = 256 * 1024 * 1024  # memory and shm backends
+    CACHE_SHM_DIR: str = "/dev/shm/ar-cache"  # falls back to the temp dir where /dev/shm is missing
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"  # "fakeredis://" = in-process stand-in (requirements-dev.txt)
+    CACHE_REDIS_TIMEOUT_S: float = 0.1
+    CACHE_KEY_PREFIX: str = "ar:v1:"  # redis keys; bump when a cached value's shape changes
+    CACHE_DEFAULT_TTL_S: float = 300.0
+    CACHE_TTL_S: dict[str, float] = {
+        "embedding": 86400.0,   # same model + text = same vector
+        "graph": 600.0,
+        "playbook": 600.0,
+        "quiz": 600.0,          # model snapshots from Neo4j
+        "quiz_generated": 86400.0,  # LLM quizzes, served when a budget is exhausted (~USAGE_BUDGET_WINDOW_S)
+        "qa": 300.0,            # answers; also dropped on every ingest
+    }
+    CACHE_LOCK_WAIT_S: float = 5.0    # how long a worker waits for another worker's fill of the same key
+
+    # Cold start (app/infra/startup.py)
+    STARTUP_WARM_UP: bool = True      # build the OpenAI/Neo4j clients in the background after startup
+
+    # Request tracing (app/infra/tracing.py): spans appended to TRACE_FILE as JSONL
+    TRACING_ENABLED: bool = False
+    TRACE_FILE: str = "./traces.jsonl"
+    TRACE_SAMPLE_RATE: float = 1.0    # share of new traces recorded; incoming traceparent decides otherwise
+    TRACE_FLUSH_S: float = 1.0
+    TRACE_MAX_ATTR_CHARS: int = 256   # string attributes / params are truncated to this
+
+    # Slow-query log (app/infra/slow_queries.py)
+    SLOW_QUERY_MS: float = 250.0      # 0 = off
+    SLOW_QUERY_LOG: str = "./slow_queries.jsonl"
+    SLOW_QUERY_PLAN: str = "explain"  # explain | profile (re-runs read-only statements) | off
+    SLOW_QUERY_PLAN_INTERVAL_S: float = 300.0  # per statement
+
+    # Speech (Whisper / TTS)
+    WHISPER_MODEL: str = "whisper-1"
+    TTS_MODEL: str = "tts-1"
+    TTS_VOICE: str = "nova"
+    TTS_FORMAT: str = "wav"
+
+    # Content-addressed TTS audio cache (shared by QA audio and narration)
+    TTS_CACHE_DIR: str = "./.tts_cache"
+    TTS_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+
+    # Audio ingress normalization before Whisper (see app/infra/audio.py)
+    AUDIO_MAX_UPLOAD_BYTES: int = 25 * 1024 * 1024  # Whisper upload limit
+    AUDIO_TARGET_SAMPLE_RATE: int = 16000
+    AUDIO_UPSTREAM_FORMAT: str = "ogg"  # "ogg" (Opus) or "flac"
+    AUDIO_VAD_THRESHOLD_DBFS: float = -45.0
+    AUDIO_VAD_FRAME_MS: int = 30
+    AUDIO_VAD_PAD_MS: int = 200
+
+    # Voice WebSocket sessions
+    VOICE_MAX_UTTERANCE_BYTES: int = 10 * 1024 * 1024
+    VOICE_REPLY_CHUNK_BYTES: int = 32 * 1024
+
+    # Token/cost accounting and budgets (app/infra/usage.py)
+    USAGE_LOG_ENABLED: bool = True          # write usage_event rows (GET /usage); off = metrics and per-process budgets only
+    USAGE_FLUSH_S: float = 5.0              # usage_event batch interval; budgets are refreshed at the same time
+    USAGE_MAX_PENDING: int = 10_000         # queued events while Postgres is unreachable; oldest dropped beyond this
+    USAGE_TENANT_HEADER: str = "x-tenant-id"  # "<tenant>.<hmac>", see usage.sign_tenant
+    USAGE_TENANT_SECRET: str = ""           # signs tenant header values; empty = header ignored, every request is "default"
+    # USD per model; keys: input_1m / output_1m (per 1M tokens), audio_minute, chars_1m (TTS)
+    USAGE_PRICES_USD: dict[str, dict[str, float]] = {
+        "gpt-4o-mini": {"input_1m": 0.15, "output_1m": 0.60},
+        "text-embedding-3-small": {"input_1m": 0.02},
+        "whisper-1": {"audio_minute": 0.006},
+        "tts-1": {"chars_1m": 15.0},
+    }
+    # USD per window, keyed "endpoint:<route template>", "tenant:<id>" or "tenant:*"
+    USAGE_BUDGETS_USD: dict[str, float] = {}
+    USAGE_BUDGET_WINDOW_S: float = 86400.0
+    USAGE_REAGGREGATE_S: float = 3600.0     # full re-read of the window's spend; flushes in between read new events only
+    USAGE_BUDGET_SOFT_RATIO: float = 0.8    # from this share of a budget: "reduced"; past it: "cached_only"
+    USAGE_REDUCED_CONTEXT_RATIO: float = 0.5  # "reduced": share of QA_CONTEXT_MAX_TOKENS / QUIZ_CONTEXT_MAX_TOKENS kept
+    USAGE_EXHAUSTED_ANSWER: str = (
+        "I can't look that up right now because the usage limit has been reached. Please try again later."
+    )
+
     class Config:
         env_file = ".env"
 
@@ -6,6 +6,7 @@ class ResolveActionIn(BaseModel):
     actionId: str
     level: Optional[str] = "beginner"
     mode: Optional[str] = "demo"
+    with_audio: bool = False  # attach cached TTS (audio_key/audio_url) to narration lines
 
 class TimelineItem(BaseModel):
     t: int
@@ -0,0 +1,22 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+
+class IngestJobAccepted(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+
+class IngestJobOut(BaseModel):
+    job_id: str
+    status: str                    # queued | running | done | failed | cancelled
+    filename: Optional[str] = None
+    params: Dict[str, Any] = {}
+    # pages_total, pages_parsed, chunks_total, chunks_embedded, rows_written
+    progress: Dict[str, int] = {}
+    result: Optional[Dict[str, Any]] = None   # ingest_pdf_to_pg output once done
+    error: Optional[str] = None
+    attempts: int = 0
+    cancel_requested: bool = False
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
@@ -7,8 +7,45 @@ class AskAboutPartIn(BaseModel):
     scene: str | None = None
     user_question: str
 
+class Citation(BaseModel):
+    id: str                        # "GRAPH", "DOC-1", ... as labelled in the prompt
+    chunk_ids: list[str]           # doc_chunk ids merged into this block
+    document_id: str | None = None
+    page: int | None = None
+    page_end: int | None = None
+
+class ContextStats(BaseModel):
+    tokens: int                    # context tokens sent to the LLM
+    tokens_saved: int              # vs. every retrieved chunk verbatim
+    citations: list[Citation] = []
+
 class AskAboutPartOut(BaseModel):
     response_text: str
+    dropped_stages: list[str] = []  # retrieval stages that missed their deadline
+    context: ContextStats | None = None
+    budget: str | None = None       # "reduced" / "cached_only" when a usage budget downgraded it
+
+class AskBatchItem(BaseModel):
+    user_question: str
+    part_name: str | None = None   # this question's part; default: the batch's part_name
+
+class AskBatchIn(BaseModel):
+    model_id: str | None = None
+    model_name: str | None = None
+    part_name: str | None = None
+    scene: str | None = None
+    questions: list[AskBatchItem]  # at most QA_BATCH_MAX_QUESTIONS
+
+class AskBatchResult(BaseModel):
+    index: int                     # position in AskBatchIn.questions
+    response_text: str | None = None
+    error: str | None = None       # set instead of response_text when this question failed
+    dropped_stages: list[str] = []
+    context: ContextStats | None = None
+    budget: str | None = None
+
+class AskBatchOut(BaseModel):
+    results: list[AskBatchResult]  # in input order
 
 class FindPartByFunctionIn(BaseModel):
     user_question: str
@@ -23,6 +60,18 @@ class AskAboutPartAudioIn(BaseModel):
     scene: str | None = None
     audio_data: str  # Base64 encoded WAV audio from Unity
 
+class AudioIngressStats(BaseModel):
+    bytes_in: int                  # payload as received from Unity
+    bytes_upstream: int            # payload actually sent to Whisper
+    seconds_in: float | None = None        # set when the audio could be decoded
+    seconds_upstream: float | None = None  # after silence trimming
+    transcribe_ms: float
+
 class AskAboutPartAudioOut(BaseModel):
     response_text: str
     audio_reply: str | None  # Base64 encoded WAV audio from OpenAI TTS
+    audio_key: str | None = None  # same audio, fetchable as GET /tts/{audio_key}
+    audio_stats: AudioIngressStats | None = None
+    dropped_stages: list[str] = []
+    context: ContextStats | None = None
+    budget: str | None = None
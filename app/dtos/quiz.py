@@ -22,3 +22,4 @@ class GenerateQuizOut(BaseModel):
     model_name: Optional[str] = None
     difficulty: str
     questions: List[MCQ]
+    budget: Optional[str] = None  # "reduced" / "cached_only" when a usage budget downgraded it
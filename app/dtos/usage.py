@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+from typing import List
+
+
+class UsageRow(BaseModel):
+    key: str                 # value of the group_by column
+    calls: int
+    input_tokens: int
+    output_tokens: int
+    audio_seconds: float
+    characters: int          # TTS input characters
+    cost_usd: float          # estimated from USAGE_PRICES_USD
+
+
+class BudgetStatus(BaseModel):
+    key: str                 # "endpoint:<route>" or "tenant:<id>"
+    limit_usd: float
+    spent_usd: float         # within USAGE_BUDGET_WINDOW_S
+    mode: str                # "ok" | "reduced" | "cached_only"
+
+
+class UsageOut(BaseModel):
+    hours: float
+    group_by: str
+    rows: List[UsageRow]
+    budgets: List[BudgetStatus] = []
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+
+class VoiceSessionContext(BaseModel):
+    """
+    Sent once as the first text frame of a voice session
+    ({"type": "start", ...}) and optionally again as {"type": "context", ...}
+    when the user selects another part or scene.
+    """
+    model_id: str | None = None
+    model_name: str | None = None
+    part_name: str | None = None
+    scene: str | None = None
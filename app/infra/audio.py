@@ -0,0 +1,153 @@
+# app/infra/audio.py
+"""
+Audio ingress normalization before Whisper.
+
+Unity may send WAV, OGG/Opus, OGG/Vorbis or FLAC. When soundfile (libsndfile)
+can decode the payload we:
+  1. downmix to mono,
+  2. resample to AUDIO_TARGET_SAMPLE_RATE (16 kHz is what Whisper uses anyway),
+  3. trim leading/trailing silence with a frame-energy voice-activity check,
+  4. re-encode compactly: OGG/Opus by default (AUDIO_UPSTREAM_FORMAT="ogg"),
+     or lossless 16-bit FLAC ("flac"); both are far smaller than WAV.
+If decoding is not possible the original bytes are forwarded untouched,
+named after the sniffed container so the API can still parse them.
+
+numpy and soundfile are imported on the first decode, not with the app.
+"""
+
+import io
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from app.config.settings import settings
+
+if TYPE_CHECKING:
+    import numpy as np
+
+sf = None
+_codecs_loaded = False
+
+
+def _load_codecs() -> None:
+    global np, sf, _codecs_loaded
+    if _codecs_loaded:
+        return
+    import numpy as np
+    try:
+        import soundfile as sf
+    except (ImportError, OSError):  # libsndfile missing on the host
+        sf = None
+    _codecs_loaded = True
+
+
+_EXT_BY_CONTENT_TYPE = {
+    "audio/wav": "wav",
+    "audio/x-wav": "wav",
+    "audio/wave": "wav",
+    "audio/ogg": "ogg",
+    "audio/opus": "ogg",
+    "audio/flac": "flac",
+    "audio/x-flac": "flac",
+    "audio/webm": "webm",
+    "audio/mpeg": "mp3",
+}
+
+
+def sniff_extension(data: bytes, content_type: Optional[str] = None, filename: Optional[str] = None) -> str:
+    """Best guess of the container: magic bytes first, then content type, then filename."""
+    head = data[:12]
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if content_type:
+        ext = _EXT_BY_CONTENT_TYPE.get(content_type.split(";")[0].strip().lower())
+        if ext:
+            return ext
+    if filename and "." in filename:
+        return filename.rsplit(".", 1)[1].lower()
+    return "wav"
+
+
+def _resample(x: "np.ndarray", sr: int, target: int) -> "np.ndarray":
+    if sr == target or len(x) == 0:
+        return x
+    if sr > target:
+        # crude anti-alias: moving average over the decimation ratio
+        k = int(round(sr / target))
+        if k > 1:
+            x = np.convolve(x, np.ones(k, dtype=np.float32) / k, mode="same")
+    n_out = int(round(len(x) * target / sr))
+    t_out = np.arange(n_out, dtype=np.float64) * (sr / target)
+    return np.interp(t_out, np.arange(len(x)), x).astype(np.float32)
+
+
+def _trim_silence(x: "np.ndarray", sr: int) -> "np.ndarray":
+    frame = max(1, int(sr * settings.AUDIO_VAD_FRAME_MS / 1000))
+    n = len(x) // frame
+    if n == 0:
+        return x
+    frames = x[: n * frame].reshape(n, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1) + 1e-12)
+    dbfs = 20.0 * np.log10(rms)
+    voiced = np.flatnonzero(dbfs > settings.AUDIO_VAD_THRESHOLD_DBFS)
+    if voiced.size == 0:
+        # nothing above threshold: let Whisper decide rather than send nothing
+        return x
+    pad = int(sr * settings.AUDIO_VAD_PAD_MS / 1000)
+    start = max(0, voiced[0] * frame - pad)
+    end = min(len(x), (voiced[-1] + 1) * frame + pad)
+    return x[start:end]
+
+
+def _encode(x: "np.ndarray", sr: int) -> Tuple[bytes, str]:
+    if settings.AUDIO_UPSTREAM_FORMAT == "ogg":
+        out = io.BytesIO()
+        try:
+            sf.write(out, x, sr, format="OGG", subtype="OPUS")
+            return out.getvalue(), "ogg"
+        except Exception:
+            pass  # older libsndfile without Opus: fall back to FLAC
+    out = io.BytesIO()
+    sf.write(out, x, sr, format="FLAC", subtype="PCM_16")
+    return out.getvalue(), "flac"
+
+
+def prepare_for_whisper(
+    data: bytes,
+    content_type: Optional[str] = None,
+    filename: Optional[str] = None,
+) -> Tuple[bytes, str, Dict[str, float]]:
+    """
+    Returns (payload, upstream_filename, stats).
+    stats: bytes_in, bytes_upstream, and when decoded, seconds_in/seconds_upstream.
+    """
+    ext = sniff_extension(data, content_type, filename)
+    stats: Dict[str, float] = {"bytes_in": len(data)}
+    _load_codecs()
+
+    samples = None
+    if sf is not None:
+        try:
+            samples, sr = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+        except Exception:
+            samples = None
+
+    if samples is None or len(samples) == 0:
+        stats["bytes_upstream"] = len(data)
+        return data, f"audio.{ext}", stats
+
+    target = settings.AUDIO_TARGET_SAMPLE_RATE
+    mono = samples.mean(axis=1) if samples.shape[1] > 1 else samples[:, 0]
+    mono = _resample(mono, sr, target)
+    trimmed = _trim_silence(mono, target)
+
+    payload, out_ext = _encode(trimmed, target)
+
+    stats["seconds_in"] = len(samples) / float(sr)
+    stats["seconds_upstream"] = len(trimmed) / float(target)
+    stats["bytes_upstream"] = len(payload)
+    return payload, f"audio.{out_ext}", stats
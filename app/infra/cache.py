@@ -0,0 +1,579 @@
+# app/infra/cache.py
+"""
+Cache for manager-level memoization: query embeddings, graph context,
+playbooks, quiz snapshots and answers.
+
+    _answers = cache.namespace("qa")
+    answer = await _answers.get_or_compute(key, lambda: compute(...))
+
+    @cached("graph")
+    async def get_part_context(self, part_name, model_id=None): ...
+
+Backends (CACHE_BACKEND), all behind the same async interface:
+
+  memory  in-process LRU bounded by CACHE_MAX_BYTES; one copy per worker
+  shm     one file per entry under CACHE_SHM_DIR (tmpfs, /dev/shm by
+          default): shared by every worker on the host, no server process
+  redis   CACHE_REDIS_URL, shared across hosts; "fakeredis://" gives an
+          in-process stand-in for tests and local runs
+  off     every lookup misses (coalescing of concurrent misses still applies)
+
+- values are JSON in every backend, so a hit is always a fresh copy the
+  caller may mutate, and backends can be swapped without touching callers
+- TTL per namespace (CACHE_TTL_S), with +-10% jitter so entries written
+  together don't all expire together
+- invalidate() drops a whole namespace, e.g. "qa" answers after an ingest;
+  with a shared backend it reaches every worker, and a fill that was in
+  flight anywhere when it ran is not stored (shared generation token)
+- stampede protection: concurrent misses for one key are coalesced in the
+  process (SingleFlight); with a shared backend a short lock entry makes
+  the other workers wait for the first one's value instead of recomputing
+- backend failures are logged and counted, then treated as a miss
+"""
+
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import random
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.config.settings import settings
+from app.infra.metrics import CACHE_BYTES, CACHE_REQUESTS
+from app.infra.singleflight import SingleFlight
+
+log = logging.getLogger(__name__)
+
+
+def dumps(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    return json.loads(data)
+
+
+def digest(key: Any) -> str:
+    """Stable key digest: the same parts give the same key in every process."""
+    raw = json.dumps(key, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:40]
+
+
+# ---------- backends ----------
+
+class MemoryBackend:
+    """Per-process LRU of serialized values; thread-safe (ingest runs in threads)."""
+
+    shared = False
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, bytes]]" = OrderedDict()
+        self._total = 0
+
+    def _pop(self, k: Tuple[str, str]) -> None:
+        _, value = self._entries.pop(k)
+        self._total -= len(value)
+
+    async def get(self, ns: str, key: str) -> Optional[bytes]:
+        k = (ns, key)
+        with self._lock:
+            entry = self._entries.get(k)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._pop(k)
+                return None
+            self._entries.move_to_end(k)
+            return entry[1]
+
+    async def set(self, ns: str, key: str, value: bytes, ttl_s: float) -> None:
+        k = (ns, key)
+        with self._lock:
+            if k in self._entries:
+                self._pop(k)
+            self._entries[k] = (time.monotonic() + ttl_s, value)
+            self._total += len(value)
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                self._pop(next(iter(self._entries)))
+            CACHE_BYTES.set(self._total)
+
+    async def add(self, ns: str, key: str, value: bytes, ttl_s: float) -> bool:
+        if await self.get(ns, key) is not None:
+            return False
+        await self.set(ns, key, value, ttl_s)
+        return True
+
+    async def delete(self, ns: str, key: str) -> None:
+        with self._lock:
+            if (ns, key) in self._entries:
+                self._pop((ns, key))
+
+    async def invalidate(self, ns: str) -> int:
+        with self._lock:
+            doomed = [k for k in self._entries if k[0] == ns]
+            for k in doomed:
+                self._pop(k)
+            CACHE_BYTES.set(self._total)
+        return len(doomed)
+
+    async def close(self) -> None:
+        pass
+
+
+_SHM_HEADER = struct.Struct("<d")  # expiry, unix time
+
+
+class ShmBackend:
+    """
+    One file per entry in <root>/<namespace>/<key>, written atomically
+    (tmp + rename) and read with a single read(); on tmpfs that is a copy
+    out of shared memory. Invalidation renames the namespace directory
+    away, so it is atomic for every worker. Expired entries and, past
+    max_bytes, the oldest ones are swept at most every 10 s.
+    """
+
+    shared = True
+    _SWEEP_INTERVAL_S = 10.0
+
+    def __init__(self, root: str, max_bytes: int):
+        if not os.path.isdir(os.path.dirname(root) or "."):
+            root = os.path.join(tempfile.gettempdir(), os.path.basename(root))  # no /dev/shm (macOS)
+        self.root = root
+        self.max_bytes = max_bytes
+        self._last_sweep = time.monotonic()
+        self._sweep_task: Optional[asyncio.Future] = None
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, ns: str, key: str) -> str:
+        return os.path.join(self.root, ns, key)
+
+    @staticmethod
+    def _read(path: str) -> Optional[bytes]:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if len(data) < _SHM_HEADER.size or _SHM_HEADER.unpack_from(data)[0] <= time.time():
+            return None
+        return data[_SHM_HEADER.size:]
+
+    async def get(self, ns: str, key: str) -> Optional[bytes]:
+        return self._read(self._path(ns, key))
+
+    async def set(self, ns: str, key: str, value: bytes, ttl_s: float) -> None:
+        path = self._path(ns, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(_SHM_HEADER.pack(time.time() + ttl_s))
+                f.write(value)
+            os.replace(tmp, path)
+        except FileNotFoundError:
+            return  # namespace invalidated while we wrote: drop the entry
+        self._maybe_sweep()
+
+    async def add(self, ns: str, key: str, value: bytes, ttl_s: float) -> bool:
+        path = self._path(ns, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+            except FileExistsError:
+                if self._read(path) is not None:
+                    return False
+                try:
+                    os.remove(path)  # expired: take it over
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, "wb") as f:
+                f.write(_SHM_HEADER.pack(time.time() + ttl_s))
+                f.write(value)
+            return True
+        return False
+
+    async def delete(self, ns: str, key: str) -> None:
+        try:
+            os.remove(self._path(ns, key))
+        except FileNotFoundError:
+            pass
+
+    async def invalidate(self, ns: str) -> int:
+        src = os.path.join(self.root, ns)
+        dead = f"{src}.{os.getpid()}.{os.urandom(4).hex()}.dead"
+        try:
+            os.rename(src, dead)
+        except FileNotFoundError:
+            return 0
+        n = sum(1 for name in os.listdir(dead) if not name.endswith(".tmp"))
+        await asyncio.to_thread(shutil.rmtree, dead, True)
+        return n
+
+    def _maybe_sweep(self) -> None:
+        now = time.monotonic()
+        if now - self._last_sweep < self._SWEEP_INTERVAL_S or self._sweep_task is not None:
+            return
+        self._last_sweep = now
+        self._sweep_task = asyncio.get_running_loop().run_in_executor(None, self._sweep)
+        self._sweep_task.add_done_callback(self._swept)
+
+    def _swept(self, fut: asyncio.Future) -> None:
+        self._sweep_task = None
+        if not fut.cancelled() and fut.exception() is not None:
+            log.warning("cache sweep failed: %s", fut.exception())
+
+    def _sweep(self) -> None:
+        now = time.time()
+        live = []
+        for ns in os.listdir(self.root):
+            d = os.path.join(self.root, ns)
+            if ns.endswith(".dead"):
+                shutil.rmtree(d, ignore_errors=True)  # left behind by a crashed invalidate
+                continue
+            for entry in os.scandir(d):
+                try:
+                    st = entry.stat()
+                    if entry.name.endswith(".tmp"):
+                        if now - st.st_mtime > 60:
+                            os.remove(entry.path)
+                        continue
+                    with open(entry.path, "rb") as f:
+                        head = f.read(_SHM_HEADER.size)
+                    if len(head) < _SHM_HEADER.size or _SHM_HEADER.unpack(head)[0] <= now:
+                        os.remove(entry.path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                live.append((st.st_mtime, entry.path, st.st_size))
+        total = sum(size for _, _, size in live)
+        live.sort()
+        for _, path, size in live:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        CACHE_BYTES.set(total)
+
+    async def close(self) -> None:
+        if self._sweep_task is not None:
+            await asyncio.gather(self._sweep_task, return_exceptions=True)
+
+
+class RedisBackend:
+    """Redis (or the in-process fakeredis stand-in); the client is created on first use."""
+
+    shared = True
+
+    def __init__(self, url: str, prefix: str):
+        self.url = url
+        self.prefix = prefix
+        self._client = None
+
+    def _redis(self):
+        if self._client is None:
+            if self.url.startswith("fakeredis://"):
+                import fakeredis
+
+                self._client = fakeredis.FakeAsyncRedis()
+            else:
+                import redis.asyncio as redis
+
+                self._client = redis.from_url(
+                    self.url,
+                    socket_timeout=settings.CACHE_REDIS_TIMEOUT_S,
+                    socket_connect_timeout=settings.CACHE_REDIS_TIMEOUT_S,
+                )
+        return self._client
+
+    def _key(self, ns: str, key: str) -> str:
+        return f"{self.prefix}{ns}:{key}"
+
+    async def get(self, ns: str, key: str) -> Optional[bytes]:
+        return await self._redis().get(self._key(ns, key))
+
+    async def set(self, ns: str, key: str, value: bytes, ttl_s: float) -> None:
+        await self._redis().set(self._key(ns, key), value, px=max(1, int(ttl_s * 1000)))
+
+    async def add(self, ns: str, key: str, value: bytes, ttl_s: float) -> bool:
+        return bool(await self._redis().set(self._key(ns, key), value, px=max(1, int(ttl_s * 1000)), nx=True))
+
+    async def delete(self, ns: str, key: str) -> None:
+        await self._redis().delete(self._key(ns, key))
+
+    async def invalidate(self, ns: str) -> int:
+        r = self._redis()
+        n, batch = 0, []
+        async for k in r.scan_iter(match=f"{self.prefix}{ns}:*", count=500):
+            batch.append(k)
+            if len(batch) >= 500:
+                n += await r.unlink(*batch)
+                batch = []
+        if batch:
+            n += await r.unlink(*batch)
+        return n
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class NullBackend:
+    shared = False
+
+    async def get(self, ns: str, key: str) -> Optional[bytes]:
+        return None
+
+    async def set(self, ns: str, key: str, value: bytes, ttl_s: float) -> None:
+        pass
+
+    async def add(self, ns: str, key: str, value: bytes, ttl_s: float) -> bool:
+        return True
+
+    async def delete(self, ns: str, key: str) -> None:
+        pass
+
+    async def invalidate(self, ns: str) -> int:
+        return 0
+
+    async def close(self) -> None:
+        pass
+
+
+def _make_backend(kind: str):
+    if kind == "memory":
+        return MemoryBackend(settings.CACHE_MAX_BYTES)
+    if kind == "shm":
+        return ShmBackend(settings.CACHE_SHM_DIR, settings.CACHE_MAX_BYTES)
+    if kind == "redis":
+        return RedisBackend(settings.CACHE_REDIS_URL, settings.CACHE_KEY_PREFIX)
+    if kind == "off":
+        return NullBackend()
+    raise ValueError(f"unknown CACHE_BACKEND {kind!r} (memory | shm | redis | off)")
+
+
+# ---------- namespaces ----------
+
+_MISS = object()
+_LOCK_POLL_S = 0.05
+_GEN_TTL_S = 30 * 86400.0
+
+
+class CacheNamespace:
+    def __init__(self, cache: "Cache", name: str):
+        self.name = name
+        self._cache = cache
+        self._flight = SingleFlight(name)
+        self._epoch = 0  # bumped by invalidate(): fills started before it are not stored
+        self._gen_ns = f"{name}@gen"  # shared backends: the same, across workers
+
+    @property
+    def ttl_s(self) -> float:
+        return settings.CACHE_TTL_S.get(self.name, settings.CACHE_DEFAULT_TTL_S)
+
+    async def _get(self, key: str, result: str = "hit") -> Any:
+        try:
+            data = await self._cache.backend.get(self.name, key)
+        except Exception as e:
+            self._error("get", e)
+            return _MISS
+        if data is None:
+            return _MISS
+        CACHE_REQUESTS.labels(self.name, result).inc()
+        return loads(data)
+
+    def _error(self, op: str, e: Exception) -> None:
+        CACHE_REQUESTS.labels(self.name, "error").inc()
+        log.warning("cache %s %s failed: %s", self.name, op, e)
+
+    async def _generation(self) -> Any:
+        """Token invalidate() replaces in a shared backend; None for per-process ones."""
+        if not self._cache.backend.shared:
+            return None
+        try:
+            return await self._cache.backend.get(self._gen_ns, "gen")
+        except Exception as e:
+            self._error("generation", e)
+            return None
+
+    async def get(self, key: Any) -> Any:
+        """Cached value or None."""
+        value = await self._get(digest(key))
+        return None if value is _MISS else value
+
+    async def set(self, key: Any, value: Any, ttl_s: Optional[float] = None) -> None:
+        await self._set(digest(key), value, ttl_s)
+
+    async def _set(self, key: str, value: Any, ttl_s: Optional[float]) -> None:
+        try:
+            data = dumps(value)
+        except (TypeError, ValueError) as e:
+            self._error("serialize", e)
+            return
+        ttl = (ttl_s or self.ttl_s) * random.uniform(0.9, 1.1)
+        try:
+            await self._cache.backend.set(self.name, key, data, ttl)
+        except Exception as e:
+            self._error("set", e)
+
+    async def get_or_compute(
+        self,
+        key: Any,
+        fn: Callable[[], Awaitable[Any]],
+        ttl_s: Optional[float] = None,
+        store_if: Optional[Callable[[Any], bool]] = None,
+        flight: Any = None,
+    ) -> Any:
+        """
+        Cached value for key, or the result of fn() (then stored unless
+        store_if rejects it). Exceptions from fn propagate and are not cached.
+        flight: extra part of the coalescing key only, for callers whose fn
+        differs in ways the stored value must not (e.g. the budget mode).
+        """
+        k = digest(key)
+        value = await self._get(k)
+        if value is not _MISS:
+            return value
+        fk = k if flight is None else (k, digest(flight))
+        return await self._flight.do(fk, lambda: self._fill(k, fn, ttl_s, store_if))
+
+    async def _fill(self, k: str, fn, ttl_s, store_if) -> Any:
+        backend = self._cache.backend
+        lock = f"{k}.lock"
+        locked = False
+        if backend.shared:
+            try:
+                locked = await backend.add(self.name, lock, b"1", settings.CACHE_LOCK_WAIT_S)
+            except Exception as e:
+                self._error("lock", e)
+            if not locked:
+                value = await self._wait_for_fill(k, lock)
+                if value is not _MISS:
+                    return value
+
+        CACHE_REQUESTS.labels(self.name, "miss").inc()
+        epoch, gen = self._epoch, await self._generation()
+        try:
+            value = await fn()
+            if (
+                epoch == self._epoch
+                and (store_if is None or store_if(value))
+                and await self._generation() == gen
+            ):
+                await self._set(k, value, ttl_s)
+                if await self._generation() != gen:
+                    await self._delete(k)  # another worker invalidated while we stored
+            return value
+        finally:
+            if locked:
+                try:
+                    await backend.delete(self.name, lock)
+                except Exception as e:
+                    self._error("unlock", e)
+
+    async def _wait_for_fill(self, k: str, lock: str) -> Any:
+        """Another worker holds the fill lock: wait for its value, or give up when it does."""
+        deadline = time.monotonic() + settings.CACHE_LOCK_WAIT_S
+        backend = self._cache.backend
+        while time.monotonic() < deadline:
+            await asyncio.sleep(_LOCK_POLL_S)
+            value = await self._get(k, "waited")
+            if value is not _MISS:
+                return value
+            try:
+                if await backend.get(self.name, lock) is None:
+                    break  # the other worker failed or chose not to store
+            except Exception:
+                break
+        return _MISS
+
+    async def _delete(self, key: str) -> None:
+        try:
+            await self._cache.backend.delete(self.name, key)
+        except Exception as e:
+            self._error("delete", e)
+
+    async def invalidate(self) -> int:
+        self._epoch += 1
+        backend = self._cache.backend
+        try:
+            if backend.shared:
+                # new token first: a fill that stores after the drop below sees it and undoes itself
+                await backend.set(self._gen_ns, "gen", os.urandom(8).hex().encode(), _GEN_TTL_S)
+            n = await backend.invalidate(self.name)
+        except Exception as e:
+            self._error("invalidate", e)
+            return 0
+        log.info("cache %s invalidated (%d entries)", self.name, n)
+        return n
+
+
+class Cache:
+    def __init__(self):
+        self._backend = None
+        self._namespaces: Dict[str, CacheNamespace] = {}
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = _make_backend(settings.CACHE_BACKEND)
+        return self._backend
+
+    def namespace(self, name: str) -> CacheNamespace:
+        ns = self._namespaces.get(name)
+        if ns is None:
+            ns = self._namespaces[name] = CacheNamespace(self, name)
+        return ns
+
+    async def invalidate(self, *names: str) -> int:
+        return sum([await self.namespace(n).invalidate() for n in names])
+
+    async def close(self) -> None:
+        if self._backend is not None:
+            await self._backend.close()
+
+
+cache = Cache()
+
+
+def cached(namespace: str, store_if: Optional[Callable[[Any], bool]] = None):
+    """
+    Decorator: memoize an async function (or method) in `namespace`, keyed
+    by its qualified name and bound arguments (`self` excluded), so
+    f(x, y=1) and f(x, 1) share an entry.
+    """
+    def deco(fn):
+        sig = inspect.signature(fn)
+        skip_self = next(iter(sig.parameters), None) == "self"
+        ns = cache.namespace(namespace)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            if skip_self:
+                arguments.pop("self")
+            return await ns.get_or_compute(
+                (fn.__qualname__, arguments),
+                lambda: fn(*args, **kwargs),
+                store_if=store_if,
+            )
+        return wrapper
+    return deco
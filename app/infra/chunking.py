@@ -0,0 +1,143 @@
+# app/infra/chunking.py
+"""
+Streaming, linear-time sentence chunker sized in embedding tokens.
+
+    for text, page_start, page_end in iter_chunks(pages):
+        ...
+
+Pages go in as (page_no, cleaned_text). Sentences are packed into a chunk
+until the next one would pass max_size; a chunk shorter than min_size keeps
+growing past max_size rather than being emitted tiny (same rule as the
+original character chunker). Each chunk after the first is prefixed with
+the last `overlap` units of the previous one.
+
+Sizes are measured by a _Measure: TokenMeasure (default, tiktoken for
+EMBEDDING_MODEL) or CharMeasure, which reproduces the original
+character-based chunker exactly (see tests/test_chunking.py).
+
+With span_pages=False chunks stop at page boundaries, as before; with
+span_pages=True sentences flow across pages and each chunk reports the
+page range it came from.
+"""
+
+import re
+from functools import lru_cache
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Tuple
+
+from app.config.settings import settings
+
+if TYPE_CHECKING:
+    import tiktoken
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+Chunk = Tuple[str, int, int]  # (text, page_start, page_end)
+
+
+@lru_cache(maxsize=None)
+def encoding(model: str) -> "tiktoken.Encoding":
+    import tiktoken  # imported with the first encoding, not the app
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+# ---------- size measures ----------
+
+class CharMeasure:
+    """Sizes in characters; sentences are joined by one space (1 unit)."""
+
+    sep = 1
+
+    def sizes(self, sentences: List[str]) -> List[int]:
+        return [len(s) for s in sentences]
+
+    def tail(self, text: str, n: int) -> str:
+        return text[-n:]
+
+
+class TokenMeasure:
+    """
+    Sizes in tokens of the embedding model. A sentence is measured with its
+    leading space, which is how BPE sees it mid-chunk, so the join costs 0.
+    """
+
+    sep = 0
+
+    def __init__(self, model: Optional[str] = None):
+        self._enc = encoding(model or settings.EMBEDDING_MODEL)
+
+    def sizes(self, sentences: List[str]) -> List[int]:
+        return [len(t) for t in self._enc.encode_ordinary_batch([" " + s for s in sentences])]
+
+    def tail(self, text: str, n: int) -> str:
+        tokens = self._enc.encode_ordinary(text)
+        if len(tokens) <= n:
+            return text
+        tail = self._enc.decode(tokens[-n:])
+        # start the overlap on a word boundary
+        cut = tail.find(" ")
+        return tail[cut + 1:] if cut >= 0 else tail
+
+
+# ---------- chunker ----------
+
+def iter_chunks(
+    pages: Iterable[Tuple[int, str]],
+    max_size: Optional[int] = None,
+    min_size: Optional[int] = None,
+    overlap: Optional[int] = None,
+    span_pages: Optional[bool] = None,
+    measure=None,
+) -> Iterator[Chunk]:
+    """
+    Yield (text, page_start, page_end) chunks from (page_no, text) pages.
+    Defaults come from the CHUNK_* settings. Every sentence is split, sized
+    and joined once, so the cost is linear in the input.
+    """
+    max_size = settings.CHUNK_MAX_TOKENS if max_size is None else max_size
+    min_size = settings.CHUNK_MIN_TOKENS if min_size is None else min_size
+    overlap = settings.CHUNK_OVERLAP_TOKENS if overlap is None else overlap
+    span_pages = settings.CHUNK_SPAN_PAGES if span_pages is None else span_pages
+    measure = measure or TokenMeasure()
+    sep = measure.sep
+
+    parts: List[str] = []
+    size = 0
+    first_page = last_page = 0
+    prev: Optional[str] = None  # previous chunk before overlap, for the next prefix
+
+    def emit() -> Chunk:
+        nonlocal parts, size, prev
+        body = " ".join(parts)
+        text = body
+        if overlap and prev is not None:
+            text = (measure.tail(prev, overlap) + " " + body).strip()
+        prev = body
+        parts, size = [], 0
+        return text, first_page, last_page
+
+    for page_no, page_text in pages:
+        if not page_text:
+            continue
+        sentences = _SENTENCE_END.split(page_text)
+        for s, n in zip(sentences, measure.sizes(sentences)):
+            if parts and size + n + sep > max_size and size >= min_size:
+                yield emit()
+            if not parts:
+                first_page = page_no
+                parts.append(s)
+                size = n
+            else:
+                parts.append(s)
+                size += sep + n
+            last_page = page_no
+        if not span_pages:
+            if parts:
+                yield emit()
+            prev = None  # overlap never crosses a page we do not span
+
+    if parts:
+        yield emit()
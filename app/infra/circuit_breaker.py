@@ -0,0 +1,121 @@
+# app/infra/circuit_breaker.py
+"""
+Per-dependency circuit breakers (postgres, neo4j, openai).
+
+    closed     calls go through; CIRCUIT_FAILURE_THRESHOLD consecutive
+               failures open the breaker
+    open       calls fail fast with CircuitOpenError for CIRCUIT_OPEN_S
+    half_open  one trial call is let through; success closes the breaker,
+               failure opens it again
+
+Outcomes come from two places: the client wrappers record every real call,
+and the background health monitor records its probes (a successful probe
+closes an open breaker straight away). Only infrastructure failures count
+(connection refused, timeouts, 5xx), not bad queries.
+
+CircuitOpenError is a ConnectionError, so code that already falls back on
+OSError (e.g. graph retrieval in ask_hybrid) treats an open breaker like an
+unreachable host, minus the wait.
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+from app.config.settings import settings
+from app.infra.metrics import CIRCUIT_REJECTED, CIRCUIT_STATE
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+_STATE_VALUE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(ConnectionError):
+    def __init__(self, dependency: str, retry_after: float):
+        super().__init__(f"{dependency} is unavailable (circuit open)")
+        self.dependency = dependency
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Thread-safe: the sync Postgres path runs in worker threads."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        CIRCUIT_STATE.labels(name).set(0)
+
+    def _set(self, state: str) -> None:
+        self._state = state
+        CIRCUIT_STATE.labels(self.name).set(_STATE_VALUE[state])
+
+    def _refresh(self, now: float) -> None:
+        if self._state == OPEN and now - self._opened_at >= settings.CIRCUIT_OPEN_S:
+            self._set(HALF_OPEN)
+            self._trial_at = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh(time.monotonic())
+            return self._state
+
+    def available(self) -> bool:
+        """Non-consuming check for callers deciding whether to try at all."""
+        with self._lock:
+            now = time.monotonic()
+            self._refresh(now)
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN:
+                return self._trial_at is None or now - self._trial_at >= settings.CIRCUIT_TRIAL_TIMEOUT_S
+            return False
+
+    def check(self) -> None:
+        """Admit a call or raise CircuitOpenError. In half_open, admits one trial."""
+        with self._lock:
+            now = time.monotonic()
+            self._refresh(now)
+            if self._state == CLOSED:
+                return
+            if self._state == HALF_OPEN and (
+                self._trial_at is None or now - self._trial_at >= settings.CIRCUIT_TRIAL_TIMEOUT_S
+            ):
+                self._trial_at = now
+                return
+            retry_after = max(0.0, self._opened_at + settings.CIRCUIT_OPEN_S - now)
+        CIRCUIT_REJECTED.labels(self.name).inc()
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._trial_at = None
+            self.last_error = None
+            if self._state != CLOSED:
+                self._set(CLOSED)
+
+    def record_failure(self, error: BaseException | str) -> None:
+        with self._lock:
+            self._failures += 1
+            self.last_error = str(error)[:500]
+            self._trial_at = None
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._failures >= settings.CIRCUIT_FAILURE_THRESHOLD
+            ):
+                self._opened_at = time.monotonic()
+                self._set(OPEN)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            self._refresh(time.monotonic())
+            return {"state": self._state, "failures": self._failures, "last_error": self.last_error}
+
+
+breakers: Dict[str, CircuitBreaker] = {
+    name: CircuitBreaker(name) for name in ("postgres", "neo4j", "openai")
+}
@@ -0,0 +1,219 @@
+# app/infra/context_packer.py
+"""
+Turns fused retrieval hits into the context blocks of the QA prompt.
+
+    packed = pack_context(fused, graph_hit)
+    prompt = ... "\n\n".join(packed["blocks"]) ...
+
+1. merge: hits from the same document and page with consecutive
+   chunk_index are joined into one block, with the chunker's overlap
+   (the tail of the previous chunk repeated at the head of the next)
+   removed
+2. dedupe/order by maximal marginal relevance: blocks are picked by
+   lambda * relevance - (1 - lambda) * redundancy, where relevance is the
+   RRF score and redundancy the largest share of the block's token
+   trigrams already contained in one picked block; a block at least
+   QA_CONTEXT_DUP_THRESHOLD covered is dropped (this also catches a chunk
+   that is part of a larger merged block)
+3. fill QA_CONTEXT_MAX_TOKENS, counted with tiktoken for LLM_MODEL on the
+   joined context; the first block that no longer fits is truncated on a
+   word boundary if at least QA_CONTEXT_MIN_BLOCK_TOKENS of it fit
+
+The graph snippet always comes first. Every block keeps a citation id
+([GRAPH], [DOC-1], ...) that maps back to the chunk ids and pages it came
+from. tokens_saved compares against the previous prompt, which listed
+every fused hit verbatim.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from app.config.settings import settings
+from app.infra.chunking import encoding
+
+_SEP = "\n\n"
+_MAX_OVERLAP_CHARS = 4000  # the chunk overlap is CHUNK_OVERLAP_TOKENS; this is a generous bound
+
+
+def _strip_overlap(prev: str, nxt: str) -> str:
+    """nxt without the longest head that is also the tail of prev."""
+    probe = nxt[:24]
+    if not probe:
+        return nxt
+    start = max(0, len(prev) - _MAX_OVERLAP_CHARS)
+    pos = prev.find(probe, start)
+    while pos >= 0:
+        tail = prev[pos:]
+        if nxt.startswith(tail):
+            return nxt[len(tail):].lstrip()
+        pos = prev.find(probe, pos + 1)
+    return nxt
+
+
+def _merge_adjacent(hits: Sequence[Dict]) -> Tuple[List[Dict], int]:
+    """
+    Group doc hits into blocks, merging runs of consecutive chunks of one
+    document page. Blocks keep the rank of their best hit. Returns
+    (blocks, number of hits merged away).
+    """
+    groups: Dict[Any, List[Tuple[int, Dict]]] = {}
+    for rank, h in enumerate(hits):
+        meta = h.get("meta") or {}
+        doc, page, idx = h.get("document_id"), meta.get("page"), meta.get("chunk_index")
+        key = (doc, page) if doc is not None and page is not None and idx is not None else ("hit", h["id"])
+        groups.setdefault(key, []).append((rank, h))
+
+    blocks: List[Dict] = []
+    for members in groups.values():
+        members.sort(key=lambda rh: (rh[1].get("meta") or {}).get("chunk_index") or 0)
+        run: List[Tuple[int, Dict]] = []
+        for rank, h in members:
+            if run and (h["meta"]["chunk_index"] - run[-1][1]["meta"]["chunk_index"]) != 1:
+                blocks.append(_block(run))
+                run = []
+            run.append((rank, h))
+        blocks.append(_block(run))
+    blocks.sort(key=lambda b: b["rank"])
+    return blocks, len(hits) - len(blocks)
+
+
+def _block(run: List[Tuple[int, Dict]]) -> Dict:
+    text = run[0][1]["text"]
+    for _, h in run[1:]:
+        text = text + " " + _strip_overlap(text, h["text"])
+    first = run[0][1]
+    meta = first.get("meta") or {}
+    pages = [(h["meta"].get("page_end") or h["meta"].get("page")) for _, h in run if h.get("meta")]
+    return {
+        "text": text,
+        "rank": min(r for r, _ in run),
+        "relevance": max(h.get("rrf", h.get("score", 0.0)) for _, h in run),
+        "chunk_ids": [h["id"] for _, h in run],
+        "document_id": first.get("document_id"),
+        "page": meta.get("page"),
+        "page_end": max((p for p in pages if p is not None), default=None),
+    }
+
+
+def _shingles(tokens: Sequence[int]) -> Set[Tuple[int, ...]]:
+    if len(tokens) < 3:
+        return {tuple(tokens)}
+    return {tuple(tokens[i:i + 3]) for i in range(len(tokens) - 2)}
+
+
+def _containment(a: Set, b: Set) -> float:
+    """Share of a that is also in b."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a)
+
+
+def _mmr(blocks: List[Dict], lam: float, dup_threshold: float) -> Tuple[List[Dict], int]:
+    """Blocks in MMR order, near-duplicates removed. Returns (picked, duplicates dropped)."""
+    top = max((b["relevance"] for b in blocks), default=0.0) or 1.0
+    remaining = list(blocks)
+    picked: List[Dict] = []
+    dropped = 0
+    while remaining:
+        best, best_score, best_red = None, float("-inf"), 0.0
+        for b in remaining:
+            red = max((_containment(b["shingles"], p["shingles"]) for p in picked), default=0.0)
+            score = lam * b["relevance"] / top - (1.0 - lam) * red
+            if score > best_score:
+                best, best_score, best_red = b, score, red
+        remaining.remove(best)
+        if best_red >= dup_threshold:
+            dropped += 1
+            continue
+        picked.append(best)
+    return picked, dropped
+
+
+def _truncate(enc, text: str, max_tokens: int) -> str:
+    cut = enc.decode(enc.encode_ordinary(text)[:max_tokens])
+    space = cut.rfind(" ")
+    return (cut[:space] if space > 0 else cut).rstrip() + " ..."
+
+
+def pack_context(
+    hits: Sequence[Dict],
+    graph_hit: Optional[Dict] = None,
+    max_tokens: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Pack fused hits (graph hits among them are skipped; pass the graph
+    snippet as graph_hit) into prompt blocks within max_tokens.
+
+    Returns {"blocks": [str], "citations": [{"id", "chunk_ids",
+    "document_id", "page", "page_end"}], "tokens", "tokens_baseline",
+    "tokens_saved", "merged", "duplicates", "over_budget"}.
+    """
+    max_tokens = settings.QA_CONTEXT_MAX_TOKENS if max_tokens is None else max_tokens
+    numbered = [(i, h) for i, h in enumerate(hits) if (h.get("meta") or {}).get("source") != "graph"]
+    docs = [h for _, h in numbered]
+    if not docs and not graph_hit:
+        return {"blocks": [], "citations": [], "tokens": 0, "tokens_baseline": 0, "tokens_saved": 0,
+                "merged": 0, "duplicates": 0, "over_budget": 0}
+    enc = encoding(settings.LLM_MODEL)
+
+    # what the prompt used to carry: the graph snippet plus every fused hit verbatim
+    baseline = ([f"[GRAPH] {graph_hit['text']}"] if graph_hit else []) + [
+        f"[DOC-{i + 1}] {h['text']}" for i, h in numbered
+    ]
+    tokens_baseline = len(enc.encode_ordinary(_SEP.join(baseline))) if baseline else 0
+
+    blocks, merged = _merge_adjacent(docs)
+    for b in blocks:
+        b["shingles"] = _shingles(enc.encode_ordinary(b["text"]))
+    ordered, duplicates = _mmr(blocks, settings.QA_CONTEXT_MMR_LAMBDA, settings.QA_CONTEXT_DUP_THRESHOLD)
+
+    out: List[str] = []
+    citations: List[Dict[str, Any]] = []
+    used = 0
+    over_budget = 0
+
+    def cost(text: str) -> int:
+        return len(enc.encode_ordinary(text)) + (1 if out else 0)  # "\n\n" is one token
+
+    if graph_hit:
+        text = f"[GRAPH] {graph_hit['text']}"
+        if cost(text) > max_tokens:
+            text = _truncate(enc, text, max(1, max_tokens - 2))
+        used += cost(text)
+        out.append(text)
+        citations.append({"id": "GRAPH", "chunk_ids": [graph_hit["id"]], "document_id": None,
+                          "page": None, "page_end": None})
+
+    for b in ordered:
+        cid = f"DOC-{len(citations) - (1 if graph_hit else 0) + 1}"
+        text = f"[{cid}] {b['text']}"
+        n = cost(text)
+        if used + n > max_tokens:
+            room = max_tokens - used - (1 if out else 0) - 2
+            if room < settings.QA_CONTEXT_MIN_BLOCK_TOKENS:
+                over_budget += 1
+                continue
+            text = _truncate(enc, text, room)
+            n = cost(text)
+        out.append(text)
+        used += n
+        citations.append({"id": cid, "chunk_ids": b["chunk_ids"], "document_id": b["document_id"],
+                          "page": b["page"], "page_end": b["page_end"]})
+
+    # per-block counts ignore BPE merges across the separators: settle on the exact total
+    tokens = len(enc.encode_ordinary(_SEP.join(out))) if out else 0
+    while tokens > max_tokens and len(out) > 1:
+        out.pop()
+        citations.pop()
+        over_budget += 1
+        tokens = len(enc.encode_ordinary(_SEP.join(out)))
+
+    return {
+        "blocks": out,
+        "citations": citations,
+        "tokens": tokens,
+        "tokens_baseline": tokens_baseline,
+        "tokens_saved": max(0, tokens_baseline - tokens),
+        "merged": merged,
+        "duplicates": duplicates,
+        "over_budget": over_budget,
+    }
@@ -0,0 +1,143 @@
+# app/infra/deadline.py
+"""
+Per-request latency budgets for retrieval stages.
+
+    budget = Budget(settings.QA_RETRIEVAL_BUDGET_MS)
+    hits = await run_stage("ann", lambda: ann_search(...),
+                           budget.timeout(settings.ANN_DEADLINE_MS), hedge=True)
+
+run_stage raises StageTimeout when the stage misses its deadline so the
+caller can carry on with partial results. With hedge=True a duplicate
+request is fired once the first one has been pending longer than the
+stage's observed p95; whichever finishes first wins, the other is cancelled.
+Every run, including timeouts and failures, is recorded in
+pipeline_stage_seconds{pipeline, stage}.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from app.config.settings import settings
+from app.infra.metrics import RETRIEVAL_HEDGES, STAGE_SECONDS
+from app.infra.tracing import current_span, span
+
+T = TypeVar("T")
+
+
+class StageTimeout(Exception):
+    def __init__(self, stage: str):
+        super().__init__(f"{stage} missed its deadline")
+        self.stage = stage
+
+
+class Budget:
+    """Wall-clock budget shared by all stages of one request."""
+
+    def __init__(self, total_ms: float):
+        self._end = time.perf_counter() + total_ms / 1000.0
+
+    def remaining(self) -> float:
+        return max(0.0, self._end - time.perf_counter())
+
+    def timeout(self, stage_ms: float) -> float:
+        """Stage deadline in seconds, never past the overall budget."""
+        return min(stage_ms / 1000.0, self.remaining())
+
+
+class _LatencyWindow:
+    """Rolling window of successful stage latencies (seconds) for p95 hedging."""
+
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def p95(self) -> Optional[float]:
+        if len(self._samples) < settings.HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+_windows: Dict[str, _LatencyWindow] = {}
+
+
+def _window(stage: str) -> _LatencyWindow:
+    if stage not in _windows:
+        _windows[stage] = _LatencyWindow()
+    return _windows[stage]
+
+
+def hedge_delay(stage: str) -> float:
+    """Seconds to wait before hedging: observed p95, or the configured default."""
+    p95 = _window(stage).p95()
+    return p95 if p95 is not None else settings.HEDGE_DEFAULT_DELAY_MS / 1000.0
+
+
+async def run_stage(
+    stage: str,
+    factory: Callable[[], Awaitable[T]],
+    timeout: float,
+    hedge: bool = False,
+    pipeline: str = "qa",
+) -> T:
+    """
+    Await factory() for at most `timeout` seconds.
+    factory must build a fresh awaitable on every call (it may be called twice).
+    """
+    with span(f"{pipeline}.{stage}", timeout_ms=round(timeout * 1000)):
+        return await _run_stage(stage, factory, timeout, hedge, pipeline)
+
+
+async def _run_stage(
+    stage: str,
+    factory: Callable[[], Awaitable[T]],
+    timeout: float,
+    hedge: bool,
+    pipeline: str,
+) -> T:
+    if timeout <= 0:
+        raise StageTimeout(stage)
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = started + timeout
+    tasks = {asyncio.ensure_future(factory())}
+    last_error: Optional[BaseException] = None
+
+    try:
+        if hedge and settings.HEDGE_ENABLED:
+            delay = hedge_delay(stage)
+            if delay < timeout:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    tasks.add(asyncio.ensure_future(factory()))
+                    RETRIEVAL_HEDGES.labels(stage).inc()
+                    current_span().set("hedged", True)
+
+        while tasks:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            done, _ = await asyncio.wait(
+                tasks, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                break
+            for t in done:
+                tasks.discard(t)
+                if t.exception() is None:
+                    _window(stage).observe(loop.time() - started)
+                    return t.result()
+                last_error = t.exception()
+
+        if not tasks and last_error is not None:
+            raise last_error
+        raise StageTimeout(stage)
+    finally:
+        for t in tasks:
+            t.cancel()
+        STAGE_SECONDS.labels(pipeline, stage).observe(loop.time() - started)
@@ -1,14 +1,28 @@
-from typing import Any, Dict, List, Optional, Tuple
-from app.clients.postgres_client import get_conn
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.clients.postgres_client import get_conn, get_async_conn
+from app.config.settings import settings
+from app.infra.vector_tier import vector_tier
 import json
 from uuid import UUID
 
+class MissingEmbeddings(Exception):
+    """
+    Chunks meant to reuse another chunk's vector found none: a concurrent
+    re-ingest deleted the source rows. The write was rolled back; embed
+    text_hashes and retry.
+    """
+
+    def __init__(self, text_hashes: List[str]):
+        super().__init__(f"{len(text_hashes)} reused embeddings vanished before the write")
+        self.text_hashes = text_hashes
+
+
 def create_document(title: str, source: str | None, subject: str | None, tags: list[str] | None) -> str:
     q = """
     INSERT INTO document (title, source, subject, tags)
     VALUES (%s, %s, %s, %s) RETURNING id::text
     """
-    with get_conn() as conn, conn.cursor() as cur:
+    with get_conn("create_document") as conn, conn.cursor() as cur:
         cur.execute(q, (title, source, subject, tags))
         return cur.fetchone()[0]
 
@@ -21,28 +35,185 @@ def insert_chunks(document_id: str, rows: List[Tuple[int|None, int|None, str, di
     INSERT INTO doc_chunk (document_id, page, chunk_index, text, meta, embedding)
     VALUES (%s, %s, %s, %s, %s, %s)
     """
-    with get_conn() as conn, conn.cursor() as cur:
+    with get_conn("insert_chunks") as conn, conn.cursor() as cur:
         for page, idx, text, meta, emb in rows:
             cur.execute(q, (document_id, page, idx, text, json.dumps(meta), emb))
         return len(rows)
 
 
-def ann_search(
+def find_document(doc_key: str) -> Optional[Dict[str, Any]]:
+    """Current version of a logical document: {"document_id", "fingerprint", "chunks"}."""
+    q = """
+    SELECT d.id::text, d.fingerprint, count(c.id)
+    FROM document d LEFT JOIN doc_chunk c ON c.document_id = d.id
+    WHERE d.doc_key = %s
+    GROUP BY d.id
+    """
+    with get_conn("find_document") as conn, conn.cursor() as cur:
+        cur.execute(q, (doc_key,))
+        row = cur.fetchone()
+    if row is None:
+        return None
+    return {"document_id": row[0], "fingerprint": row[1], "chunks": row[2]}
+
+
+def adopt_legacy_document(doc_key: str, title: str, model_id: str | None) -> Optional[str]:
+    """
+    Give doc_key to the oldest document ingested before doc_keys existed
+    (doc_key IS NULL) with this title and model, so its next ingest replaces
+    it instead of adding a duplicate. Returns its id, or None.
+    """
+    q = """
+    UPDATE document SET doc_key = %s
+    WHERE id = (
+        SELECT d.id FROM document d
+        WHERE d.doc_key IS NULL AND d.title = %s
+          AND EXISTS (SELECT 1 FROM doc_chunk c
+                      WHERE c.document_id = d.id
+                        AND c.meta->>'model_id' IS NOT DISTINCT FROM %s)
+        ORDER BY d.created_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id::text
+    """
+    with get_conn("adopt_legacy_document") as conn, conn.cursor() as cur:
+        cur.execute(q, (doc_key, title, model_id))
+        row = cur.fetchone()
+    return row[0] if row else None
+
+
+def document_texts(document_id: str) -> List[str]:
+    """Chunk texts of a document in reading order."""
+    q = "SELECT text FROM doc_chunk WHERE document_id = %s ORDER BY page, chunk_index"
+    with get_conn("document_texts") as conn, conn.cursor() as cur:
+        cur.execute(q, (document_id,))
+        return [r[0] for r in cur.fetchall()]
+
+
+def known_text_hashes(text_hashes: List[str]) -> set[str]:
+    """Subset of text_hashes that already have an embedding in any document."""
+    if not text_hashes:
+        return set()
+    q = """
+    SELECT DISTINCT text_hash FROM doc_chunk
+    WHERE text_hash = ANY(%s) AND embedding IS NOT NULL
+    """
+    with get_conn("known_text_hashes") as conn, conn.cursor() as cur:
+        cur.execute(q, (list(set(text_hashes)),))
+        return {r[0] for r in cur.fetchall()}
+
+
+def replace_document_version(
+    doc_key: str,
+    fingerprint: str,
+    title: str,
+    source: str | None,
+    subject: str | None,
+    tags: list[str] | None,
+    rows: List[Tuple[int|None, int|None, str, dict, str, Optional[list[float]]]],
+    fence: Optional[Callable[[Any], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Make `rows` the chunk set of the document identified by doc_key, in one
+    transaction: readers see either the old version or the new one.
+
+    rows: list of (page, chunk_index, text, meta, text_hash, embedding).
+    embedding may be None when text_hash is already known; the vector is
+    then copied from an existing chunk with the same hash.
+
+    Existing chunks are matched by text_hash: matches are kept (only their
+    position/meta is updated), new hashes are inserted, leftovers deleted.
+
+    Raises MissingEmbeddings (nothing written) when a vector to copy is no
+    longer there, rather than storing a chunk ANN can never find.
+
+    fence, if given, is called with the cursor before anything is written;
+    an exception from it aborts the write (ingest jobs: job_repository.lock_claim).
+    """
+    q_doc = """
+    INSERT INTO document (doc_key, fingerprint, title, source, subject, tags)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON CONFLICT (doc_key) DO UPDATE
+       SET fingerprint = EXCLUDED.fingerprint,
+           title = EXCLUDED.title,
+           source = EXCLUDED.source,
+           subject = EXCLUDED.subject,
+           tags = EXCLUDED.tags,
+           updated_at = now()
+    RETURNING id::text
+    """
+    q_existing = "SELECT id::text, text_hash FROM doc_chunk WHERE document_id = %s"
+    q_update = """
+    UPDATE doc_chunk SET page = %s, chunk_index = %s, meta = %s
+    WHERE id = %s
+    """
+    q_insert = """
+    INSERT INTO doc_chunk (document_id, page, chunk_index, text, meta, text_hash, embedding)
+    VALUES (%s, %s, %s, %s, %s, %s, COALESCE(
+        %s::vector,
+        (SELECT embedding FROM doc_chunk
+         WHERE text_hash = %s AND embedding IS NOT NULL LIMIT 1)
+    ))
+    """
+    q_delete = "DELETE FROM doc_chunk WHERE id = ANY(%s::uuid[])"
+    q_missing = "SELECT DISTINCT text_hash FROM doc_chunk WHERE document_id = %s AND embedding IS NULL"
+
+    with get_conn("replace_document_version") as conn, conn.cursor() as cur:
+        if fence is not None:
+            fence(cur)
+        # the upsert also row-locks the document, serializing concurrent re-ingests
+        cur.execute(q_doc, (doc_key, fingerprint, title, source, subject, tags))
+        doc_id = cur.fetchone()[0]
+
+        cur.execute(q_existing, (doc_id,))
+        existing: Dict[str, List[str]] = {}
+        for chunk_id, h in cur.fetchall():
+            existing.setdefault(h, []).append(chunk_id)
+
+        updates, inserts = [], []
+        for page, idx, text, meta, h, emb in rows:
+            ids = existing.get(h)
+            if ids:
+                updates.append((page, idx, json.dumps(meta), ids.pop()))
+            else:
+                inserts.append((doc_id, page, idx, text, json.dumps(meta), h, emb, h))
+        removed = [cid for ids in existing.values() for cid in ids]
+
+        cur.executemany(q_update, updates)
+        # insert before delete: a removed chunk may be the only source of a reused vector
+        cur.executemany(q_insert, inserts)
+        if removed:
+            cur.execute(q_delete, (removed,))
+
+        cur.execute(q_missing, (doc_id,))
+        missing = [r[0] for r in cur.fetchall()]
+        if missing:
+            raise MissingEmbeddings(missing)  # get_conn rolls the version back
+
+    return {
+        "document_id": doc_id,
+        "kept": len(updates),
+        "inserted": len(inserts),
+        "deleted": len(removed),
+    }
+
+
+def _ann_query(
     question_embedding: List[float],
     n_results: int,
     filters: Optional[Dict[str, Optional[str]]] = None,
-) -> List[Dict]:
-    """
-    ANN search over doc_chunk.embedding with optional exact-match filters
-    on meta JSONB (e.g. model_id, scene).
-    `filters` is a dict like {"model_id": "jet-engine-v1", "scene": "overview"}.
-    """
-    base = """
+    with_embeddings: bool = False,
+) -> Tuple[str, List]:
+    # vector_send is the binary form: ~4x smaller on the wire than text, no float parsing
+    extra = ",\n           vector_send(embedding)" if with_embeddings else ""
+    base = f"""
     WITH q AS (SELECT %s::vector AS emb)
     SELECT id::text,
            text,
            meta,
-           1 - (embedding <=> (SELECT emb FROM q)) AS score
+           1 - (embedding <=> (SELECT emb FROM q)) AS score,
+           document_id::text{extra}
     FROM doc_chunk
     WHERE 1=1
     """
@@ -61,19 +232,111 @@ def ann_search(
     LIMIT %s
     """
     params.append(n_results)
+    return base, params
 
-    with get_conn() as conn, conn.cursor() as cur:
-        cur.execute(base, params)
-        rows = cur.fetchall()
 
-    return [
-        {"id": rid, "text": text, "meta": meta, "score": float(score)}
-        for (rid, text, meta, score) in rows
+def _ann_tuning(n_results: int = 0) -> Optional[Tuple[str, List]]:
+    """
+    Transaction-local HNSW settings from ANN_EF_SEARCH / ANN_ITERATIVE_SCAN,
+    if any. ef_search is raised to n_results when that is larger, since
+    HNSW never returns more rows than its candidate list.
+    """
+    gucs = []
+    ef = settings.ANN_EF_SEARCH
+    if n_results > (ef or 40):  # 40 = pgvector's default
+        ef = n_results
+    if ef:
+        gucs.append(("hnsw.ef_search", str(ef)))
+    if settings.ANN_ITERATIVE_SCAN:
+        gucs.append(("hnsw.iterative_scan", settings.ANN_ITERATIVE_SCAN))
+    if not gucs:
+        return None
+    q = "SELECT " + ", ".join("set_config(%s, %s, true)" for _ in gucs)
+    return q, [v for pair in gucs for v in pair]
+
+
+def _hits(rows: List[tuple], with_embeddings: bool) -> List[Dict]:
+    hits = [
+        {"id": r[0], "text": r[1], "meta": r[2], "score": float(r[3]), "document_id": r[4]}
+        for r in rows
     ]
+    if with_embeddings:
+        from app.infra.rerank import parse_vector
+
+        for h, r in zip(hits, rows):
+            h["embedding"] = parse_vector(r[5])
+    return hits
+
+
+async def ann_search(
+    question_embedding: List[float],
+    n_results: int,
+    filters: Optional[Dict[str, Optional[str]]] = None,
+    with_embeddings: bool = False,
+) -> List[Dict]:
+    """
+    ANN search over doc_chunk.embedding with optional exact-match filters
+    on meta JSONB (e.g. model_id, scene).
+    `filters` is a dict like {"model_id": "jet-engine-v1", "scene": "overview"}.
+    With with_embeddings each hit also carries its vector (float32 array)
+    under "embedding", for app.infra.rerank.
+
+    Models in VECTOR_TIER_MODELS are searched in-process
+    (app/infra/vector_tier.py), exactly; the rest, and those not exported
+    yet, in Postgres.
+    """
+    local = await vector_tier.search(question_embedding, n_results, filters, with_embeddings)
+    if local is not None:
+        return local
+
+    q, params = _ann_query(question_embedding, n_results, filters, with_embeddings)
+    tuning = _ann_tuning(n_results)
+
+    async with get_async_conn("ann_search") as conn, conn.cursor() as cur:
+        if tuning:
+            await cur.execute(*tuning)
+        await cur.execute(q, params)
+        rows = await cur.fetchall()
+    return _hits(rows, with_embeddings)
+
+
+async def ann_search_batch(
+    question_embeddings: List[List[float]],
+    n_results: int,
+    filters: Optional[Dict[str, Optional[str]]] = None,
+    with_embeddings: bool = False,
+) -> List[List[Dict]]:
+    """
+    ann_search for several query vectors with the same filters, hits per
+    query in input order. In-process for vector tier models (one matrix
+    product); otherwise one connection and one round trip, the queries
+    sent together in pipeline mode.
+    """
+    if not question_embeddings:
+        return []
+    local = await vector_tier.search_many(question_embeddings, n_results, filters, with_embeddings)
+    if local is not None:
+        return local
+
+    tuning = _ann_tuning(n_results)
+    async with get_async_conn("ann_search_batch") as conn:
+        async with conn.pipeline():
+            if tuning:
+                await conn.execute(*tuning)
+            cursors = []
+            for emb in question_embeddings:
+                cur = conn.cursor()
+                await cur.execute(*_ann_query(emb, n_results, filters, with_embeddings))
+                cursors.append(cur)
+            # the first fetch sends the sync: every query went in one round trip
+            results = [await cur.fetchall() for cur in cursors]
+    return [_hits(rows, with_embeddings) for rows in results]
 
 
 def delete_document(doc_id: str) -> int:
     q = "DELETE FROM document WHERE id = %s"
-    with get_conn() as conn, conn.cursor() as cur:
+    with get_conn("delete_document") as conn, conn.cursor() as cur:
         cur.execute(q, (doc_id,))
-        return cur.rowcount
+        n = cur.rowcount
+    vector_tier.drop_document(doc_id)
+    return n
@@ -0,0 +1,59 @@
+# app/infra/http_metrics.py
+"""
+Per-route request metrics as a pure ASGI middleware (no BaseHTTPMiddleware,
+so streaming responses are not buffered).
+
+Requests are labelled with the route template (/docs/jobs/{job_id}), never
+the raw path, to keep label cardinality bounded; unknown paths share
+route="unmatched". WebSockets and lifespan events pass straight through.
+"""
+
+import time
+from functools import lru_cache
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.infra.metrics import HTTP_ERRORS, HTTP_IN_FLIGHT, HTTP_REQUEST_SECONDS
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope["app"], method, scope["path"])
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(route)
+        in_flight.inc()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            HTTP_REQUEST_SECONDS.labels(method, route).observe(time.perf_counter() - t0)
+            if status >= 400:
+                HTTP_ERRORS.labels(method, route, str(status)).inc()
+
+
+@lru_cache(maxsize=4096)
+def route_template(app, method: str, path: str) -> str:
+    """Path template of the route serving (method, path), or "unmatched"."""
+    scope = {"type": "http", "method": method, "path": path}
+    for r in app.router.routes:
+        match, _ = r.matches(scope)
+        if match != Match.NONE:
+            return getattr(r, "path", path)
+    return "unmatched"
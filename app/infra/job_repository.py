@@ -0,0 +1,191 @@
+# app/infra/job_repository.py
+import uuid
+from typing import Any, Dict, Optional
+from psycopg.types.json import Jsonb
+from app.clients.postgres_client import get_async_conn
+
+_JOB_COLUMNS = """
+    id::text, status, filename, params, progress, result, error,
+    attempts, cancel_requested, created_at, updated_at
+"""
+
+
+class JobLost(Exception):
+    """The job was re-claimed by another worker (this one's heartbeat went stale)."""
+
+    def __init__(self, job_id: str):
+        super().__init__(f"ingest job {job_id} was claimed by another worker")
+        self.job_id = job_id
+
+
+def _row_to_job(row) -> Dict[str, Any]:
+    (jid, status, filename, params, progress, result, error,
+     attempts, cancel_requested, created_at, updated_at) = row
+    return {
+        "job_id": jid,
+        "status": status,
+        "filename": filename,
+        "params": params or {},
+        "progress": progress or {},
+        "result": result,
+        "error": error,
+        "attempts": attempts,
+        "cancel_requested": cancel_requested,
+        "created_at": created_at,
+        "updated_at": updated_at,
+    }
+
+
+async def create_job(file_path: str, filename: str | None, params: dict, spool_host: str | None) -> str:
+    """spool_host: where file_path lives; None when every host can read it."""
+    q = """
+    INSERT INTO ingest_job (file_path, filename, params, spool_host)
+    VALUES (%s, %s, %s, %s) RETURNING id::text
+    """
+    async with get_async_conn("create_job") as conn, conn.cursor() as cur:
+        await cur.execute(q, (file_path, filename, Jsonb(params), spool_host))
+        return (await cur.fetchone())[0]
+
+
+async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    q = f"SELECT {_JOB_COLUMNS} FROM ingest_job WHERE id = %s"
+    async with get_async_conn("get_job") as conn, conn.cursor() as cur:
+        await cur.execute(q, (job_id,))
+        row = await cur.fetchone()
+    return _row_to_job(row) if row else None
+
+
+async def claim_next_job(stale_after_s: float, max_attempts: int, host: str) -> Optional[Dict[str, Any]]:
+    """
+    Atomically take the oldest queued job, or a running job whose heartbeat
+    is older than stale_after_s (its worker died). Safe across processes;
+    only jobs spooled on host (or on shared storage) are taken.
+    Orphaned jobs that were cancelled or used up max_attempts are closed first.
+    Each claim gets a new claim_token; heartbeat(), finish_job() and
+    lock_claim() only succeed for the current one.
+    """
+    sweep = """
+    UPDATE ingest_job
+    SET status = CASE WHEN cancel_requested THEN 'cancelled' ELSE 'failed' END,
+        error = CASE WHEN cancel_requested THEN error
+                     ELSE 'worker lost; attempts exhausted' END,
+        updated_at = now()
+    WHERE status = 'running'
+      AND updated_at < now() - make_interval(secs => %s)
+      AND (cancel_requested OR attempts >= %s)
+    """
+    q = """
+    UPDATE ingest_job
+    SET status = 'running', attempts = attempts + 1, claim_token = %s, updated_at = now()
+    WHERE id = (
+        SELECT id FROM ingest_job
+        WHERE NOT cancel_requested
+          AND (spool_host IS NULL OR spool_host = %s)
+          AND (status = 'queued'
+               OR (status = 'running'
+                   AND updated_at < now() - make_interval(secs => %s)
+                   AND attempts < %s))
+        ORDER BY created_at
+        FOR UPDATE SKIP LOCKED
+        LIMIT 1
+    )
+    RETURNING id::text, claim_token::text, file_path, filename, params, attempts
+    """
+    async with get_async_conn("claim_next_job") as conn, conn.cursor() as cur:
+        await cur.execute(sweep, (stale_after_s, max_attempts))
+        await cur.execute(q, (str(uuid.uuid4()), host, stale_after_s, max_attempts))
+        row = await cur.fetchone()
+    if not row:
+        return None
+    jid, claim_token, file_path, filename, params, attempts = row
+    return {
+        "job_id": jid,
+        "claim_token": claim_token,
+        "file_path": file_path,
+        "filename": filename,
+        "params": params or {},
+        "attempts": attempts,
+    }
+
+
+async def heartbeat(job_id: str, claim_token: str, progress: dict) -> bool:
+    """
+    Persist progress, bump updated_at. Returns True if a cancel was requested;
+    raises JobLost if the job has been claimed again since.
+    """
+    q = """
+    UPDATE ingest_job SET progress = %s, updated_at = now()
+    WHERE id = %s AND claim_token = %s RETURNING cancel_requested
+    """
+    async with get_async_conn("heartbeat") as conn, conn.cursor() as cur:
+        await cur.execute(q, (Jsonb(progress), job_id, claim_token))
+        row = await cur.fetchone()
+    if row is None:
+        raise JobLost(job_id)
+    return bool(row[0])
+
+
+def lock_claim(cur, job_id: str, claim_token: str) -> None:
+    """
+    Inside the caller's transaction: row-lock the job while claim_token
+    still holds it, so it can't be re-claimed before that transaction
+    ends; raises JobLost (roll back) otherwise.
+    """
+    cur.execute(
+        "SELECT 1 FROM ingest_job WHERE id = %s AND claim_token = %s FOR UPDATE",
+        (job_id, claim_token),
+    )
+    if cur.fetchone() is None:
+        raise JobLost(job_id)
+
+
+async def finish_job(
+    job_id: str,
+    claim_token: str,
+    status: str,
+    progress: dict,
+    result: dict | None = None,
+    error: str | None = None,
+) -> None:
+    """Record the outcome; raises JobLost if the job has been claimed again since."""
+    q = """
+    UPDATE ingest_job
+    SET status = %s, progress = %s, result = %s, error = %s, updated_at = now()
+    WHERE id = %s AND claim_token = %s
+    """
+    async with get_async_conn("finish_job") as conn, conn.cursor() as cur:
+        await cur.execute(
+            q,
+            (status, Jsonb(progress), Jsonb(result) if result is not None else None, error,
+             job_id, claim_token),
+        )
+        if cur.rowcount == 0:
+            raise JobLost(job_id)
+
+
+async def spool_file_statuses(file_paths: list[str]) -> Dict[str, str]:
+    """Status of the job of each spooled file that has one."""
+    q = "SELECT file_path, status FROM ingest_job WHERE file_path = ANY(%s)"
+    async with get_async_conn("spool_file_statuses") as conn, conn.cursor() as cur:
+        await cur.execute(q, (file_paths,))
+        return {path: status for path, status in await cur.fetchall()}
+
+
+async def request_cancel(job_id: str) -> Optional[str]:
+    """
+    Flag a job for cancellation. Queued jobs are cancelled immediately;
+    running ones are stopped by their worker on its next heartbeat.
+    Returns the resulting status, or None if the job does not exist.
+    """
+    q = """
+    UPDATE ingest_job
+    SET cancel_requested = (status IN ('queued', 'running')),
+        status = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END,
+        updated_at = now()
+    WHERE id = %s
+    RETURNING status
+    """
+    async with get_async_conn("request_cancel") as conn, conn.cursor() as cur:
+        await cur.execute(q, (job_id,))
+        row = await cur.fetchone()
+    return row[0] if row else None
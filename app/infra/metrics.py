@@ -0,0 +1,211 @@
+# app/infra/metrics.py
+"""
+Process-wide Prometheus metrics. Served by GET /metrics.
+
+Ratios are left to PromQL, e.g.
+    TTS cache hit ratio:
+        sum(rate(tts_cache_requests_total{result="hit"}[5m]))
+          / sum(rate(tts_cache_requests_total[5m]))
+    QA coalescing ratio:
+        sum(rate(singleflight_calls_total{flight="qa",role="coalesced"}[5m]))
+          / sum(rate(singleflight_calls_total{flight="qa"}[5m]))
+    Share of QA time spent in the LLM:
+        rate(pipeline_stage_seconds_sum{pipeline="qa",stage="llm"}[5m])
+          / rate(pipeline_stage_seconds_sum{pipeline="qa",stage="total"}[5m])
+    Estimated upstream spend per endpoint, USD/hour:
+        sum by (endpoint) (rate(upstream_cost_usd_total[1h])) * 3600
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+# request/stage latencies: 5 ms .. 60 s
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+TTS_CACHE_REQUESTS = Counter(
+    "tts_cache_requests_total",
+    "TTS cache lookups by result (hit/miss).",
+    ["result"],
+)
+TTS_CACHE_BYTES = Gauge("tts_cache_bytes", "Bytes currently stored in the TTS cache.")
+TTS_CACHE_ENTRIES = Gauge("tts_cache_entries", "Entries currently stored in the TTS cache.")
+TTS_CACHE_EVICTIONS = Counter("tts_cache_evictions_total", "Entries evicted from the TTS cache.")
+
+_BYTE_BUCKETS = (4e3, 16e3, 64e3, 256e3, 1e6, 4e6, 16e6)
+
+AUDIO_INGRESS_BYTES = Histogram(
+    "audio_ingress_bytes",
+    "Audio payload size received from the client.",
+    buckets=_BYTE_BUCKETS,
+)
+AUDIO_UPSTREAM_BYTES = Histogram(
+    "audio_upstream_bytes",
+    "Audio payload size sent to Whisper after normalization.",
+    buckets=_BYTE_BUCKETS,
+)
+WHISPER_LATENCY_SECONDS = Histogram(
+    "whisper_latency_seconds",
+    "Whisper transcription round-trip time.",
+)
+
+RETRIEVAL_STAGE_DROPPED = Counter(
+    "retrieval_stage_dropped_total",
+    "Retrieval stages that missed their deadline; the answer used partial results.",
+    ["stage"],
+)
+RETRIEVAL_HEDGES = Counter(
+    "retrieval_hedged_requests_total",
+    "Duplicate (hedged) requests fired after a stage exceeded its p95.",
+    ["stage"],
+)
+
+SINGLEFLIGHT_CALLS = Counter(
+    "singleflight_calls_total",
+    "Coalesced work: 'leader' ran the computation, 'coalesced' shared a leader's result.",
+    ["flight", "role"],
+)
+
+OPENAI_REQUESTS = Counter(
+    "openai_requests_total",
+    "OpenAI calls through the gateway by kind, model and final outcome.",
+    ["kind", "model", "outcome"],
+)
+OPENAI_RETRIES = Counter(
+    "openai_retries_total",
+    "OpenAI retries by kind and upstream status (429, 5xx, conn).",
+    ["kind", "status"],
+)
+OPENAI_QUEUE_WAIT_SECONDS = Histogram(
+    "openai_queue_wait_seconds",
+    "Time spent waiting for a gateway admission slot, by priority.",
+    ["priority"],
+)
+
+OPENAI_REQUEST_SECONDS = Histogram(
+    "openai_request_seconds",
+    "OpenAI round-trip time per attempt (excludes gateway queueing), by kind and model.",
+    ["kind", "model"],
+    buckets=_LATENCY_BUCKETS,
+)
+OPENAI_IN_FLIGHT = Gauge("openai_in_flight", "Gateway admission slots in use.")
+OPENAI_WAITING = Gauge("openai_waiting", "Calls queued for a gateway admission slot.")
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Manager cache lookups by namespace and result (hit/miss/waited/error); "
+    "'waited' was filled by another worker while this one held back.",
+    ["namespace", "result"],
+)
+CACHE_BYTES = Gauge("cache_bytes", "Bytes held by the memory/shm cache backend (shm: as of the last sweep).")
+VECTOR_TIER_QUERIES = Counter(
+    "vector_tier_queries_total",
+    "ann_search calls for a VECTOR_TIER_MODELS model: 'local' answered from the mapped export, "
+    "'cold' sent to pgvector while the model is not exported.",
+    ["result"],
+)
+VECTOR_TIER_ROWS = Gauge("vector_tier_rows", "Chunks in the mapped vector tier export, by model.", ["model_id"])
+
+USAGE_TOKENS = Counter(
+    "upstream_tokens_total",
+    "Upstream tokens reported by OpenAI, by endpoint, model and direction (input/output).",
+    ["endpoint", "model", "direction"],
+)
+USAGE_AUDIO_SECONDS = Counter(
+    "upstream_audio_seconds_total",
+    "Audio seconds sent for transcription, by endpoint and model.",
+    ["endpoint", "model"],
+)
+USAGE_COST = Counter(
+    "upstream_cost_usd_total",
+    "Estimated upstream cost in USD (USAGE_PRICES_USD), by endpoint and model.",
+    ["endpoint", "model"],
+)
+USAGE_BUDGET_DOWNGRADES = Counter(
+    "usage_budget_downgrades_total",
+    "Requests run in a degraded mode because a usage budget was (nearly) spent.",
+    ["endpoint", "mode"],
+)
+USAGE_EVENTS_DROPPED = Counter(
+    "usage_events_dropped_total",
+    "Usage events dropped because the queue to Postgres was full.",
+)
+
+# ---------- pipelines ----------
+
+QA_CONTEXT_TOKENS = Histogram(
+    "qa_context_tokens",
+    "QA prompt context size in LLM tokens: 'packed' as sent, 'baseline' as every fused hit verbatim.",
+    ["kind"],
+    buckets=(100, 250, 500, 1000, 1500, 2000, 3000, 4000, 6000),
+)
+QA_CONTEXT_TOKENS_SAVED = Counter(
+    "qa_context_tokens_saved_total",
+    "Prompt tokens saved by context packing (merging, dedup and the token budget).",
+)
+
+STAGE_SECONDS = Histogram(
+    "pipeline_stage_seconds",
+    "Wall time of one pipeline stage (qa, actions, quiz, ingest); stage='total' is the whole run.",
+    ["pipeline", "stage"],
+    buckets=_LATENCY_BUCKETS,
+)
+
+# ---------- datastores ----------
+
+POSTGRES_SECONDS = Histogram(
+    "postgres_query_seconds",
+    "Postgres connection use (connect + queries + commit), by repository function.",
+    ["query"],
+    buckets=_LATENCY_BUCKETS,
+)
+POSTGRES_CONNECTIONS = Gauge("postgres_connections_open", "Open Postgres connections.", ["mode"])
+NEO4J_SECONDS = Histogram(
+    "neo4j_query_seconds",
+    "Neo4j query time including result streaming, by caller.",
+    ["query"],
+    buckets=_LATENCY_BUCKETS,
+)
+NEO4J_SESSIONS = Gauge("neo4j_sessions_open", "Open Neo4j sessions.")
+UPSTREAM_ERRORS = Counter(
+    "upstream_errors_total",
+    "Failed Postgres/Neo4j calls by caller.",
+    ["upstream", "query"],
+)
+
+CIRCUIT_STATE = Gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state per dependency: 0 closed, 1 half-open, 2 open.",
+    ["dependency"],
+)
+CIRCUIT_REJECTED = Counter(
+    "circuit_breaker_rejected_total",
+    "Calls failed fast because the dependency's breaker was open.",
+    ["dependency"],
+)
+HEALTH_PROBE_SECONDS = Histogram(
+    "health_probe_seconds",
+    "Background health probe latency per dependency (failures included).",
+    ["dependency"],
+    buckets=_LATENCY_BUCKETS,
+)
+
+INGEST_JOBS_RUNNING = Gauge("ingest_jobs_running", "Ingest jobs currently being processed by this process.")
+
+STARTUP_SECONDS = Gauge(
+    "startup_seconds",
+    "Cold-start time per phase (import, lifespan steps, background client warm-up).",
+    ["phase"],
+)
+
+# ---------- HTTP ----------
+
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being handled, by route.", ["route"])
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds",
+    "Request latency by method and route template.",
+    ["method", "route"],
+    buckets=_LATENCY_BUCKETS,
+)
+HTTP_ERRORS = Counter(
+    "http_errors_total",
+    "Responses with status >= 400 (or unhandled exceptions as 500), by route.",
+    ["method", "route", "status"],
+)
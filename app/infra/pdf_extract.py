@@ -0,0 +1,108 @@
+# app/infra/pdf_extract.py
+"""
+Parallel PDF text extraction.
+
+pypdf's extract_text() is pure Python and CPU-bound, so pages are split into
+ranges of PDF_EXTRACT_PAGES_PER_TASK and farmed out to a process pool. Each
+worker opens the file itself and returns plain strings; only the path and
+two ints cross the process boundary on the way in.
+
+    for page_no, text in iter_page_texts(path):
+        ...   # pages arrive in order, as soon as their range is done
+
+PDFs shorter than PDF_EXTRACT_MIN_PAGES are extracted in-process: pool
+round-trips cost more than they save there. pypdf itself is imported on
+first use, not with the app.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from app.config.settings import settings
+
+
+def _reader(file_path: str):
+    from pypdf import PdfReader  # ~0.1 s import, only paid by ingest
+    return PdfReader(file_path)
+
+
+def _extract_range(file_path: str, start: int, end: int) -> List[str]:
+    """Worker entry point: texts of pages [start, end) (0-based)."""
+    reader = _reader(file_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def default_workers() -> int:
+    return settings.PDF_EXTRACT_WORKERS or os.cpu_count() or 1
+
+
+# ---------- shared pool ----------
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the parent runs an event loop and thread pools
+            _pool = ProcessPoolExecutor(
+                max_workers=default_workers(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+# ---------- extraction ----------
+
+def read_metadata(file_path: str) -> Tuple[Optional[str], int]:
+    """(title, page_count) without extracting any text."""
+    reader = _reader(file_path)
+    title = reader.metadata.title if reader.metadata else None
+    return title, len(reader.pages)
+
+
+def iter_page_texts(
+    file_path: str,
+    page_count: int,
+    executor: Optional[Executor] = None,
+    pages_per_task: Optional[int] = None,
+) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page_no, raw_text) for every page, 1-based and in page order.
+    Blocking; run it in a thread when called from async code.
+    """
+    step = pages_per_task or settings.PDF_EXTRACT_PAGES_PER_TASK
+
+    if executor is None and page_count < settings.PDF_EXTRACT_MIN_PAGES:
+        reader = _reader(file_path)
+        for i, page in enumerate(reader.pages):
+            yield i + 1, page.extract_text() or ""
+        return
+
+    pool = executor or _get_pool()
+    futures = [
+        (start, pool.submit(_extract_range, file_path, start, min(start + step, page_count)))
+        for start in range(0, page_count, step)
+    ]
+    try:
+        # every range is already queued; waiting in order only delays the
+        # consumer until the next range it needs is ready
+        for start, fut in futures:
+            for offset, text in enumerate(fut.result()):
+                yield start + offset + 1, text
+    finally:
+        for _, fut in futures:
+            fut.cancel()
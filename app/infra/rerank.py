@@ -0,0 +1,137 @@
+# app/infra/rerank.py
+"""
+In-process re-ranking of over-fetched ANN candidates.
+
+    hits = await ann_search(q_emb, n_results=settings.RERANK_CANDIDATES, with_embeddings=True)
+    top = rerank(hits, q_emb, k=settings.TOP_K_CHROMA, part="Fan Blades")
+
+HNSW returns an approximate candidate set; here the candidates are scored
+again with vectorized NumPy:
+
+  relevance  exact cosine(question, chunk), plus RERANK_PART_BOOST when
+             the chunk is about the resolved part and RERANK_SCENE_BOOST
+             when it is about the requested scene. Ingested PDF chunks
+             carry no part or scene in their meta, so "about" means the
+             name occurs in the chunk text as whole words (any case,
+             any whitespace); chunks tagged with meta.part_name (a name or
+             a list of names, the key idx_doc_chunk_meta_part indexes) or
+             meta.scene match on the tag as well
+  MMR        picks k of them greedily by
+             lambda * relevance - (1 - lambda) * max cosine to a picked chunk
+
+Without embeddings (RERANK_FETCH_EMBEDDINGS off) the SQL score is used as
+the cosine and MMR degrades to boosted relevance order. Each returned hit
+gets "score" (exact cosine) and "rerank" (its MMR score, non-increasing in
+pick order, which _rrf ranks by); the raw vectors are dropped. numpy is
+imported on first use, not with the app. scripts/bench_rerank.py measures
+the per-request cost.
+"""
+
+import re
+from typing import TYPE_CHECKING, Dict, List, Optional, Pattern, Sequence
+
+from app.config.settings import settings
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def parse_vector(data: bytes) -> "np.ndarray":
+    """pgvector's binary form (vector_send): int16 dim, int16 unused, dim float4 big-endian."""
+    import numpy as np
+
+    return np.frombuffer(data, dtype=">f4", offset=4).astype(np.float32)
+
+
+def _mention(value: Optional[str]) -> Optional[Pattern[str]]:
+    """
+    Pattern for value, as words, in lowercased chunk text. It starts with a
+    literal so the regex engine can skip ahead; a leading (?<!\\w) costs ~25x
+    more per chunk, so _mentions checks the left word boundary itself.
+    """
+    words = (value or "").lower().split()
+    if not words:
+        return None
+    return re.compile(r"\s+".join(map(re.escape, words)) + r"(?!\w)")
+
+
+def _mentions(text: str, mention: Pattern[str]) -> bool:
+    for m in mention.finditer(text):
+        i = m.start()
+        if i == 0 or not (text[i - 1].isalnum() or text[i - 1] == "_"):
+            return True
+    return False
+
+
+def _matches(meta: Dict, text: str, key: str, value: Optional[str], mention: Optional[Pattern[str]]) -> bool:
+    if not value:
+        return False
+    got = meta.get(key)
+    if isinstance(got, list):
+        if any(isinstance(g, str) and g.lower() == value.lower() for g in got):
+            return True
+    elif isinstance(got, str) and got.lower() == value.lower():
+        return True
+    return mention is not None and _mentions(text, mention)
+
+
+def rerank(
+    hits: Sequence[Dict],
+    query_embedding: Sequence[float],
+    k: int,
+    part: Optional[str] = None,
+    scene: Optional[str] = None,
+    lam: Optional[float] = None,
+) -> List[Dict]:
+    """Top k hits by MMR over boosted exact cosine; see the module docstring."""
+    import numpy as np
+
+    if not hits:
+        return []
+    lam = settings.RERANK_MMR_LAMBDA if lam is None else lam
+    n = len(hits)
+
+    boost = np.zeros(n, dtype=np.float32)
+    part_re, scene_re = _mention(part), _mention(scene)
+    for i, h in enumerate(hits):
+        meta = h.get("meta") or {}
+        text = (h.get("text") or "").lower() if part_re or scene_re else ""
+        if _matches(meta, text, "part_name", part, part_re):
+            boost[i] += settings.RERANK_PART_BOOST
+        if _matches(meta, text, "scene", scene, scene_re):
+            boost[i] += settings.RERANK_SCENE_BOOST
+
+    if all(h.get("embedding") is not None for h in hits):
+        E = np.stack([h["embedding"] for h in hits]).astype(np.float32, copy=False)
+        E /= np.maximum(np.linalg.norm(E, axis=1, keepdims=True), 1e-12)
+        q = np.array(query_embedding, dtype=np.float32)
+        q /= max(float(np.linalg.norm(q)), 1e-12)
+        cosine = E @ q
+    else:
+        E = None
+        cosine = np.array([h["score"] for h in hits], dtype=np.float32)
+
+    relevance = cosine + boost
+    picked: List[int] = []
+    scores: List[float] = []
+    available = np.ones(n, dtype=bool)
+    redundancy = np.zeros(n, dtype=np.float32)
+    for _ in range(min(k, n)):
+        mmr = lam * relevance - (1.0 - lam) * redundancy if E is not None else relevance
+        i = int(np.argmax(np.where(available, mmr, -np.inf)))
+        picked.append(i)
+        scores.append(float(mmr[i]))
+        available[i] = False
+        if E is not None:
+            # one mat-vec per pick: k*n work instead of the full n*n similarity matrix
+            np.maximum(redundancy, E @ E[i], out=redundancy)
+
+    out: List[Dict] = []
+    prev = float("inf")
+    for i, s in zip(picked, scores):
+        h = {key: v for key, v in hits[i].items() if key != "embedding"}
+        h["score"] = float(cosine[i])
+        prev = min(prev, s)
+        h["rerank"] = prev
+        out.append(h)
+    return out
@@ -0,0 +1,52 @@
+# app/infra/singleflight.py
+"""
+Request coalescing: concurrent callers with the same key share one
+in-flight computation and all receive its result (or its exception).
+
+The shared task is shielded from any single caller's cancellation and is
+only cancelled once every waiter has gone away (e.g. voice barge-in when
+nobody else asked the same question).
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+from app.infra.metrics import SINGLEFLIGHT_CALLS
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _t, k=key, c=call: self._forget(k, c))
+            SINGLEFLIGHT_CALLS.labels(self.name, "leader").inc()
+        else:
+            SINGLEFLIGHT_CALLS.labels(self.name, "coalesced").inc()
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
@@ -0,0 +1,156 @@
+# app/infra/slow_queries.py
+"""
+Slow-query log for Postgres and Neo4j.
+
+Statements slower than SLOW_QUERY_MS are appended to SLOW_QUERY_LOG (JSONL)
+with sanitized parameters, row count and the trace/span id they ran under.
+At most once per statement every SLOW_QUERY_PLAN_INTERVAL_S the entry also
+carries the query plan (SLOW_QUERY_PLAN):
+
+  explain   EXPLAIN (FORMAT JSON) / Cypher EXPLAIN; nothing is executed again
+  profile   EXPLAIN (ANALYZE, BUFFERS) / Cypher PROFILE for read-only
+            statements (writes fall back to explain); re-runs the query
+  off       no plans
+
+SQL plans are taken on the same connection inside a rolled-back savepoint,
+so transaction-local settings (e.g. hnsw.ef_search) still apply. Cypher
+plans are taken in the background on a fresh session.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, Optional, Set
+
+import psycopg
+
+from app.config.settings import settings
+from app.infra.tracing import current_span, sanitize, statement
+
+log = logging.getLogger(__name__)
+
+_SQL_EXPLAINABLE_RE = re.compile(r"^\s*(select|with|insert|update|delete)\b", re.I)
+_SQL_READ_ONLY_RE = re.compile(r"^\s*(select|with)\b(?!.*\b(insert|update|delete)\b)", re.I | re.S)
+_CYPHER_WRITE_RE = re.compile(r"\b(create|merge|set|delete|remove|detach|call)\b", re.I)
+
+_lock = threading.Lock()
+_last_plan: Dict[str, float] = {}
+_background: Set[asyncio.Task] = set()
+
+
+def is_slow(seconds: float) -> bool:
+    return settings.SLOW_QUERY_MS > 0 and seconds * 1000.0 >= settings.SLOW_QUERY_MS
+
+
+def _plan_due(system: str, text: str) -> bool:
+    if settings.SLOW_QUERY_PLAN == "off":
+        return False
+    key = hashlib.sha1(f"{system}\0{text}".encode()).hexdigest()
+    now = time.monotonic()
+    with _lock:
+        if now - _last_plan.get(key, float("-inf")) < settings.SLOW_QUERY_PLAN_INTERVAL_S:
+            return False
+        _last_plan[key] = now
+    return True
+
+
+def record(
+    system: str,
+    query: str,
+    text: str,
+    params: Any,
+    seconds: float,
+    rows: Optional[int],
+    plan: Any = None,
+    trace: Optional[Dict[str, str]] = None,
+) -> None:
+    """Append one slow statement to the log (and a one-line warning)."""
+    sp = current_span()
+    entry = {
+        "ts": time.time(),
+        "system": system,
+        "query": query,
+        "ms": round(seconds * 1000.0, 1),
+        "rows": rows,
+        "statement": statement(text),
+        "params": sanitize(params),
+        "trace_id": (trace or {}).get("trace_id") or (sp.trace_id if sp.sampled else None),
+        "span_id": (trace or {}).get("span_id") or (sp.span_id if sp.sampled else None),
+        "plan": plan,
+    }
+    log.warning("slow %s query %s: %.0f ms", system, query, seconds * 1000.0)
+    line = json.dumps(entry, default=str)
+    with _lock:
+        try:
+            with open(settings.SLOW_QUERY_LOG, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError:
+            log.exception("slow-query log write failed")
+
+
+# ---------- Postgres ----------
+
+def _sql_explain(text: str) -> Optional[str]:
+    if not _SQL_EXPLAINABLE_RE.match(text):
+        return None
+    if settings.SLOW_QUERY_PLAN == "profile" and _SQL_READ_ONLY_RE.match(text):
+        return "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + text
+    return "EXPLAIN (FORMAT JSON) " + text
+
+
+def sql_plan(conn: psycopg.Connection, text: str, params: Any) -> Any:
+    """Plan of a slow statement, or None when not due / not explainable."""
+    explain = _sql_explain(text)
+    if explain is None or not _plan_due("postgres", text):
+        return None
+    try:
+        with conn.transaction(force_rollback=True), psycopg.Cursor(conn) as cur:
+            cur.execute(explain, params)
+            return cur.fetchone()[0]
+    except Exception as e:
+        return {"error": str(e)}
+
+
+async def sql_plan_async(conn: psycopg.AsyncConnection, text: str, params: Any) -> Any:
+    explain = _sql_explain(text)
+    if explain is None or not _plan_due("postgres", text):
+        return None
+    try:
+        async with conn.transaction(force_rollback=True), psycopg.AsyncCursor(conn) as cur:
+            await cur.execute(explain, params)
+            return (await cur.fetchone())[0]
+    except Exception as e:
+        return {"error": str(e)}
+
+
+# ---------- Neo4j ----------
+
+def record_cypher(driver, database: Optional[str], query: str, text: str, params: dict,
+                  seconds: float, rows: int) -> None:
+    """Log a slow Cypher statement; its plan, when due, is fetched in the background."""
+    if not _plan_due("neo4j", text):
+        record("neo4j", query, text, params, seconds, rows)
+        return
+
+    sp = current_span()
+    trace = {"trace_id": sp.trace_id, "span_id": sp.span_id} if sp.sampled else None
+    profile = settings.SLOW_QUERY_PLAN == "profile" and not _CYPHER_WRITE_RE.search(text)
+
+    async def capture() -> None:
+        plan: Any
+        try:
+            async with driver.session(database=database) as session:
+                result = await session.run(("PROFILE " if profile else "EXPLAIN ") + text, params)
+                summary = await result.consume()
+                plan = summary.profile if profile else summary.plan
+        except Exception as e:
+            plan = {"error": str(e)}
+        record("neo4j", query, text, params, seconds, rows, plan=plan, trace=trace)
+
+    task = asyncio.get_running_loop().create_task(capture())
+    _background.add(task)
+    task.add_done_callback(_background.discard)
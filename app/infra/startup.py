@@ -0,0 +1,105 @@
+# app/infra/startup.py
+"""
+Cold-start bookkeeping. Imported first by app/main.py, so the clock starts
+before any other app module (or FastAPI) is loaded.
+
+    import      everything app/main.py pulls in at import time
+    <phase>     each lifespan step, timed with `with startup.phase("..."):`
+    warm_up.*   background client construction (OpenAI SDK, Neo4j driver),
+                the QA context tokenizer, numpy and the vector tier
+                exports; runs after the app is serving, never blocks
+                startup
+
+Each phase is logged once at startup, exported as startup_seconds{phase}
+and kept in `report`. For a per-module import breakdown
+run scripts/bench_cold_start.py --profile.
+"""
+
+import asyncio
+import importlib
+import logging
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Iterator, Optional
+
+_t0 = time.perf_counter()
+
+log = logging.getLogger(__name__)
+
+report: Dict[str, float] = {}  # phase -> seconds
+_warm_task: Optional[asyncio.Task] = None
+
+
+def _record(name: str, seconds: float) -> None:
+    from app.infra.metrics import STARTUP_SECONDS
+
+    report[name] = seconds
+    STARTUP_SECONDS.labels(name).set(seconds)
+
+
+def mark_imported() -> None:
+    """Called at the end of app/main.py: total import time of the app."""
+    _record("import", time.perf_counter() - _t0)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - t0)
+
+
+def ready() -> None:
+    """End of lifespan startup: log the breakdown."""
+    _record("total", time.perf_counter() - _t0)
+    log.info(
+        "startup: %s",
+        ", ".join(f"{name} {seconds * 1000.0:.0f} ms" for name, seconds in report.items()),
+    )
+
+
+# ---------- background warm-up ----------
+
+async def _warm(name: str, fn: Callable[[], Awaitable[object]]) -> None:
+    t0 = time.perf_counter()
+    try:
+        await fn()
+    except Exception as e:
+        # the dependency may simply be down; first use (or the health monitor) retries
+        log.warning("startup: warm-up of %s failed: %s", name, e)
+        return
+    _record(f"warm_up.{name}", time.perf_counter() - t0)
+
+
+def start_warm_up() -> None:
+    """Build the upstream clients in the background so the first request doesn't."""
+    global _warm_task
+    from app.clients.neo4j_client import neo4j_client
+    from app.clients.openai_client import gateway
+    from app.config.settings import settings
+    from app.infra.chunking import encoding
+    from app.infra.vector_tier import vector_tier
+
+    async def run() -> None:
+        await asyncio.gather(
+            _warm("openai", gateway.warm_up),
+            _warm("neo4j", neo4j_client.warm_up),
+            # context packing counts LLM tokens; the BPE file may have to be downloaded
+            _warm("tiktoken", lambda: asyncio.to_thread(encoding, settings.LLM_MODEL)),
+            # re-ranking runs on numpy; ~100 ms of import better spent here than in a request
+            _warm("numpy", lambda: asyncio.to_thread(importlib.import_module, "numpy")),
+            # map (or export) the hot models' vectors before their first question
+            _warm("vector_tier", vector_tier.warm_up),
+        )
+
+    _warm_task = asyncio.create_task(run())
+
+
+async def stop_warm_up() -> None:
+    global _warm_task
+    if _warm_task is not None:
+        _warm_task.cancel()
+        await asyncio.gather(_warm_task, return_exceptions=True)
+        _warm_task = None
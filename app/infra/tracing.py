@@ -0,0 +1,298 @@
+# app/infra/tracing.py
+"""
+Lightweight request tracing with a local JSONL exporter.
+
+    with span("graph.get_part_context", part=part_name) as sp:
+        recs = await ...
+        sp.set("rows", len(recs))
+
+    @traced("qa.ask_hybrid")
+    async def ask_hybrid(...): ...
+
+The current span lives in a ContextVar, so children nest correctly across
+awaits, asyncio tasks and asyncio.to_thread. Trace and span ids follow W3C
+trace context: an incoming `traceparent` header continues the caller's
+trace, and the response carries the traceparent of our root span.
+
+Finished spans are appended to TRACE_FILE, one JSON object per line:
+    {"trace_id", "span_id", "parent_id", "name", "start_ns",
+     "duration_ms", "status", "attributes"}
+No collector is needed; scripts/trace_view.py prints the slowest traces as
+trees. With TRACING_ENABLED off, span() returns a shared no-op span and
+touches nothing else.
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config.settings import settings
+from app.infra.http_metrics import route_template
+
+log = logging.getLogger(__name__)
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "sampled", "start_ns", "attrs", "status")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.attrs: Dict[str, Any] = {}
+        self.status = "ok"
+
+    def set(self, key: str, value: Any) -> None:
+        if self.sampled:
+            self.attrs[key] = value
+
+    def error(self, exc: BaseException) -> None:
+        if self.sampled:
+            self.status = "cancelled" if isinstance(exc, asyncio.CancelledError) else "error"
+            self.attrs["error"] = " ".join(f"{type(exc).__name__}: {exc}".split())[: settings.TRACE_MAX_ATTR_CHARS]
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+_NOOP = Span("noop", "0" * 32, None, False)
+_current: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+
+
+def current_span() -> Span:
+    """The active span, or a no-op span outside any trace."""
+    return _current.get() or _NOOP
+
+
+# ---------- exporter ----------
+
+class _FileExporter:
+    """Appends finished spans to a JSONL file; safe to call from worker threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._file = None
+        self._last_flush = 0.0
+
+    def export(self, sp: Span, end_ns: int) -> None:
+        line = json.dumps({
+            "trace_id": sp.trace_id,
+            "span_id": sp.span_id,
+            "parent_id": sp.parent_id,
+            "name": sp.name,
+            "start_ns": sp.start_ns,
+            "duration_ms": round((end_ns - sp.start_ns) / 1e6, 3),
+            "status": sp.status,
+            "attributes": sp.attrs,
+        }, default=str)
+        with self._lock:
+            if self._file is None:
+                self._file = open(settings.TRACE_FILE, "a", encoding="utf-8", buffering=1 << 16)
+            self._file.write(line + "\n")
+            now = time.monotonic()
+            if now - self._last_flush >= settings.TRACE_FLUSH_S:
+                self._file.flush()
+                self._last_flush = now
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_exporter = _FileExporter()
+
+
+def shutdown() -> None:
+    _exporter.close()
+
+
+# ---------- spans ----------
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace_id, parent_span_id, sampled) from a W3C traceparent header."""
+    if not header:
+        return None
+    m = _TRACEPARENT_RE.match(header.strip().lower())
+    if not m or m.group(1) == "0" * 32:
+        return None
+    return m.group(1), m.group(2), bool(int(m.group(3), 16) & 1)
+
+
+@contextmanager
+def span(name: str, *, traceparent: Optional[str] = None, **attrs: Any) -> Iterator[Span]:
+    """
+    Open a child of the current span (or a new root). Exceptions mark the
+    span as failed and propagate. `traceparent` only applies to roots.
+    """
+    if not settings.TRACING_ENABLED:
+        yield _NOOP
+        return
+
+    parent = _current.get()
+    if parent is not None:
+        if not parent.sampled:
+            yield parent  # unsampled trace: children are free
+            return
+        sp = Span(name, parent.trace_id, parent.span_id, True)
+    else:
+        remote = parse_traceparent(traceparent)
+        if remote:
+            sp = Span(name, remote[0], remote[1], remote[2])
+        else:
+            sampled = random.random() < settings.TRACE_SAMPLE_RATE
+            sp = Span(name, os.urandom(16).hex(), None, sampled)
+
+    if sp.sampled and attrs:
+        sp.attrs.update(attrs)
+    token = _current.set(sp)
+    try:
+        yield sp
+    except BaseException as e:
+        sp.error(e)
+        raise
+    finally:
+        _current.reset(token)
+        if sp.sampled:
+            try:
+                _exporter.export(sp, time.time_ns())
+            except OSError:
+                log.exception("trace export failed")
+
+
+def traced(name: str):
+    """Decorator: run an async function inside span(name)."""
+    def deco(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+# ---------- HTTP ----------
+
+class TracingMiddleware:
+    """Root span per HTTP request, named "<METHOD> <route template>"."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope["app"], method, scope["path"])
+        incoming = next((v for k, v in scope["headers"] if k == b"traceparent"), None)
+        status = 500
+        sizes = {"in": 0, "out": 0}
+
+        with span(
+            f"{method} {route}",
+            traceparent=incoming.decode("latin-1") if incoming else None,
+            **{"http.method": method, "http.route": route, "http.target": scope["path"]},
+        ) as sp:
+            async def receive_wrapper() -> Message:
+                message = await receive()
+                if message["type"] == "http.request":
+                    sizes["in"] += len(message.get("body", b""))
+                return message
+
+            async def send_wrapper(message: Message) -> None:
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    if sp.sampled:
+                        headers = list(message.get("headers", []))
+                        headers.append((b"traceparent", sp.traceparent.encode()))
+                        message = {**message, "headers": headers}
+                elif message["type"] == "http.response.body":
+                    sizes["out"] += len(message.get("body", b""))
+                await send(message)
+
+            try:
+                await self.app(scope, receive_wrapper, send_wrapper)
+            finally:
+                sp.set("http.status_code", status)
+                sp.set("http.request_bytes", sizes["in"])
+                sp.set("http.response_bytes", sizes["out"])
+                if status >= 500:
+                    sp.status = "error"
+
+
+# ---------- attribute sanitizing ----------
+
+_SECRET_KEY_RE = re.compile(r"pass|secret|token|key|auth", re.I)
+_WS_RE = re.compile(r"\s+")
+
+
+def statement(text: str) -> str:
+    """Query text for a span attribute: whitespace collapsed, truncated."""
+    text = _WS_RE.sub(" ", text).strip()
+    limit = settings.TRACE_MAX_ATTR_CHARS * 4
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def sanitize(value: Any, key: str = "") -> Any:
+    """
+    Make query parameters safe and small enough to log: secrets redacted,
+    embeddings and blobs summarized, long strings truncated.
+    """
+    if key and _SECRET_KEY_RE.search(key):
+        return "<redacted>"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<bytes n={len(value)}>"
+    if isinstance(value, str):
+        limit = settings.TRACE_MAX_ATTR_CHARS
+        return value if len(value) <= limit else value[:limit] + "..."
+    if isinstance(value, dict):
+        return {str(k): sanitize(v, str(k)) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        if len(value) > 16 and all(isinstance(v, float) for v in value[:16]):
+            return f"<vector dim={len(value)}>"
+        out = [sanitize(v) for v in value[:16]]
+        if len(value) > 16:
+            out.append(f"<+{len(value) - 16} more>")
+        return out
+    if value is None or isinstance(value, (int, float, bool)):
+        return value
+    return sanitize(str(value))
+
+
+def approx_size(value: Any, _depth: int = 0) -> int:
+    """Rough payload size in bytes (UTF-8 text, 8 bytes per scalar)."""
+    if isinstance(value, str):
+        return len(value.encode("utf-8", "ignore"))
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if _depth > 4:
+        return 8
+    if isinstance(value, dict):
+        return sum(approx_size(k, _depth + 1) + approx_size(v, _depth + 1) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(approx_size(v, _depth + 1) for v in value)
+    if hasattr(value, "items"):  # neo4j Record / Node
+        return approx_size(dict(value.items()), _depth + 1)
+    return 8
@@ -0,0 +1,149 @@
+# app/infra/tts_cache.py
+
+import hashlib
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from app.config.settings import settings
+from app.infra.metrics import (
+    TTS_CACHE_REQUESTS,
+    TTS_CACHE_BYTES,
+    TTS_CACHE_ENTRIES,
+    TTS_CACHE_EVICTIONS,
+)
+
+
+class TTSCache:
+    """
+    Content-addressed on-disk store for synthesized audio.
+
+    - key = sha256(model, voice, format, text); the file name is the key
+    - in-memory index (OrderedDict) kept in LRU order, rebuilt from the
+      directory on startup (oldest mtime first)
+    - size-bounded: least recently used files are evicted past max_bytes
+    - reads go through mmap so callers can slice without copying
+    - every worker keeps its own index over the shared directory, so a
+      file may be evicted by another worker: get() checks it is there, and
+      open() drops the entry and raises FileNotFoundError if it is gone
+    - the directory is created and indexed on first use, not at import
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._loaded = False
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                os.makedirs(self.root, exist_ok=True)
+                self._load_index()
+                self._loaded = True
+
+    @staticmethod
+    def key(text: str, voice: str, model: str, fmt: str) -> str:
+        h = hashlib.sha256()
+        for part in (model, voice, fmt, text):
+            h.update(part.encode("utf-8"))
+            h.update(b"\x00")
+        return h.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def _load_index(self) -> None:
+        entries = []
+        for name in os.listdir(self.root):
+            if name.endswith(".tmp"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.root, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, name, st.st_size))
+        for _, name, size in sorted(entries):
+            self._index[name] = size
+            self._total += size
+        self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        TTS_CACHE_BYTES.set(self._total)
+        TTS_CACHE_ENTRIES.set(len(self._index))
+
+    def _drop(self, key: str) -> None:
+        self._total -= self._index.pop(key, 0)
+        self._update_gauges()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the file path for key (and mark it recently used), or None."""
+        self._ensure_loaded()
+        path = self.path(key)
+        with self._lock:
+            if key in self._index and not os.path.exists(path):
+                self._drop(key)  # evicted by another worker
+            if key not in self._index:
+                TTS_CACHE_REQUESTS.labels("miss").inc()
+                return None
+            self._index.move_to_end(key)
+            TTS_CACHE_REQUESTS.labels("hit").inc()
+        return path
+
+    def put(self, key: str, data: bytes) -> str:
+        """Atomically write data under key and evict LRU entries past max_bytes."""
+        self._ensure_loaded()
+        final = self.path(key)
+        tmp = f"{final}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, final)
+
+        with self._lock:
+            self._total -= self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._total += len(data)
+            while self._total > self.max_bytes and len(self._index) > 1:
+                old, size = self._index.popitem(last=False)
+                self._total -= size
+                TTS_CACHE_EVICTIONS.inc()
+                try:
+                    os.remove(self.path(old))
+                except FileNotFoundError:
+                    pass
+            self._update_gauges()
+        return final
+
+    @contextmanager
+    def open(self, key: str) -> Iterator[memoryview]:
+        """
+        Zero-copy read of a cached entry as a memoryview over an mmap.
+        Raises FileNotFoundError if the file is gone (evicted by another worker).
+        """
+        self._ensure_loaded()
+        try:
+            f = open(self.path(key), "rb")
+        except FileNotFoundError:
+            with self._lock:
+                self._drop(key)
+            raise
+        with f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield memoryview(b"")  # mmap can't map an empty file
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    yield view
+                finally:
+                    view.release()
+
+
+tts_cache = TTSCache(settings.TTS_CACHE_DIR, settings.TTS_CACHE_MAX_BYTES)
@@ -0,0 +1,436 @@
+# app/infra/usage.py
+"""
+Token and cost accounting for every upstream (OpenAI) call, and budgets
+that downgrade requests instead of failing them.
+
+    # UsageMiddleware opens one scope per HTTP request / WebSocket:
+    #   endpoint = route template, tenant = USAGE_TENANT_HEADER if signed,
+    #   request_id = x-request-id header, else the trace id
+    usage.tag(model_id="jet-engine-v1")       # managers: which AR model
+    mode = usage.budget_mode()                 # "ok" | "reduced" | "cached_only"
+
+The gateway calls record() after each successful call with the upstream's
+own counts (prompt/completion tokens, audio seconds, TTS characters); cost
+is estimated from USAGE_PRICES_USD. Each call is:
+
+  - added to the request's scope (its totals go on the root span)
+  - counted in upstream_tokens_total / upstream_cost_usd_total /
+    upstream_audio_seconds_total by endpoint and model
+  - queued for the usage_event table, written in batches every
+    USAGE_FLUSH_S by `ledger` (GET /usage reads it)
+
+Budgets (USAGE_BUDGETS_USD) are USD per USAGE_BUDGET_WINDOW_S for an
+endpoint ("endpoint:/qa/ask-about-part") or a tenant ("tenant:acme",
+"tenant:*" for every tenant without its own entry). Spend is the window
+total in usage_event as of the last flush, plus what this process has
+not flushed yet, so all workers see roughly the same figure. Each flush
+only reads the events added since the previous one (by id) into
+one-minute buckets that age out of the window; the full window is
+re-read every USAGE_REAGGREGATE_S to pick up stragglers. From
+USAGE_BUDGET_SOFT_RATIO of a budget requests run "reduced" (smaller
+prompts, fewer quiz questions); past the budget "cached_only" (answers and
+audio only from cache). With USAGE_LOG_ENABLED off, spend is tracked per
+process.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import logging
+import re
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config.settings import settings
+from app.infra.http_metrics import route_template
+from app.infra.metrics import (
+    USAGE_AUDIO_SECONDS,
+    USAGE_BUDGET_DOWNGRADES,
+    USAGE_COST,
+    USAGE_EVENTS_DROPPED,
+    USAGE_TOKENS,
+)
+from app.infra.tracing import current_span
+
+log = logging.getLogger(__name__)
+
+OK, REDUCED, CACHED_ONLY = "ok", "reduced", "cached_only"
+
+_ID_RE = re.compile(r"[^A-Za-z0-9._:-]")
+
+
+class BudgetExhausted(Exception):
+    """The request is over budget and the result is not cached; callers degrade."""
+
+
+class UsageScope:
+    """Attribution and running totals of one request (or background job)."""
+
+    __slots__ = ("endpoint", "tenant", "request_id", "model_id",
+                 "calls", "input_tokens", "output_tokens", "audio_seconds", "characters", "cost_usd")
+
+    def __init__(self, endpoint: str, tenant: str, request_id: str):
+        self.endpoint = endpoint
+        self.tenant = tenant
+        self.request_id = request_id
+        self.model_id: Optional[str] = None
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.audio_seconds = 0.0
+        self.characters = 0
+        self.cost_usd = 0.0
+
+    def totals(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "audio_seconds": round(self.audio_seconds, 3),
+            "characters": self.characters,
+            "cost_usd": round(self.cost_usd, 6),
+        }
+
+
+_scope: ContextVar[Optional[UsageScope]] = ContextVar("usage_scope", default=None)
+
+
+def current() -> Optional[UsageScope]:
+    return _scope.get()
+
+
+@contextmanager
+def scope(endpoint: str, tenant: Optional[str] = None, request_id: Optional[str] = None) -> Iterator[UsageScope]:
+    """Attribute upstream calls made inside the block (and tasks it starts) to one request."""
+    sc = UsageScope(endpoint, clean_id(tenant) or "default", clean_id(request_id) or uuid.uuid4().hex)
+    token = _scope.set(sc)
+    try:
+        yield sc
+    finally:
+        _scope.reset(token)
+
+
+def clean_id(value: Optional[str]) -> Optional[str]:
+    """Client-supplied ids end up in the usage log: keep them short and plain."""
+    if not value:
+        return None
+    return _ID_RE.sub("", value)[:64] or None
+
+
+def sign_tenant(tenant: str) -> str:
+    """Value of USAGE_TENANT_HEADER to issue to a tenant: "<tenant>.<hmac>" with USAGE_TENANT_SECRET."""
+    mac = hmac.new(settings.USAGE_TENANT_SECRET.encode(), tenant.encode(), hashlib.sha256).hexdigest()
+    return f"{tenant}.{mac}"
+
+
+def verified_tenant(value: Optional[str]) -> Optional[str]:
+    """
+    Tenant from a signed header value. Unsigned or forged values, or any
+    value while USAGE_TENANT_SECRET is unset, give None ("default"), so a
+    client can't dodge "tenant:*" budgets by making up new ids.
+    """
+    if not value or not settings.USAGE_TENANT_SECRET:
+        return None
+    tenant, _, _ = value.rpartition(".")
+    if not tenant or not hmac.compare_digest(sign_tenant(tenant), value):
+        return None
+    return tenant
+
+
+def tag(model_id: Optional[str] = None) -> None:
+    """Record which AR model the current request is about."""
+    sc = _scope.get()
+    if sc is not None and model_id:
+        sc.model_id = model_id
+
+
+# ---------- pricing ----------
+
+_unpriced: set = set()
+
+
+def estimate_cost(model: str, input_tokens: int = 0, output_tokens: int = 0,
+                  audio_seconds: float = 0.0, characters: int = 0) -> float:
+    price = settings.USAGE_PRICES_USD.get(model)
+    if price is None:
+        if model not in _unpriced:
+            _unpriced.add(model)
+            log.warning("usage: no price for %s in USAGE_PRICES_USD; its cost counts as 0", model)
+        return 0.0
+    return (
+        input_tokens * price.get("input_1m", 0.0) / 1e6
+        + output_tokens * price.get("output_1m", 0.0) / 1e6
+        + audio_seconds * price.get("audio_minute", 0.0) / 60.0
+        + characters * price.get("chars_1m", 0.0) / 1e6
+    )
+
+
+def record(kind: str, model: str, *, input_tokens: int = 0, output_tokens: int = 0,
+           audio_seconds: float = 0.0, characters: int = 0) -> float:
+    """Account one upstream call to the current scope; returns its estimated cost in USD."""
+    cost = estimate_cost(model, input_tokens, output_tokens, audio_seconds, characters)
+    sc = _scope.get()
+    endpoint = sc.endpoint if sc else "background"
+
+    if input_tokens:
+        USAGE_TOKENS.labels(endpoint, model, "input").inc(input_tokens)
+    if output_tokens:
+        USAGE_TOKENS.labels(endpoint, model, "output").inc(output_tokens)
+    if audio_seconds:
+        USAGE_AUDIO_SECONDS.labels(endpoint, model).inc(audio_seconds)
+    USAGE_COST.labels(endpoint, model).inc(cost)
+
+    if sc is not None:
+        sc.calls += 1
+        sc.input_tokens += input_tokens
+        sc.output_tokens += output_tokens
+        sc.audio_seconds += audio_seconds
+        sc.characters += characters
+        sc.cost_usd += cost
+
+    ledger.add({
+        "ts": time.time(),
+        "request_id": sc.request_id if sc else None,
+        "endpoint": endpoint,
+        "tenant": sc.tenant if sc else "default",
+        "model_id": sc.model_id if sc else None,
+        "kind": kind,
+        "upstream_model": model,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "audio_seconds": audio_seconds,
+        "characters": characters,
+        "cost_usd": cost,
+    })
+    return cost
+
+
+# ---------- ledger and budgets ----------
+
+def _budget_keys(event: Dict[str, Any]) -> Tuple[str, str]:
+    return f"endpoint:{event['endpoint']}", f"tenant:{event['tenant']}"
+
+
+_BUCKET_S = 60  # spend buckets; the window edge is this coarse
+
+
+def _sums(events: List[Dict[str, Any]]) -> Dict[str, float]:
+    out: Dict[str, float] = defaultdict(float)
+    for e in events:
+        for k in _budget_keys(e):
+            out[k] += e["cost_usd"]
+    return out
+
+
+class UsageLedger:
+    """
+    Batches usage events into Postgres and keeps the spend per budget key
+    (window total as of the last flush + this process's unflushed events).
+    """
+
+    def __init__(self):
+        self._pending: List[Dict[str, Any]] = []
+        self._unflushed: Dict[str, float] = defaultdict(float)
+        self._spent: Dict[str, float] = defaultdict(float)
+        # spend per minute bucket in the window; from usage_event, or this
+        # process's own events with USAGE_LOG_ENABLED off
+        self._buckets: Dict[int, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._last_id: Optional[int] = None  # highest usage_event id read
+        self._aggregated_at = 0.0            # last full re-read of the window
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, event: Dict[str, Any]) -> None:
+        if len(self._pending) >= settings.USAGE_MAX_PENDING:
+            self._pending.pop(0)
+            USAGE_EVENTS_DROPPED.inc()
+        self._pending.append(event)
+        for k in _budget_keys(event):
+            self._unflushed[k] += event["cost_usd"]
+
+    def spent(self, key: str) -> float:
+        return self._spent.get(key, 0.0) + self._unflushed.get(key, 0.0)
+
+    def keys(self) -> set:
+        return set(self._spent) | set(self._unflushed)
+
+    # ---------- lifecycle ----------
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            log.warning("usage: final flush failed, %d events lost: %s", len(self._pending), e)
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.USAGE_FLUSH_S)
+            try:
+                await self.flush()
+            except Exception as e:
+                # Postgres may be down: the events stay queued (up to USAGE_MAX_PENDING)
+                log.warning("usage: flush failed: %s", e)
+
+    async def flush(self) -> None:
+        batch, self._pending = self._pending, []
+        now = time.time()
+        if settings.USAGE_LOG_ENABLED:
+            from app.infra.usage_repository import insert_usage_events, spend_since
+
+            try:
+                if batch:
+                    await insert_usage_events(batch)
+            except Exception:
+                self._pending = (batch + self._pending)[-settings.USAGE_MAX_PENDING:]
+                raise
+            full = now - self._aggregated_at >= settings.USAGE_REAGGREGATE_S
+            rows, last_id = await spend_since(
+                None if full else self._last_id, settings.USAGE_BUDGET_WINDOW_S, _BUCKET_S
+            )
+            if full:
+                self._buckets.clear()
+                self._spent = defaultdict(float)
+                self._aggregated_at = now
+            if last_id is not None:
+                self._last_id = max(self._last_id or 0, last_id)
+            for bucket, key, cost in rows:
+                self._add(bucket, key, cost)
+        else:
+            for key, cost in _sums(batch).items():
+                self._add(int(now // _BUCKET_S), key, cost)
+        self._expire(now)
+        # events recorded while we awaited are in neither figure yet
+        self._unflushed = _sums(self._pending)
+
+    def _add(self, bucket: int, key: str, cost: float) -> None:
+        self._buckets[bucket][key] += cost
+        self._spent[key] += cost
+
+    def _expire(self, now: float) -> None:
+        horizon = (now - settings.USAGE_BUDGET_WINDOW_S) // _BUCKET_S
+        for bucket in [b for b in self._buckets if b < horizon]:
+            for key, cost in self._buckets.pop(bucket).items():
+                left = self._spent[key] - cost
+                if left > 1e-12:
+                    self._spent[key] = left
+                else:
+                    del self._spent[key]
+
+
+ledger = UsageLedger()
+
+
+def _limits(sc: UsageScope) -> List[Tuple[str, float]]:
+    budgets = settings.USAGE_BUDGETS_USD
+    out = []
+    ep = f"endpoint:{sc.endpoint}"
+    if ep in budgets:
+        out.append((ep, budgets[ep]))
+    tenant = f"tenant:{sc.tenant}"
+    if tenant in budgets:
+        out.append((tenant, budgets[tenant]))
+    elif "tenant:*" in budgets:
+        out.append((tenant, budgets["tenant:*"]))
+    return out
+
+
+def budget_status() -> List[Dict[str, Any]]:
+    """Every configured budget with its current spend (GET /usage); "tenant:*" per tenant seen."""
+    budgets = settings.USAGE_BUDGETS_USD
+    keys = [(k, v) for k, v in budgets.items() if k != "tenant:*"]
+    if "tenant:*" in budgets:
+        seen = {k for k in ledger.keys() if k.startswith("tenant:") and k not in budgets}
+        keys += [(k, budgets["tenant:*"]) for k in seen]
+    out = []
+    for key, limit in sorted(keys):
+        spent = ledger.spent(key)
+        out.append({"key": key, "limit_usd": limit, "spent_usd": round(spent, 6), "mode": _mode(spent, limit)})
+    return out
+
+
+def _mode(spent: float, limit: float) -> str:
+    if limit <= 0 or spent >= limit:
+        return CACHED_ONLY
+    if spent >= limit * settings.USAGE_BUDGET_SOFT_RATIO:
+        return REDUCED
+    return OK
+
+
+def budget_mode(count: bool = True) -> str:
+    """
+    How the current request may spend: "ok", "reduced" or "cached_only".
+    count=False for secondary checks within a request already counted.
+    """
+    sc = _scope.get()
+    if sc is None or not settings.USAGE_BUDGETS_USD:
+        return OK
+    mode = OK
+    for key, limit in _limits(sc):
+        m = _mode(ledger.spent(key), limit)
+        if m == CACHED_ONLY or (m == REDUCED and mode == OK):
+            mode = m
+    if mode != OK and count:
+        USAGE_BUDGET_DOWNGRADES.labels(sc.endpoint, mode).inc()
+        current_span().set("usage.budget_mode", mode)
+    return mode
+
+
+# ---------- HTTP ----------
+
+def _endpoint(scope_: Scope) -> str:
+    if scope_["type"] == "http":
+        return route_template(scope_["app"], scope_["method"], scope_["path"])
+    for r in scope_["app"].router.routes:
+        if r.matches(scope_)[0] != Match.NONE:
+            return getattr(r, "path", scope_["path"])
+    return "unmatched"
+
+
+class UsageMiddleware:
+    """One usage scope per HTTP request or WebSocket; echoes x-request-id."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope_: Scope, receive: Receive, send: Send) -> None:
+        if scope_["type"] not in ("http", "websocket"):
+            await self.app(scope_, receive, send)
+            return
+
+        headers = dict(scope_["headers"])
+        route = _endpoint(scope_)
+        tenant = headers.get(settings.USAGE_TENANT_HEADER.lower().encode())
+        incoming = headers.get(b"x-request-id")
+        trace_id = current_span().trace_id
+        request_id = (incoming.decode("latin-1") if incoming else None) or (
+            trace_id if trace_id != "0" * 32 else None
+        )
+
+        with scope(route, verified_tenant(tenant.decode("latin-1") if tenant else None), request_id) as sc:
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    message = {**message, "headers": [
+                        *message.get("headers", []), (b"x-request-id", sc.request_id.encode()),
+                    ]}
+                await send(message)
+
+            try:
+                await self.app(scope_, receive, send_wrapper if scope_["type"] == "http" else send)
+            finally:
+                if sc.calls:
+                    sp = current_span()
+                    for k, v in sc.totals().items():
+                        sp.set(f"usage.{k}", v)
@@ -0,0 +1,103 @@
+# app/infra/usage_repository.py
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.clients.postgres_client import get_async_conn
+
+_EVENT_COLUMNS = (
+    "request_id", "endpoint", "tenant", "model_id", "kind", "upstream_model",
+    "input_tokens", "output_tokens", "audio_seconds", "characters", "cost_usd",
+)
+
+# group_by values of query_usage -> column
+GROUPS = {
+    "endpoint": "endpoint",
+    "tenant": "tenant",
+    "model_id": "coalesce(model_id, '')",
+    "upstream_model": "upstream_model",
+    "kind": "kind",
+    "request_id": "coalesce(request_id, '')",
+}
+
+
+async def insert_usage_events(events: List[Dict[str, Any]]) -> int:
+    q = f"""
+    INSERT INTO usage_event (ts, {", ".join(_EVENT_COLUMNS)})
+    VALUES (to_timestamp(%s), {", ".join(["%s"] * len(_EVENT_COLUMNS))})
+    """
+    rows = [(e["ts"], *(e[c] for c in _EVENT_COLUMNS)) for e in events]
+    async with get_async_conn("insert_usage_events") as conn, conn.cursor() as cur:
+        await cur.executemany(q, rows)
+    return len(rows)
+
+
+async def spend_since(
+    after_id: Optional[int],
+    window_s: float,
+    bucket_s: int,
+) -> Tuple[List[Tuple[int, str, float]], Optional[int]]:
+    """
+    Cost per (time bucket, budget key) of the events in the last window_s
+    seconds with id > after_id (all of them when None), and the highest id
+    read. Buckets are unix time // bucket_s; keys "endpoint:<route>",
+    "tenant:<id>". With after_id this is a range scan on the primary key.
+    """
+    q = """
+    WITH ev AS (
+      SELECT id, floor(extract(epoch FROM ts) / %s)::bigint AS bucket, endpoint, tenant, cost_usd
+      FROM usage_event
+      WHERE id > %s AND ts > now() - make_interval(secs => %s)
+    )
+    SELECT bucket, 'endpoint:' || endpoint, sum(cost_usd), max(id) FROM ev GROUP BY bucket, endpoint
+    UNION ALL
+    SELECT bucket, 'tenant:' || tenant, sum(cost_usd), max(id) FROM ev GROUP BY bucket, tenant
+    """
+    async with get_async_conn("usage_spend") as conn, conn.cursor() as cur:
+        await cur.execute(q, (bucket_s, after_id or 0, window_s))
+        rows = await cur.fetchall()
+    last_id = max((r[3] for r in rows), default=None)
+    return [(int(bucket), key, float(total)) for bucket, key, total, _ in rows], last_id
+
+
+async def query_usage(
+    since_s: float,
+    group_by: str,
+    filters: Optional[Dict[str, Optional[str]]] = None,
+    limit: int = 100,
+) -> List[Dict[str, Any]]:
+    """
+    Usage totals over the last since_s seconds, grouped by one of GROUPS,
+    most expensive first. filters: exact matches on endpoint, tenant,
+    model_id, request_id.
+    """
+    where = ["ts > now() - make_interval(secs => %s)"]
+    params: List[Any] = [since_s]
+    for col, value in (filters or {}).items():
+        if value is not None and col in ("endpoint", "tenant", "model_id", "request_id"):
+            where.append(f"{col} = %s")
+            params.append(value)
+    q = f"""
+    SELECT {GROUPS[group_by]} AS key,
+           count(*), sum(input_tokens), sum(output_tokens),
+           sum(audio_seconds), sum(characters), sum(cost_usd)
+    FROM usage_event
+    WHERE {" AND ".join(where)}
+    GROUP BY 1
+    ORDER BY 7 DESC
+    LIMIT %s
+    """
+    params.append(limit)
+    async with get_async_conn("query_usage") as conn, conn.cursor() as cur:
+        await cur.execute(q, params)
+        rows = await cur.fetchall()
+    return [
+        {
+            "key": key,
+            "calls": calls,
+            "input_tokens": int(inp or 0),
+            "output_tokens": int(out or 0),
+            "audio_seconds": round(float(audio or 0.0), 3),
+            "characters": int(chars or 0),
+            "cost_usd": round(float(cost or 0.0), 6),
+        }
+        for key, calls, inp, out, audio, chars, cost in rows
+    ]
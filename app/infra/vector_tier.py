@@ -0,0 +1,406 @@
+# app/infra/vector_tier.py
+"""
+In-process vector tier for hot models: ann_search answers questions about
+a model in VECTOR_TIER_MODELS from a memory-mapped copy of its doc_chunk
+rows instead of a round trip to pgvector.
+
+Layout, one directory per model under VECTOR_TIER_DIR (tmpfs by default,
+so every worker on the host maps the same pages read-only):
+
+    <model>/<gen>.npy    float32 [rows, dim], L2-normalized
+    <model>/<gen>.json   ids, document_ids, texts, metas, exported_at
+    <model>/CURRENT      name of the live generation, replaced atomically
+    <model>/.lock        flock held by whoever writes a generation
+
+Search is exact brute force (one mat-vec, or one mat-mat for a batch of
+queries, then argpartition), with the filter semantics of ann_search: every non-None filter must equal meta->>key.
+Scores are the same 1 - cosine distance pgvector reports.
+
+Refresh:
+  - export(model)             full export from Postgres (startup warm-up,
+                              first query of a configured model, and again
+                              once the export is VECTOR_TIER_MAX_AGE_S old)
+  - refresh_document(doc_id)  after an ingest: the document's rows are
+                              re-read and spliced into every exported model
+  - drop_document(doc_id)     after a delete
+
+Writers build a new generation and swap CURRENT; readers stat CURRENT on
+every search and re-map when it changed. A model that is not configured,
+not exported yet, or larger than VECTOR_TIER_MAX_ROWS is "cold": search()
+returns None and ann_search goes to Postgres as before. Refreshes only
+reach the workers of this host; ingests elsewhere show up with the next
+full export.
+"""
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+from urllib.parse import quote
+
+from app.config.settings import settings
+from app.infra.metrics import VECTOR_TIER_QUERIES, VECTOR_TIER_ROWS
+
+if TYPE_CHECKING:
+    import numpy as np
+
+log = logging.getLogger(__name__)
+
+_CURRENT = "CURRENT"
+
+_EXPORT_SQL = """
+SELECT id::text, document_id::text, text, meta, vector_send(embedding)
+FROM doc_chunk
+WHERE meta->>'model_id' = %s AND embedding IS NOT NULL
+ORDER BY document_id, page, chunk_index
+LIMIT %s
+"""
+
+_DOCUMENT_SQL = """
+SELECT id::text, document_id::text, text, meta, vector_send(embedding), meta->>'model_id'
+FROM doc_chunk
+WHERE document_id = %s AND embedding IS NOT NULL
+ORDER BY page, chunk_index
+"""
+
+
+def _as_text(value: Any) -> Optional[str]:
+    """meta->>key for a decoded JSON value."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+class _Snapshot:
+    """One generation of one model, mapped read-only."""
+
+    def __init__(self, directory: str, gen: str):
+        import numpy as np
+
+        self.gen = gen
+        self.vectors = np.load(os.path.join(directory, f"{gen}.npy"), mmap_mode="r")
+        with open(os.path.join(directory, f"{gen}.json")) as f:
+            side = json.load(f)
+        self.ids: List[str] = side["ids"]
+        self.document_ids: List[str] = side["document_ids"]
+        self.texts: List[str] = side["texts"]
+        self.metas: List[Dict] = side["metas"]
+        self.exported_at: float = side["exported_at"]
+        self._masks: Dict[tuple, "np.ndarray"] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _mask(self, key: str, value: str) -> "np.ndarray":
+        import numpy as np
+
+        m = self._masks.get((key, value))
+        if m is None:
+            m = np.fromiter((_as_text(meta.get(key)) == value for meta in self.metas), bool, len(self.metas))
+            self._masks[(key, value)] = m
+        return m
+
+    def search(
+        self,
+        query: Sequence[float],
+        n_results: int,
+        filters: Dict[str, Optional[str]],
+        with_embeddings: bool,
+    ) -> List[Dict]:
+        return self.search_many([query], n_results, filters, with_embeddings)[0]
+
+    def search_many(
+        self,
+        queries: Sequence[Sequence[float]],
+        n_results: int,
+        filters: Dict[str, Optional[str]],
+        with_embeddings: bool,
+    ) -> List[List[Dict]]:
+        """search() for each query, scored in one product with the whole matrix."""
+        import numpy as np
+
+        if not len(self):
+            return [[] for _ in queries]
+        Q = np.array(queries, dtype=np.float32).reshape(len(queries), -1)
+        Q /= np.maximum(np.linalg.norm(Q, axis=1, keepdims=True), 1e-12)
+        scores = Q @ self.vectors.T  # [queries, rows]
+        keep = None
+        for key, value in filters.items():
+            if value is not None and key != "model_id":
+                m = self._mask(key, value)
+                keep = m if keep is None else keep & m
+        if keep is not None:
+            scores[:, ~keep] = -np.inf
+        eligible = len(self) if keep is None else int(np.count_nonzero(keep))
+        n = min(n_results, eligible)
+        return [self._top(row, n, with_embeddings) for row in scores]
+
+    def _top(self, scores: "np.ndarray", n: int, with_embeddings: bool) -> List[Dict]:
+        import numpy as np
+
+        if n <= 0:
+            return []
+        top = np.argpartition(-scores, n - 1)[:n] if n < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        hits = []
+        for i in top:
+            h = {
+                "id": self.ids[i],
+                "text": self.texts[i],
+                "meta": self.metas[i],
+                "score": float(scores[i]),
+                "document_id": self.document_ids[i],
+            }
+            if with_embeddings:
+                h["embedding"] = np.array(self.vectors[i])
+            hits.append(h)
+        return hits
+
+
+class VectorTier:
+    def __init__(self, root: str, models: Sequence[str]):
+        if not os.path.isdir(os.path.dirname(root) or "."):
+            root = os.path.join(tempfile.gettempdir(), os.path.basename(root))  # no /dev/shm (macOS)
+        self.root = root
+        self.models: Set[str] = set(models)
+        self._snapshots: Dict[str, _Snapshot] = {}
+        self._seen: Dict[str, tuple] = {}  # model -> (st_ino, st_mtime_ns) of CURRENT
+        self._exports: Dict[str, asyncio.Task] = {}
+        self._retry_at: Dict[str, float] = {}  # model -> no export before (too big, or failed)
+
+    def _dir(self, model: str) -> str:
+        return os.path.join(self.root, quote(model, safe=""))
+
+    @contextmanager
+    def _locked(self, model: str) -> Iterator[str]:
+        d = self._dir(model)
+        os.makedirs(d, exist_ok=True)
+        with open(os.path.join(d, ".lock"), "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield d
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    # ---------- read side ----------
+
+    def _snapshot(self, model: str) -> Optional[_Snapshot]:
+        """The live generation of model, re-mapped if a writer swapped it."""
+        d = self._dir(model)
+        for _ in range(3):  # a writer may remove the generation between the two reads
+            try:
+                st = os.stat(os.path.join(d, _CURRENT))
+            except FileNotFoundError:
+                return None
+            stamp = (st.st_ino, st.st_mtime_ns)
+            if self._seen.get(model) == stamp:
+                return self._snapshots[model]
+            try:
+                with open(os.path.join(d, _CURRENT)) as f:
+                    snap = _Snapshot(d, f.read().strip())
+            except FileNotFoundError:
+                continue
+            self._snapshots[model] = snap
+            self._seen[model] = stamp
+            VECTOR_TIER_ROWS.labels(model).set(len(snap))
+            return snap
+        return None
+
+    def serves(self, model: Optional[str]) -> bool:
+        """
+        Whether questions about model are answered locally right now. Only
+        checks that a generation is live: mapping it is left to search_many's
+        worker thread, as this is called on the event loop.
+        """
+        return bool(model) and model in self.models and os.path.exists(os.path.join(self._dir(model), _CURRENT))
+
+    async def search(
+        self,
+        query: Sequence[float],
+        n_results: int,
+        filters: Optional[Dict[str, Optional[str]]] = None,
+        with_embeddings: bool = False,
+    ) -> Optional[List[Dict]]:
+        """Hits in ann_search's shape, or None when the model is cold (use Postgres)."""
+        found = await self.search_many([query], n_results, filters, with_embeddings)
+        return None if found is None else found[0]
+
+    async def search_many(
+        self,
+        queries: Sequence[Sequence[float]],
+        n_results: int,
+        filters: Optional[Dict[str, Optional[str]]] = None,
+        with_embeddings: bool = False,
+    ) -> Optional[List[List[Dict]]]:
+        """search() for several queries in one pass over the model's vectors."""
+        filters = filters or {}
+        model = filters.get("model_id")
+        if not model or model not in self.models:
+            return None
+        # re-mapping a new generation (stat, np.load, sidecar JSON) is file I/O: keep it off the loop too
+        found, stale = await asyncio.to_thread(
+            self._search_local, model, queries, n_results, filters, with_embeddings
+        )
+        if stale:
+            self.schedule_export(model)
+        VECTOR_TIER_QUERIES.labels("cold" if found is None else "local").inc(len(queries))
+        return found
+
+    def _search_local(
+        self,
+        model: str,
+        queries: Sequence[Sequence[float]],
+        n_results: int,
+        filters: Dict[str, Optional[str]],
+        with_embeddings: bool,
+    ) -> Tuple[Optional[List[List[Dict]]], bool]:
+        """(hits, or None when cold; whether to re-export), in a worker thread."""
+        snap = self._snapshot(model)
+        stale = snap is None or time.time() - snap.exported_at > settings.VECTOR_TIER_MAX_AGE_S
+        if snap is None:
+            return None, stale
+        return snap.search_many(queries, n_results, filters, with_embeddings), stale
+
+    # ---------- write side ----------
+
+    def _write(self, d: str, vectors: "np.ndarray", side: Dict[str, Any]) -> str:
+        import numpy as np
+
+        gen = f"{time.time_ns():x}.{os.getpid()}"
+        with open(os.path.join(d, f"{gen}.npy.tmp"), "wb") as f:
+            np.save(f, vectors, allow_pickle=False)
+        os.replace(os.path.join(d, f"{gen}.npy.tmp"), os.path.join(d, f"{gen}.npy"))
+        with open(os.path.join(d, f"{gen}.json.tmp"), "w") as f:
+            json.dump(side, f)
+        os.replace(os.path.join(d, f"{gen}.json.tmp"), os.path.join(d, f"{gen}.json"))
+        with open(os.path.join(d, f"{_CURRENT}.tmp"), "w") as f:
+            f.write(gen)
+        os.replace(os.path.join(d, f"{_CURRENT}.tmp"), os.path.join(d, _CURRENT))
+        # unlinking is safe: workers mapping an old generation keep its pages until they re-map
+        for name in os.listdir(d):
+            if name.endswith((".npy", ".json")) and not name.startswith(gen + "."):
+                try:
+                    os.remove(os.path.join(d, name))
+                except FileNotFoundError:
+                    pass
+        return gen
+
+    @staticmethod
+    def _rows_to_arrays(rows) -> "np.ndarray":
+        import numpy as np
+
+        from app.infra.rerank import parse_vector
+
+        if not rows:
+            return np.zeros((0, 0), dtype=np.float32)
+        E = np.stack([parse_vector(r[4]) for r in rows])
+        E /= np.maximum(np.linalg.norm(E, axis=1, keepdims=True), 1e-12)
+        return E
+
+    def export(self, model: str, force: bool = False) -> Optional[int]:
+        """
+        Full export of model from Postgres. Returns the row count, or None
+        when the model has more than VECTOR_TIER_MAX_ROWS rows (stays cold).
+        Skipped, unless force, when another worker exported it recently.
+        """
+        from app.clients.postgres_client import get_conn
+
+        with self._locked(model) as d:
+            snap = self._snapshot(model)
+            if snap is not None and not force and time.time() - snap.exported_at < settings.VECTOR_TIER_MAX_AGE_S:
+                return len(snap)
+            t0 = time.perf_counter()
+            with get_conn("vector_tier_export") as conn, conn.cursor() as cur:
+                cur.execute(_EXPORT_SQL, (model, settings.VECTOR_TIER_MAX_ROWS + 1))
+                rows = cur.fetchall()
+            if len(rows) > settings.VECTOR_TIER_MAX_ROWS:
+                log.warning("vector tier: %s has more than %d chunks, staying on pgvector",
+                            model, settings.VECTOR_TIER_MAX_ROWS)
+                self._retry_at[model] = time.time() + settings.VECTOR_TIER_MAX_AGE_S
+                return None
+            self._write(d, self._rows_to_arrays(rows), {
+                "model_id": model,
+                "ids": [r[0] for r in rows],
+                "document_ids": [r[1] for r in rows],
+                "texts": [r[2] for r in rows],
+                "metas": [r[3] for r in rows],
+                "exported_at": time.time(),
+            })
+            log.info("vector tier: exported %s (%d chunks) in %.2fs", model, len(rows), time.perf_counter() - t0)
+            return len(rows)
+
+    def _splice(self, model: str, doc_id: str, rows: List[tuple]) -> bool:
+        """Replace doc_id's rows in model's live generation with rows. False if not exported."""
+        import numpy as np
+
+        with self._locked(model) as d:
+            snap = self._snapshot(model)
+            if snap is None:
+                return False
+            keep = [i for i, did in enumerate(snap.document_ids) if did != doc_id]
+            if len(keep) == len(snap) and not rows:
+                return True  # the document never was in this model
+            vectors = np.asarray(snap.vectors[keep])
+            if rows:
+                new = self._rows_to_arrays(rows)
+                vectors = np.concatenate([vectors, new]) if keep else new
+            self._write(d, vectors, {
+                "model_id": model,
+                "ids": [snap.ids[i] for i in keep] + [r[0] for r in rows],
+                "document_ids": [snap.document_ids[i] for i in keep] + [r[1] for r in rows],
+                "texts": [snap.texts[i] for i in keep] + [r[2] for r in rows],
+                "metas": [snap.metas[i] for i in keep] + [r[3] for r in rows],
+                "exported_at": snap.exported_at,
+            })
+            return True
+
+    def refresh_document(self, doc_id: str) -> None:
+        """Bring doc_id's current chunks into every exported model (after an ingest)."""
+        if not any(self._snapshot(m) for m in self.models):
+            return
+        from app.clients.postgres_client import get_conn
+
+        with get_conn("vector_tier_refresh") as conn, conn.cursor() as cur:
+            cur.execute(_DOCUMENT_SQL, (doc_id,))
+            rows = cur.fetchall()
+        by_model: Dict[str, List[tuple]] = {}
+        for r in rows:
+            by_model.setdefault(r[5], []).append(r)
+        # every configured model: the document may also have moved away from one
+        for model in self.models:
+            self._splice(model, doc_id, by_model.get(model, []))
+
+    def drop_document(self, doc_id: str) -> None:
+        """Remove doc_id's chunks from every exported model (after a delete)."""
+        for model in self.models:
+            self._splice(model, doc_id, [])
+
+    def schedule_export(self, model: str) -> None:
+        """Export model in the background unless that is already under way."""
+        task = self._exports.get(model)
+        if (task is not None and not task.done()) or time.time() < self._retry_at.get(model, 0.0):
+            return
+        self._exports[model] = asyncio.get_running_loop().create_task(asyncio.to_thread(self._export_quietly, model))
+
+    def _export_quietly(self, model: str) -> None:
+        try:
+            self.export(model)
+        except Exception as e:
+            # Postgres may be down; queries of the model try again after a pause
+            log.warning("vector tier: export of %s failed: %s", model, e)
+            self._retry_at[model] = time.time() + settings.VECTOR_TIER_RETRY_S
+
+    async def warm_up(self) -> None:
+        """Map (exporting where needed) every configured model."""
+        await asyncio.gather(*(asyncio.to_thread(self.export, m) for m in sorted(self.models)))
+
+
+vector_tier = VectorTier(settings.VECTOR_TIER_DIR, settings.VECTOR_TIER_MODELS)
@@ -1,14 +1,87 @@
-from fastapi import FastAPI
+from app.infra import startup  # first: starts the cold-start clock
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from app.api.health import router as health_router
 from app.api.qa import router as qa_router
 from app.api.actions import router as actions_router
 from app.api.docs import router as docs_router
 from app.api.quiz import router as quiz_router
+from app.api.voice import router as voice_router
+from app.api.tts import router as tts_router
+from app.api.metrics import router as metrics_router
+from app.api.usage import router as usage_router
+from app.managers.health_monitor import health_monitor
+from app.managers.ingest_job_manager import ingest_jobs
+from app.infra.circuit_breaker import CircuitOpenError
+from app.clients.neo4j_client import neo4j_client
+from app.clients.openai_client import UpstreamRateLimited, gateway
+from app.config.settings import settings
+from app.infra import pdf_extract, tracing
+from app.infra.cache import cache
+from app.infra.http_metrics import MetricsMiddleware
+from app.infra.usage import UsageMiddleware, ledger
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with startup.phase("health_monitor"):
+        await health_monitor.start()
+    with startup.phase("usage_ledger"):
+        await ledger.start()
+    with startup.phase("ingest_jobs"):
+        await ingest_jobs.start()
+    if settings.STARTUP_WARM_UP:
+        startup.start_warm_up()
+    startup.ready()
+    try:
+        yield
+    finally:
+        await startup.stop_warm_up()
+        await ingest_jobs.stop()
+        await ledger.stop()  # after ingest: its last upstream calls are flushed too
+        await health_monitor.stop()
+        await gateway.aclose()
+        await neo4j_client.close()
+        await cache.close()
+        pdf_extract.shutdown()
+        tracing.shutdown()
+
+
+app = FastAPI(title="AR Agentic Backend", lifespan=lifespan)
+app.add_middleware(UsageMiddleware)  # inside tracing: request totals go on its span
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(tracing.TracingMiddleware)  # outermost: its span covers the whole request
+
+
+@app.exception_handler(UpstreamRateLimited)
+async def openai_rate_limited(request: Request, exc: UpstreamRateLimited):
+    # Upstream quota exhausted even after gateway retries: tell the client to back off
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Upstream model is rate limited, retry shortly."},
+        headers={"Retry-After": exc.retry_after},
+    )
+
+
+@app.exception_handler(CircuitOpenError)
+async def dependency_down(request: Request, exc: CircuitOpenError):
+    # a required dependency is known to be down: fail fast instead of waiting out timeouts
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"{exc.dependency} is temporarily unavailable, retry shortly."},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
 
-app = FastAPI(title="AR Agentic Backend")
 
 app.include_router(health_router)
 app.include_router(qa_router)
 app.include_router(actions_router)
 app.include_router(docs_router)
 app.include_router(quiz_router)
+app.include_router(voice_router)
+app.include_router(tts_router)
+app.include_router(metrics_router)
+app.include_router(usage_router)
+
+startup.mark_imported()
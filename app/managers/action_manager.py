@@ -1,13 +1,17 @@
 from typing import Dict, Any, List
 from app.managers.graph_manager import GraphManager
+from app.infra.cache import cached
+from app.infra.tracing import traced
 
 
 class ActionManager:  # Builds the final playbook (timeline) for Unity:
     def __init__(self):
         self.graph = GraphManager()
 
-    def build_playbook(self, action_id: str) -> Dict[str, Any]:
-        data = self.graph.resolve_action(action_id)["rows"]
+    @traced("actions.build_playbook")
+    @cached("playbook")
+    async def build_playbook(self, action_id: str) -> Dict[str, Any]:
+        data = (await self.graph.resolve_action(action_id))["rows"]
         timeline = []
         t = 0
         for row in data:
@@ -1,86 +1,324 @@
+import asyncio
+import hashlib
+import logging
 import re
-from typing import List, Tuple
-from pypdf import PdfReader
-from app.infra.doc_repository import create_document, insert_chunks
-from app.clients.openai_client import client
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.infra.doc_repository import (
+    MissingEmbeddings,
+    adopt_legacy_document,
+    document_texts,
+    find_document,
+    known_text_hashes,
+    replace_document_version,
+)
+from app.clients.openai_client import gateway, Priority
 from app.config.settings import settings
+from app.infra.cache import cache
+from app.infra.pdf_extract import read_metadata, iter_page_texts
+from app.infra.chunking import encoding, iter_chunks
+from app.infra.metrics import STAGE_SECONDS
+from app.infra.tracing import current_span, traced
+from app.infra.vector_tier import vector_tier
+
+log = logging.getLogger(__name__)
+
+
+class DocKeyConflict(ValueError):
+    """
+    A file ingested without a doc_key has the name of a stored document but
+    hardly any of its text: a different document, not a new revision.
+    """
+
+    def __init__(self, doc_key: str, similarity: float):
+        super().__init__(
+            f"{doc_key} already holds a different document (text similarity {similarity:.2f}); "
+            "pass doc_key to store it separately, or that doc_key to replace it"
+        )
+        self.doc_key = doc_key
+        self.similarity = similarity
 
 def _clean(t: str) -> str:
     return re.sub(r"\s+"," ", (t or "")).strip()
 
-def _chunk(text: str,
-           max_chars: int = 1200,
-           min_chars: int = 600,
-           overlap: int = 150) -> List[str]:
-    sentences = re.split(r"(?<=[.!?])\s+", text)
-    chunks, cur = [], ""
-    for s in sentences:
-        if len(cur) + len(s) + 1 <= max_chars:
-            cur = (cur + " " + s).strip()
-        else:
-            if len(cur) >= min_chars:
-                chunks.append(cur)
-                cur = s
-            else:
-                cur = (cur + " " + s).strip()
-    if cur:
-        chunks.append(cur)
-
-    if overlap and len(chunks) > 1:
-        out = [chunks[0]]
-        for i in range(1, len(chunks)):
-            out.append((chunks[i-1][-overlap:] + " " + chunks[i]).strip())
-        return out
-    return chunks
-
-def _embed_many(texts: List[str]) -> List[List[float]]:
-    res = client.embeddings.create(
-        model=settings.EMBEDDING_MODEL,
-        input=texts
-    )
-    return [d.embedding for d in res.data]
-
-
-def ingest_pdf_to_pg(
+def _count_tokens(texts: List[str]) -> List[int]:
+    enc = encoding(settings.EMBEDDING_MODEL)
+    return [len(t) for t in enc.encode_ordinary_batch(texts)]
+
+def _token_batches(counts: List[int],
+                   max_tokens: int,
+                   max_inputs: int) -> List[Tuple[int, int]]:
+    """
+    Split inputs into contiguous [lo, hi) ranges whose token sum stays under
+    max_tokens and whose size stays under max_inputs. Contiguous ranges keep
+    re-assembly trivial: concatenating batch results restores input order.
+    """
+    ranges, lo, total = [], 0, 0
+    for i, n in enumerate(counts):
+        if i > lo and (total + n > max_tokens or i - lo >= max_inputs):
+            ranges.append((lo, i))
+            lo, total = i, 0
+        total += n
+    if lo < len(counts):
+        ranges.append((lo, len(counts)))
+    return ranges
+
+Progress = Callable[[str, int], None]  # (counter, value), e.g. ("pages_parsed", 12)
+
+async def _embed_many(
+    texts: List[str],
+    progress: Optional[Progress] = None,
+) -> Tuple[List[List[float]], int]:
+    """
+    Embed all chunks of a document, packed across pages into token-sized
+    batches with up to EMBED_CONCURRENCY requests in flight.
+    Returns (embeddings in input order, number of embedding requests).
+    """
+    if not texts:
+        return [], 0
+    counts = await asyncio.to_thread(_count_tokens, texts)
+    ranges = _token_batches(counts, settings.EMBED_BATCH_MAX_TOKENS, settings.EMBED_BATCH_MAX_INPUTS)
+    sem = asyncio.Semaphore(settings.EMBED_CONCURRENCY)
+
+    done = 0
+
+    async def one(lo: int, hi: int) -> List[List[float]]:
+        nonlocal done
+        async with sem:
+            embs = await gateway.embed(texts[lo:hi], priority=Priority.BACKGROUND)
+        done += hi - lo
+        if progress:
+            progress("chunks_embedded", done)
+        return embs
+
+    parts = await asyncio.gather(*(one(lo, hi) for lo, hi in ranges))
+    return [e for part in parts for e in part], len(ranges)
+
+def _file_fingerprint(file_path: str) -> str:
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def default_doc_key(model_id: str | None, name: str | None, fingerprint: str) -> str:
+    """
+    Identity of a document ingested without a doc_key: its name (upload
+    filename or title, case/whitespace/".pdf" insensitive) within its model,
+    so a revised manual replaces its previous version. Without any name,
+    its content (fingerprint).
+    """
+    stem = re.sub(r"\.pdf$", "", " ".join((name or "").lower().split()))
+    if not stem:
+        return f"pdf:{model_id or '-'}:sha256:{fingerprint}"
+    return f"pdf:{model_id or '-'}:name:{stem}"
+
+def _shingles(texts: List[str], k: int = 5) -> set:
+    # word k-grams, a quarter of them kept: chunk boundaries may shift between revisions, words don't
+    words = " ".join(texts).lower().split()
+    grams = (hash(tuple(words[i:i + k])) for i in range(max(len(words) - k + 1, 0)))
+    return {h for h in grams if h & 3 == 0}
+
+def _check_same_document(document_id: str, texts: List[str], doc_key: str) -> None:
+    """Blocking: raise DocKeyConflict unless texts look like a revision of the stored document."""
+    old = _shingles(document_texts(document_id))
+    new = _shingles(texts)
+    if not old or not new:
+        return
+    similarity = len(old & new) / len(old | new)
+    if similarity < settings.INGEST_SAME_NAME_MIN_SIMILARITY:
+        raise DocKeyConflict(doc_key, similarity)
+
+def _text_hash(text: str) -> str:
+    # the model is part of the hash so switching models never reuses old vectors
+    return hashlib.sha256(f"{settings.EMBEDDING_MODEL}\0{text}".encode()).hexdigest()
+
+def _read_pdf(
+    file_path: str,
+    page_count: int,
+    progress: Optional[Progress] = None,
+) -> Tuple[List[Tuple[str, int, int]], int]:
+    """
+    Blocking: extract (in the process pool for larger PDFs) and chunk the PDF.
+    Returns ([(text, page_start, page_end)], number of pages with text).
+    """
+    with_text = 0
+
+    def pages():
+        nonlocal with_text
+        for page_no, raw in iter_page_texts(file_path, page_count):
+            if progress:
+                progress("pages_parsed", page_no)
+            text = _clean(raw)
+            if text:
+                with_text += 1
+                yield page_no, text
+
+    chunks = list(iter_chunks(pages()))
+    return chunks, with_text
+
+
+@traced("ingest.ingest_pdf_to_pg")
+async def ingest_pdf_to_pg(
     file_path: str,
     title: str | None = None,
     subject: str | None = None,
     tags: list[str] | None = None,
     model_id: str | None = None,
     model_name: str | None = None,
+    progress: Optional[Progress] = None,
+    doc_key: str | None = None,
+    fence: Optional[Callable[[Any], None]] = None,
 ) -> dict:
-    reader = PdfReader(file_path)
-    title = title or (reader.metadata.title if reader.metadata else "Untitled")
-
-    doc_id = create_document(
-        title=title,
-        source="pdf",
-        subject=subject,
-        tags=tags or []
-    )
-
-    rows: List[Tuple[int | None, int | None, str, dict, list[float]]] = []
-
-    for i, page in enumerate(reader.pages):
-        raw = page.extract_text() or ""
-        text = _clean(raw)
-        if not text:
-            continue
-
-        chunks = _chunk(text)
-        if not chunks:
-            continue
-
-        embs = _embed_many(chunks)
-        for j, ch in enumerate(chunks):
-            meta = {
-                "page": i + 1,
-                "chunk_index": j,
-                "model_id": model_id,
-                "model_name": model_name,
-                "subject": subject,
-            }
-            rows.append((i + 1, j, ch, meta, embs[j]))
-
-    upserted = insert_chunks(doc_id, rows)
-    return {"document_id": doc_id, "upserted_chunks": upserted}
+    """
+    Parse, chunk, embed and store a PDF.
+
+    Documents are identified by doc_key (default: default_doc_key(), the
+    file's name within its model). Re-ingesting the same key replaces the
+    previous version atomically:
+    - an identical file (same sha256 fingerprint) is a no-op
+    - chunks whose text is unchanged are kept as they are
+    - chunks whose text was embedded before, in any document, reuse that vector
+    - only genuinely new text is sent to the embedding API
+    - chunks that disappeared are deleted
+    With the default key, a file whose text is too unlike the stored
+    document of the same name raises DocKeyConflict instead of replacing it.
+
+    progress, if given, is called with (counter, value) for pages_total,
+    pages_parsed, chunks_total, chunks_embedded and rows_written. It may be
+    called from a worker thread, so keep it cheap (e.g. update a dict).
+
+    fence is passed to replace_document_version: it runs inside the write
+    transaction and may veto it (a background job that lost its claim).
+    """
+    t0 = time.perf_counter()
+    fingerprint = await asyncio.to_thread(_file_fingerprint, file_path)
+    pdf_title, page_count = await asyncio.to_thread(read_metadata, file_path)
+    name = title or pdf_title
+    title = name or "Untitled"
+    guard = doc_key is None  # an explicit doc_key is trusted to mean "replace"
+    doc_key = doc_key or default_doc_key(model_id, name, fingerprint)
+    if progress:
+        progress("pages_total", page_count)
+
+    current = await asyncio.to_thread(find_document, doc_key)
+    if current is None and await asyncio.to_thread(adopt_legacy_document, doc_key, title, model_id):
+        # a copy from before doc_keys: this ingest becomes its new version
+        current = await asyncio.to_thread(find_document, doc_key)
+    STAGE_SECONDS.labels("ingest", "fingerprint").observe(time.perf_counter() - t0)
+    if current and current["fingerprint"] == fingerprint:
+        log.info("ingest %s: %s unchanged, skipped", current["document_id"], doc_key)
+        return {
+            "document_id": current["document_id"],
+            "doc_key": doc_key,
+            "unchanged": True,
+            "upserted_chunks": 0,
+            "stats": {"pages": page_count, "chunks": current["chunks"],
+                      "seconds": round(time.perf_counter() - t0, 3)},
+        }
+
+    t_parse = time.perf_counter()
+    chunks, pages_with_text = await asyncio.to_thread(_read_pdf, file_path, page_count, progress)
+    parse_s = time.perf_counter() - t_parse
+
+    texts = [text for text, _, _ in chunks]
+    if guard and current:
+        await asyncio.to_thread(_check_same_document, current["document_id"], texts, doc_key)
+    hashes = [_text_hash(t) for t in texts]
+    if progress:
+        progress("chunks_total", len(texts))
+
+    # embed each new text once; known hashes get their vector copied in SQL
+    known = await asyncio.to_thread(known_text_hashes, hashes)
+    todo: Dict[str, str] = {}
+    for h, t in zip(hashes, texts):
+        if h not in known and h not in todo:
+            todo[h] = t
+    t_embed = time.perf_counter()
+    embs, n_requests = await _embed_many(list(todo.values()), progress)
+    embed_s = time.perf_counter() - t_embed
+    fresh = dict(zip(todo.keys(), embs))
+
+    rows: List[Tuple[int | None, int | None, str, dict, str, Optional[list[float]]]] = []
+    j, prev_page = 0, None
+    for k, (text, page_start, page_end) in enumerate(chunks):
+        # chunk_index counts chunks starting on the same page
+        j = j + 1 if page_start == prev_page else 0
+        prev_page = page_start
+        meta = {
+            "page": page_start,
+            "page_end": page_end,
+            "chunk_index": j,
+            "model_id": model_id,
+            "model_name": model_name,
+            "subject": subject,
+        }
+        rows.append((page_start, j, text, meta, hashes[k], fresh.get(hashes[k])))
+
+    # one transaction: search sees the old version or the new one, never a mix
+    t_write = time.perf_counter()
+    for attempt in range(2):
+        try:
+            res = await asyncio.to_thread(
+                replace_document_version,
+                doc_key=doc_key,
+                fingerprint=fingerprint,
+                title=title,
+                source="pdf",
+                subject=subject,
+                tags=tags or [],
+                rows=rows,
+                fence=fence,
+            )
+            break
+        except MissingEmbeddings as e:
+            if attempt:
+                raise
+            # a concurrent re-ingest deleted the chunks we meant to copy vectors from
+            log.warning("ingest %s: %s; embedding them instead", doc_key, e)
+            gone = set(e.text_hashes)
+            lost = {h: t for h, t in zip(hashes, texts) if h in gone}
+            embs, n = await _embed_many(list(lost.values()))
+            fresh.update(zip(lost.keys(), embs))
+            todo.update(lost)
+            n_requests += n
+            rows = [(*r[:5], fresh.get(r[4])) for r in rows]
+    write_s = time.perf_counter() - t_write
+    doc_id = res["document_id"]
+    # before the answers: a recomputed answer must not search the old chunks
+    await asyncio.to_thread(vector_tier.refresh_document, doc_id)
+    await cache.invalidate("qa")  # cached answers may rest on the old chunks
+    if progress:
+        progress("rows_written", res["inserted"])
+
+    elapsed = time.perf_counter() - t0
+    STAGE_SECONDS.labels("ingest", "parse").observe(parse_s)
+    STAGE_SECONDS.labels("ingest", "embed").observe(embed_s)
+    STAGE_SECONDS.labels("ingest", "write").observe(write_s)
+    STAGE_SECONDS.labels("ingest", "total").observe(elapsed)
+    stats = {
+        "pages": page_count,
+        "chunks": len(texts),
+        "chunks_kept": res["kept"],
+        "chunks_inserted": res["inserted"],
+        "chunks_deleted": res["deleted"],
+        "embeddings_created": len(todo),
+        "embeddings_reused": len(texts) - len(todo),
+        "embedding_requests": n_requests,
+        # what the old one-request-per-page path would have issued
+        "embedding_requests_per_page_baseline": pages_with_text,
+        "parse_seconds": round(parse_s, 3),
+        "embed_seconds": round(embed_s, 3),
+        "write_seconds": round(write_s, 3),
+        "seconds": round(elapsed, 3),
+        "pages_per_second": round(page_count / elapsed, 2) if elapsed > 0 else None,
+    }
+    log.info("ingest %s: %s", doc_id, stats)
+    current_span().set("ingest.stats", stats)
+    return {
+        "document_id": doc_id,
+        "doc_key": doc_key,
+        "unchanged": False,
+        "upserted_chunks": res["inserted"] + res["kept"],
+        "stats": stats,
+    }
@@ -1,5 +1,6 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from app.clients.neo4j_client import neo4j_client
+from app.infra.cache import cached
 
 
 class GraphManager:
@@ -7,6 +8,10 @@ class GraphManager:
     Encapsulates Cypher queries used by other managers.
     Uses a Model node to support multiple 3D models.
 
+    Part context and function lookups are cached in the "graph" namespace
+    (app/infra/cache.py); run scripts/cache_invalidate.py graph after
+    editing the graph.
+
     Key idea: we NEVER trust the raw part_name blindly.
     We first resolve it to a canonical Part.name via _resolve_part_name,
     which is tolerant to:
@@ -18,7 +23,7 @@ class GraphManager:
 
     # ---------- internal: tolerant part resolver ----------
 
-    def _resolve_part_name(
+    async def _resolve_part_name(
         self,
         raw_name: str,
         model_id: Optional[str] = None,
@@ -79,12 +84,13 @@ class GraphManager:
             "alt": alt,
             "modelId": model_id,
         }
-        recs = neo4j_client.run(q, params)
+        recs = await neo4j_client.run(q, params, query="resolve_part_name")
         return recs[0]["name"] if recs else None
 
     # ---------- Part context ----------
 
-    def get_part_context(
+    @cached("graph")
+    async def get_part_context(
         self,
         part_name: str,
         model_id: Optional[str] = None,
@@ -93,7 +99,7 @@ class GraphManager:
         Return details about a part, its functions, processes, and neighbors.
         Tolerant to minor naming issues via _resolve_part_name.
         """
-        resolved = self._resolve_part_name(part_name, model_id=model_id)
+        resolved = await self._resolve_part_name(part_name, model_id=model_id)
         if not resolved:
             return {}
 
@@ -123,7 +129,7 @@ class GraphManager:
             """
             params = {"name": resolved}
 
-        recs = neo4j_client.run(q, params)
+        recs = await neo4j_client.run(q, params, query="get_part_context")
         if not recs:
             return {}
 
@@ -136,9 +142,81 @@ class GraphManager:
             "connects_to": [x for x in r["connects_to"] if x],
         }
 
+    @cached("graph")
+    async def get_parts_context(
+        self,
+        part_names: List[str],
+        model_id: Optional[str] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        get_part_context for several names in one query (batch QA):
+        raw name -> context, names that don't resolve left out. Same
+        tolerant matching as _resolve_part_name; pass the names sorted
+        so the cache key is stable.
+        """
+        if not part_names:
+            return {}
+
+        q = """
+        UNWIND $names AS raw
+        WITH raw, toLower(trim(raw)) AS nameLower
+        WITH raw, nameLower,
+             CASE WHEN nameLower ENDS WITH 's'
+                  THEN substring(nameLower, 0, size(nameLower) - 1)
+                  ELSE nameLower + 's' END AS alt
+
+        CALL {
+          WITH nameLower, alt
+          MATCH (p:Part)
+          WHERE
+            ($modelId IS NULL OR p.modelId = $modelId)
+            AND (
+                  toLower(p.name) = nameLower
+               OR toLower(p.name) = alt
+               OR toLower(coalesce(p.unityId, '')) = nameLower
+               OR nameLower CONTAINS toLower(p.name)
+               OR toLower(p.name) CONTAINS nameLower
+            )
+          RETURN p.name AS name
+          ORDER BY
+            CASE
+              WHEN toLower(p.name) = nameLower THEN 0
+              WHEN toLower(p.name) = alt THEN 1
+              WHEN toLower(coalesce(p.unityId, '')) = nameLower THEN 2
+              ELSE 3
+            END,
+            size(p.name) ASC
+          LIMIT 1
+        }
+
+        MATCH (p:Part {name: name})
+        WHERE $modelId IS NULL OR (:Model {id: $modelId})-[:HAS_PART]->(p)
+        OPTIONAL MATCH (p)-[:PERFORMS]->(f:Function)
+        OPTIONAL MATCH (p)-[:PART_OF]->(proc:Process)
+        RETURN raw,
+               p.name AS name,
+               coalesce(p.description,'') AS description,
+               collect(DISTINCT f.name) AS functions,
+               collect(DISTINCT proc.name) AS processes,
+               [] AS connects_to
+        """
+        params = {"names": part_names, "modelId": model_id}
+        recs = await neo4j_client.run(q, params, query="get_parts_context")
+
+        out: Dict[str, Dict[str, Any]] = {}
+        for r in recs:
+            out.setdefault(r["raw"], {
+                "name": r["name"],
+                "description": r["description"],
+                "functions": [x for x in r["functions"] if x],
+                "processes": [x for x in r["processes"] if x],
+                "connects_to": [x for x in r["connects_to"] if x],
+            })
+        return out
+
     # ---------- Actions / timelines ----------
 
-    def resolve_action(
+    async def resolve_action(
         self,
         action_id: str,
         model_id: Optional[str] = None,
@@ -179,12 +257,13 @@ class GraphManager:
             """
             params = {"aid": action_id}
 
-        recs = neo4j_client.run(q, params)
+        recs = await neo4j_client.run(q, params, query="resolve_action")
         return {"rows": recs[0]["rows"]} if recs else {"rows": []}
 
     # ---------- Function → Part heuristic ----------
 
-    def find_part_by_function(
+    @cached("graph")
+    async def find_part_by_function(
         self,
         user_question: str,
         model_id: str | None = None,
@@ -248,5 +327,5 @@ class GraphManager:
             "modelId": model_id,
             "modelName": model_name,
         }
-        recs = neo4j_client.run(q, params)
+        recs = await neo4j_client.run(q, params, query="find_part_by_function")
         return recs[0]["part"] if recs else ""
@@ -0,0 +1,134 @@
+# app/managers/health_monitor.py
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List
+
+from app.clients import postgres_client
+from app.clients.neo4j_client import neo4j_client
+from app.clients.openai_client import gateway
+from app.config.settings import settings
+from app.infra.circuit_breaker import OPEN, breakers
+from app.infra.metrics import HEALTH_PROBE_SECONDS, UPSTREAM_ERRORS
+
+log = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """
+    Probes Postgres, Neo4j and OpenAI in the background and feeds the
+    circuit breakers, so /health answers from memory and request paths can
+    skip a dependency that is known to be down.
+
+    - every HEALTH_PROBE_INTERVAL_S all probes run concurrently, each with
+      HEALTH_PROBE_TIMEOUT_S; a probe bypasses its breaker, so it is also
+      what notices recovery
+    - live(): the process is up and its event loop is responsive
+    - ready(): every HEALTH_READY_DEPENDENCIES entry has been probed and
+      its breaker is not open
+    """
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+        self._probes: Dict[str, Callable[[], Awaitable[None]]] = {
+            "postgres": postgres_client.ping,
+            "neo4j": neo4j_client.ping,
+        }
+        if settings.HEALTH_PROBE_OPENAI:
+            self._probes["openai"] = gateway.ping
+        self.results: Dict[str, Dict] = {
+            name: {"status": "unknown", "latency_ms": None, "checked_at": None, "error": None}
+            for name in breakers
+        }
+
+    # ---------- lifecycle ----------
+
+    async def start(self) -> None:
+        # first round runs in the background too: startup never waits on a dependency
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.probe_all()
+            except Exception:
+                log.exception("health probe round failed")
+            await asyncio.sleep(settings.HEALTH_PROBE_INTERVAL_S)
+
+    # ---------- probing ----------
+
+    async def probe_all(self) -> None:
+        await asyncio.gather(*(self._probe(name, fn) for name, fn in self._probes.items()))
+
+    async def _probe(self, name: str, fn: Callable[[], Awaitable[None]]) -> None:
+        t0 = time.perf_counter()
+        error = None
+        try:
+            await asyncio.wait_for(fn(), settings.HEALTH_PROBE_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            error = f"probe timed out after {settings.HEALTH_PROBE_TIMEOUT_S:g}s"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        elapsed = time.perf_counter() - t0
+        HEALTH_PROBE_SECONDS.labels(name).observe(elapsed)
+
+        if error is None:
+            breakers[name].record_success()
+        else:
+            UPSTREAM_ERRORS.labels(name, "health_probe").inc()
+            breakers[name].record_failure(error)
+            if self.results[name]["status"] != "error":
+                log.warning("health: %s probe failed: %s", name, error)
+        self.results[name] = {
+            "status": "ok" if error is None else "error",
+            "latency_ms": round(elapsed * 1000.0, 1),
+            "checked_at": time.time(),
+            "error": error,
+        }
+
+    # ---------- views ----------
+
+    def snapshot(self) -> Dict:
+        services = {"app": "ok"}
+        details: Dict[str, str] = {}
+        circuits: Dict[str, Dict] = {}
+        for name, br in breakers.items():
+            res = self.results[name]
+            circuits[name] = {**br.snapshot(), "probe": res}
+            if br.state == OPEN:
+                services[name] = "error"
+                details[name] = res["error"] or br.last_error or "circuit open"
+            else:
+                services[name] = res["status"]
+                if res["error"]:
+                    details[name] = res["error"]
+        overall_ok = all(v == "ok" for k, v in services.items() if k == "app" or k in self._probes)
+        return {
+            "status": "ok" if overall_ok else "degraded",
+            "services": services,
+            "details": details,  # empty if everything is ok
+            "circuits": circuits,
+        }
+
+    def live(self) -> Dict:
+        return {"status": "ok"}
+
+    def not_ready(self) -> List[str]:
+        """Required dependencies that are down or not probed yet."""
+        waiting = []
+        for name in settings.HEALTH_READY_DEPENDENCIES:
+            if breakers[name].state == OPEN:
+                waiting.append(name)
+            elif name in self._probes and self.results[name]["status"] == "unknown":
+                waiting.append(name)
+        return waiting
+
+
+health_monitor = HealthMonitor()
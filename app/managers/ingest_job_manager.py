@@ -0,0 +1,213 @@
+# app/managers/ingest_job_manager.py
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Dict, Optional
+
+from app.config.settings import settings
+from app.infra import job_repository as jobs
+from app.infra import usage
+from app.infra.metrics import INGEST_JOBS_RUNNING
+from app.managers.document_ingest_pg import ingest_pdf_to_pg
+
+log = logging.getLogger(__name__)
+
+_HOST = socket.gethostname()
+_TERMINAL = ("done", "failed", "cancelled")
+
+
+class IngestJobManager:
+    """
+    Runs /docs/ingest-pdf uploads in the background.
+
+    - uploads are spooled to INGEST_SPOOL_DIR and recorded in ingest_job;
+      unless INGEST_SPOOL_SHARED, only processes on the spooling host claim them
+    - INGEST_WORKERS asyncio workers claim jobs from Postgres
+      (FOR UPDATE SKIP LOCKED), so several app processes can share the queue
+    - while a job runs, its progress counters are flushed every
+      INGEST_HEARTBEAT_S; the same update doubles as the heartbeat and
+      returns the cancel flag
+    - spool files of jobs that ended without a worker (cancelled while
+      queued, given up as stale) or of uploads that never became a job are
+      removed every INGEST_SPOOL_SWEEP_S
+    - after a crash/restart, jobs whose heartbeat went stale are claimed again;
+      the previous holder's claim token stops matching, so its heartbeat,
+      its document write (locked to the claim in the same transaction) and
+      its final status are refused and it leaves the job to the new owner
+    """
+
+    def __init__(self):
+        self._wake = asyncio.Event()
+        self._workers: list[asyncio.Task] = []
+
+    # ---------- lifecycle ----------
+
+    async def start(self) -> None:
+        os.makedirs(settings.INGEST_SPOOL_DIR, exist_ok=True)
+        self._workers = [
+            asyncio.create_task(self._worker(i)) for i in range(settings.INGEST_WORKERS)
+        ]
+        self._workers.append(asyncio.create_task(self._spool_janitor()))
+
+    async def stop(self) -> None:
+        for w in self._workers:
+            w.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    # ---------- API ----------
+
+    def spool_path(self) -> str:
+        return os.path.join(settings.INGEST_SPOOL_DIR, f"{uuid.uuid4()}.pdf")
+
+    async def submit(self, file_path: str, filename: str | None, params: dict) -> str:
+        sc = usage.current()
+        if sc is not None:
+            params = {**params, "tenant": sc.tenant}  # embedding spend is billed to the uploader
+        job_id = await jobs.create_job(
+            file_path, filename, params, None if settings.INGEST_SPOOL_SHARED else _HOST
+        )
+        self._wake.set()
+        return job_id
+
+    async def status(self, job_id: str) -> Optional[Dict]:
+        return await jobs.get_job(job_id)
+
+    async def cancel(self, job_id: str) -> Optional[str]:
+        return await jobs.request_cancel(job_id)
+
+    # ---------- workers ----------
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            try:
+                job = await jobs.claim_next_job(
+                    settings.INGEST_JOB_STALE_S, settings.INGEST_JOB_MAX_ATTEMPTS, _HOST
+                )
+            except Exception:
+                log.exception("ingest worker %d: claim failed", n)
+                job = None
+
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), settings.INGEST_POLL_S)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            with INGEST_JOBS_RUNNING.track_inprogress():
+                await self._run(job)
+
+    async def _spool_janitor(self) -> None:
+        while True:
+            await asyncio.sleep(settings.INGEST_SPOOL_SWEEP_S)
+            try:
+                await self.sweep_spool()
+            except Exception:
+                log.exception("ingest spool sweep failed")
+
+    async def sweep_spool(self) -> int:
+        """
+        Remove spooled uploads whose job is over, or that have no job and are
+        older than INGEST_SPOOL_ORPHAN_S (an upload is spooled before its job
+        row exists). Returns the number of files removed.
+        """
+        root = settings.INGEST_SPOOL_DIR
+        try:
+            names = [n for n in os.listdir(root) if n.endswith(".pdf")]
+        except FileNotFoundError:
+            return 0
+        if not names:
+            return 0
+        paths = [os.path.join(root, n) for n in names]  # as spool_path() builds them
+        statuses = await jobs.spool_file_statuses(paths)
+        now, removed = time.time(), 0
+        for path in paths:
+            status = statuses.get(path)
+            try:
+                if status in _TERMINAL or (
+                    status is None and now - os.path.getmtime(path) > settings.INGEST_SPOOL_ORPHAN_S
+                ):
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        if removed:
+            log.info("ingest spool: removed %d files", removed)
+        return removed
+
+    async def _run(self, job: Dict) -> None:
+        job_id, token = job["job_id"], job["claim_token"]
+        progress: Dict[str, int] = {}
+
+        def on_progress(counter: str, value: int) -> None:
+            progress[counter] = value
+
+        params = job["params"]
+        # the task copies the context: its upstream calls are this job's usage
+        with usage.scope("ingest", params.get("tenant"), job_id):
+            usage.tag(params.get("model_id"))
+            task = asyncio.create_task(
+                ingest_pdf_to_pg(
+                    job["file_path"],
+                    title=job["filename"],
+                    subject=params.get("subject"),
+                    model_id=params.get("model_id"),
+                    model_name=params.get("model_name"),
+                    progress=on_progress,
+                    doc_key=params.get("doc_key"),
+                    fence=lambda cur: jobs.lock_claim(cur, job_id, token),
+                )
+            )
+
+        lost = False
+        try:
+            while not task.done():
+                await asyncio.wait({task}, timeout=settings.INGEST_HEARTBEAT_S)
+                if task.done():
+                    break
+                try:
+                    if await jobs.heartbeat(job_id, token, progress):
+                        task.cancel()
+                except jobs.JobLost:
+                    lost = True
+                    task.cancel()
+                except Exception:
+                    log.exception("ingest job %s: heartbeat failed", job_id)
+        except asyncio.CancelledError:
+            # app shutdown: the job stays 'running' with its spooled file and
+            # is claimed again once its heartbeat goes stale
+            task.cancel()
+            raise
+
+        try:
+            if lost:
+                raise jobs.JobLost(job_id)
+            try:
+                result = task.result()
+            except asyncio.CancelledError:
+                await jobs.finish_job(job_id, token, "cancelled", progress)
+            except jobs.JobLost:
+                raise
+            except Exception as e:
+                log.exception("ingest job %s failed", job_id)
+                await jobs.finish_job(job_id, token, "failed", progress, error=str(e))
+            else:
+                await jobs.finish_job(job_id, token, "done", progress, result=result)
+        except jobs.JobLost:
+            # the new owner needs the spooled file; the fence kept us from writing after the loss
+            log.warning("ingest job %s: claimed by another worker, leaving it to them", job_id)
+            return
+
+        try:
+            os.remove(job["file_path"])
+        except FileNotFoundError:
+            pass
+
+
+ingest_jobs = IngestJobManager()
@@ -1,5 +1,6 @@
+import asyncio
 from typing import List, Dict
-from app.clients.openai_client import llm
+from app.managers.speech_manager import synthesize_to_cache
 
 SYSTEM = ("You are a concise AR tutor. "
           "Write short, simple lines aligned with the timeline steps.")
@@ -13,3 +14,16 @@ class NarrationManager:
             txt = f"{target}: {st['effect']}"
             lines.append({"t": st["t"], "text": txt})
         return lines
+
+    async def attach_audio(self, lines: List[Dict]) -> List[Dict]:
+        # Narration lines repeat across runs, so these are mostly TTS cache hits
+        keys = await asyncio.gather(
+            *(synthesize_to_cache(line["text"]) for line in lines),
+            return_exceptions=True,
+        )
+        for line, key in zip(lines, keys):
+            if isinstance(key, Exception):
+                continue  # audio is best-effort; Unity falls back to text
+            line["audio_key"] = key
+            line["audio_url"] = f"/tts/{key}"
+        return lines
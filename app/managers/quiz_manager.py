@@ -1,18 +1,29 @@
 # app/managers/quiz_manager.py
 from typing import Dict, List, Optional, Any
 from app.clients.neo4j_client import neo4j_client
-from app.clients.openai_client import client
+from app.clients.openai_client import gateway, Priority
 from app.config.settings import settings
+from app.infra import usage
+from app.infra.cache import cache, cached
+from app.infra.chunking import encoding
+from app.infra.metrics import STAGE_SECONDS
+from app.infra.tracing import traced
 import json
+import time
 import uuid
 
+# generated quizzes, served again when a usage budget is exhausted;
+# model snapshots have their own namespace, "quiz"
+_quizzes = cache.namespace("quiz_generated")
+
 class QuizManager:
     """
     Builds a model-scoped knowledge snapshot from Neo4j and asks the LLM
     to generate MCQs strictly from that context. No persistence.
     """
 
-    def _fetch_model_snapshot(
+    @cached("quiz")
+    async def _fetch_model_snapshot(
         self,
         model_id: Optional[str],
         model_name: Optional[str],
@@ -59,7 +70,7 @@ class QuizManager:
         LIMIT $limitParts
         """
 
-        recs = neo4j_client.run(q, params)
+        recs = await neo4j_client.run(q, params, query="quiz_snapshot")
         parts = recs[0]["parts"] if recs else []
         return {"parts": parts}
 
@@ -71,13 +82,20 @@ class QuizManager:
             "Return STRICT JSON matching the provided schema."
         )
 
-    def _user_prompt(self, snapshot: Dict[str, Any], num_q: int, difficulty: str) -> str:
+    def _user_prompt(
+        self,
+        snapshot: Dict[str, Any],
+        num_q: int,
+        difficulty: str,
+        max_tokens: Optional[int] = None,
+    ) -> str:
         # Compact context — safe to inline because we're not persisting anywhere
         parts = snapshot.get("parts", [])
+        max_tokens = settings.QUIZ_CONTEXT_MAX_TOKENS if max_tokens is None else max_tokens
         # Keep it short: just names + key facts
-        bullets: List[str] = []
+        entries: List[str] = []
         for p in parts:
-            bullets.append(f"- Part: {p.get('name','')}")
+            bullets = [f"- Part: {p.get('name','')}"]
             d = p.get("description") or ""
             if d:
                 bullets.append(f"  Desc: {d[:220]}")
@@ -87,8 +105,19 @@ class QuizManager:
             procs = p.get("processes") or []
             if procs:
                 bullets.append(f"  Processes: {', '.join(procs[:6])}")
+            entries.append("\n".join(bullets))
 
-        ctx = "\n".join(bullets[:1200])  # cap to keep prompt tight
+        # whole parts only, in snapshot order, within max_tokens
+        kept: List[str] = []
+        used = 0
+        sizes = encoding(settings.LLM_MODEL).encode_ordinary_batch(entries) if entries else []
+        for entry, ids in zip(entries, sizes):
+            used += len(ids) + 1  # + the joining newline
+            if used > max_tokens and kept:
+                break
+            kept.append(entry)
+
+        ctx = "\n".join(kept)
         return (
             f"CONTEXT (graph-derived, authoritative):\n{ctx}\n\n"
             f"Generate exactly {num_q} MCQs for difficulty='{difficulty}'. "
@@ -116,31 +145,53 @@ class QuizManager:
         }
         return example
 
-    def generate_quiz(
+    @traced("quiz.generate_quiz")
+    async def generate_quiz(
         self,
         model_id: Optional[str],
         model_name: Optional[str],
         num_questions: int,
         difficulty: str,
         include_parts: Optional[List[str]] = None,
+        budget: str = usage.OK,
     ) -> List[Dict[str, Any]]:
-        snapshot = self._fetch_model_snapshot(model_id, model_name, include_parts)
+        """
+        budget (usage.budget_mode()): "reduced" asks for half the questions
+        from half the context; "cached_only" returns the last quiz generated
+        for the same model and difficulty, or none.
+        """
+        usage.tag(model_id)
+        quiz_key = (model_id, model_name, difficulty, sorted(include_parts or []), settings.LLM_MODEL)
+        if budget == usage.CACHED_ONLY:
+            return ((await _quizzes.get(quiz_key)) or [])[:num_questions]
+
+        max_tokens = None
+        if budget == usage.REDUCED:
+            num_questions = max(1, num_questions // 2)
+            max_tokens = int(settings.QUIZ_CONTEXT_MAX_TOKENS * settings.USAGE_REDUCED_CONTEXT_RATIO)
+
+        t0 = time.perf_counter()
+        with STAGE_SECONDS.labels("quiz", "snapshot").time():
+            snapshot = await self._fetch_model_snapshot(model_id, model_name, include_parts)
         sys_prompt = self._system_prompt()
-        user_prompt = self._user_prompt(snapshot, num_questions, difficulty)
+        user_prompt = self._user_prompt(snapshot, num_questions, difficulty, max_tokens)
 
         # Use JSON mode for robust parsing
-        completion = client.chat.completions.create(
-            model=settings.LLM_MODEL,  # e.g., "gpt-4o-mini"
-            temperature=0.6,
-            response_format={"type": "json_object"},
-            messages=[
-                {"role": "system", "content": sys_prompt},
-                {"role": "user", "content": user_prompt},
-                {"role": "system", "content": "Output must be a JSON object with a 'questions' array matching this example:"},
-                {"role": "system", "content": json.dumps(self._response_schema_json())},
-            ],
-        )
+        with STAGE_SECONDS.labels("quiz", "llm").time():
+            completion = await gateway.chat(
+                [
+                    {"role": "system", "content": sys_prompt},
+                    {"role": "user", "content": user_prompt},
+                    {"role": "system", "content": "Output must be a JSON object with a 'questions' array matching this example:"},
+                    {"role": "system", "content": json.dumps(self._response_schema_json())},
+                ],
+                model=settings.LLM_MODEL,  # e.g., "gpt-4o-mini"
+                temperature=0.6,
+                response_format={"type": "json_object"},
+                priority=Priority.STANDARD,
+            )
 
+        t_parse = time.perf_counter()
         raw = completion.choices[0].message.content
         try:
             data = json.loads(raw)
@@ -169,4 +220,9 @@ class QuizManager:
                 "sources": [str(s) for s in (q.get("sources") or [])],
             })
 
+        done = time.perf_counter()
+        STAGE_SECONDS.labels("quiz", "parse").observe(done - t_parse)
+        STAGE_SECONDS.labels("quiz", "total").observe(done - t0)
+        if cleaned and budget == usage.OK:
+            await _quizzes.set(quiz_key, cleaned)
         return cleaned
@@ -1,24 +1,52 @@
 # app/managers/rag_manager.py
 
-from typing import List, Dict, Optional
-
-from neo4j.exceptions import Neo4jError, ServiceUnavailable
-
-from app.infra.doc_repository import ann_search
+import asyncio
+import logging
+import time
+from typing import Any, List, Dict, Optional, Tuple
+
+import psycopg
+
+from app.infra import usage
+from app.infra.cache import cache
+from app.infra.context_packer import pack_context
+from app.infra.doc_repository import ann_search, ann_search_batch
+from app.infra.circuit_breaker import CircuitOpenError, breakers
+from app.infra.deadline import Budget, StageTimeout, run_stage
+from app.infra.metrics import (
+    QA_CONTEXT_TOKENS,
+    QA_CONTEXT_TOKENS_SAVED,
+    RETRIEVAL_STAGE_DROPPED,
+    STAGE_SECONDS,
+)
+from app.infra.rerank import rerank
+from app.infra.tracing import current_span, traced
+from app.infra.vector_tier import vector_tier
 from app.managers.graph_manager import GraphManager
-from app.clients.openai_client import llm, client
+from app.clients.neo4j_client import neo4j_client
+from app.clients.openai_client import gateway, Priority
 from app.config.settings import settings
 
+log = logging.getLogger(__name__)
+
 graph = GraphManager()
 
+# Answers and query embeddings are cached (app/infra/cache.py); identical
+# concurrent misses (e.g. a whole class asking the same question) are
+# computed once and shared.
+_answers = cache.namespace("qa")
+_embeddings = cache.namespace("embedding")
 
-def _embed_query(q: str) -> List[float]:
-    """Create an embedding for the user question."""
-    res = client.embeddings.create(
-        model=settings.EMBEDDING_MODEL,
-        input=[q],
-    )
-    return res.data[0].embedding
+_retrieval_seconds = STAGE_SECONDS.labels("qa", "retrieval")
+_rerank_seconds = STAGE_SECONDS.labels("qa", "rerank")
+_pack_seconds = STAGE_SECONDS.labels("qa", "pack")
+_llm_seconds = STAGE_SECONDS.labels("qa", "llm")
+_total_seconds = STAGE_SECONDS.labels("qa", "total")
+
+
+async def _embed_query_upstream(q: str) -> List[float]:
+    embs = await gateway.embed([q], priority=Priority.INTERACTIVE)
+    return embs[0]
 
 
 def _rrf(ch: List[Dict], gh: List[Dict], k: int = 60) -> List[Dict]:
@@ -31,7 +59,7 @@ def _rrf(ch: List[Dict], gh: List[Dict], k: int = 60) -> List[Dict]:
     ordered: List[Dict] = []
 
     # rank document hits
-    for rank, it in enumerate(sorted(ch, key=lambda x: x["score"], reverse=True), 1):
+    for rank, it in enumerate(sorted(ch, key=lambda x: x.get("rerank", x["score"]), reverse=True), 1):
         rid = it["id"]
         ranks[rid] = ranks.get(rid, 0.0) + 1.0 / (k + rank)
         ordered.append(it)
@@ -73,43 +101,100 @@ def _normalize_part_name(raw: Optional[str]) -> Optional[str]:
     return val
 
 
-def ask_hybrid(
-    question: str,
-    model_id: Optional[str] = None,
-    model_name: Optional[str] = None,
-    part_name: Optional[str] = None,
-    scene: Optional[str] = None,
-) -> str:
-    """
-    Hybrid RAG pipeline:
+def _drop(dropped: List[str], stage: str) -> None:
+    dropped.append(stage)
+    RETRIEVAL_STAGE_DROPPED.labels(stage).inc()
 
-      1. Dense retrieval from Postgres/pgvector (doc_chunk table),
-         optionally filtered by meta (model_id, scene).
 
-      2. Structured retrieval from Neo4j:
-         - If part_name is provided, resolve it tolerantly.
-         - Otherwise, infer a part via function mapping from the user question.
-
-      3. Reciprocal Rank Fusion of doc + graph hits.
-
-      4. LLM answer constrained to retrieved context.
+async def _dense_hits(
+    question: str,
+    filters: Dict[str, str],
+    budget: Budget,
+    dropped: List[str],
+) -> Tuple[List[Dict], Optional[List[float]]]:
+    """
+    Dense retrieval from Postgres/pgvector: embed the question, then ANN.
+    Returns (hits, question embedding). With RERANK_ENABLED it over-fetches
+    RERANK_CANDIDATES hits for app.infra.rerank to narrow down.
     """
+    if not breakers["postgres"].available() and not vector_tier.serves(filters.get("model_id")):
+        _drop(dropped, "ann")  # Postgres is down: don't spend an embedding on it
+        return [], None
 
-    # ---------- 1) dense retrieval from pgvector ----------
-    filters: Dict[str, str] = {}
-    if model_id:
-        filters["model_id"] = model_id
-    if scene:
-        filters["scene"] = scene
-
-    q_emb = _embed_query(question)
-    doc_hits = ann_search(
-        question_embedding=q_emb,
-        n_results=settings.TOP_K_CHROMA,
-        filters=filters or None,
-    )
+    try:
+        # cache/coalesce identical questions, but let a hedge be a real second request.
+        # The shared call only has the stage's own ceiling; each caller's budget bounds
+        # its own wait, so a leader short on budget can't time out its followers.
+        q_emb = await asyncio.wait_for(
+            _embeddings.get_or_compute(
+                (settings.EMBEDDING_MODEL, question),
+                lambda: run_stage(
+                    "embedding",
+                    lambda: _embed_query_upstream(question),
+                    settings.EMBED_DEADLINE_MS / 1000.0,
+                    hedge=True,
+                ),
+            ),
+            budget.timeout(settings.EMBED_DEADLINE_MS),
+        )
+    except (StageTimeout, asyncio.TimeoutError):
+        _drop(dropped, "embedding")
+        return [], None
 
-    # ---------- 2) graph facts (robust & tolerant) ----------
+    n_results = settings.TOP_K_CHROMA
+    if settings.RERANK_ENABLED:
+        n_results = max(n_results, settings.RERANK_CANDIDATES)
+    try:
+        hits = await run_stage(
+            "ann",
+            lambda: ann_search(
+                question_embedding=q_emb,
+                n_results=n_results,
+                filters=filters or None,
+                with_embeddings=settings.RERANK_ENABLED and settings.RERANK_FETCH_EMBEDDINGS,
+            ),
+            budget.timeout(settings.ANN_DEADLINE_MS),
+            hedge=True,
+        )
+    except (StageTimeout, CircuitOpenError):
+        _drop(dropped, "ann")
+        return [], q_emb
+    except psycopg.Error as e:
+        # connection lost, pool exhausted, statement timeout: answer from the graph
+        log.warning("qa: ANN search failed, answering from the graph: %r", e)
+        _drop(dropped, "ann")
+        return [], q_emb
+    return hits, q_emb
+
+
+def _graph_hit(ctx: Dict[str, Any], model_id: Optional[str]) -> Dict:
+    """A part context from GraphManager as a retrieval hit."""
+    snippet = (
+        f"Part: {ctx['name']}. "
+        f"Functions: {', '.join(ctx['functions'])}. "
+        f"Processes: {', '.join(ctx['processes'])}. "
+        f"Connects to: {', '.join(ctx['connects_to'])}. "
+        f"Description: {ctx['description']}"
+    )
+    return {
+        "id": f"graph::{ctx['name']}",
+        "text": snippet,
+        "meta": {
+            "source": "graph",
+            "part": ctx["name"],
+            "model_id": model_id,
+        },
+        "score": 1.0,
+    }
+
+
+async def _graph_hits(
+    question: str,
+    model_id: Optional[str],
+    model_name: Optional[str],
+    part_name: Optional[str],
+) -> List[Dict]:
+    """Structured retrieval from Neo4j (robust & tolerant)."""
     graph_hits: List[Dict] = []
     try:
         chosen: Optional[str] = None
@@ -119,7 +204,7 @@ def ask_hybrid(
 
         # (b) if we have a candidate part, try to resolve context
         if norm_part:
-            ctx = graph.get_part_context(
+            ctx = await graph.get_part_context(
                 part_name=norm_part,
                 model_id=model_id,
             )
@@ -128,7 +213,7 @@ def ask_hybrid(
 
         # (c) if no chosen part yet, infer from question via functions/processes
         if not chosen:
-            chosen = graph.find_part_by_function(
+            chosen = await graph.find_part_by_function(
                 user_question=question,
                 model_id=model_id,
                 model_name=model_name,
@@ -136,50 +221,222 @@ def ask_hybrid(
 
         # (d) fetch final context for chosen part
         if chosen:
-            ctx = graph.get_part_context(
+            ctx = await graph.get_part_context(
                 part_name=chosen,
                 model_id=model_id,
             )
             if ctx:
-                snippet = (
-                    f"Part: {ctx['name']}. "
-                    f"Functions: {', '.join(ctx['functions'])}. "
-                    f"Processes: {', '.join(ctx['processes'])}. "
-                    f"Connects to: {', '.join(ctx['connects_to'])}. "
-                    f"Description: {ctx['description']}"
-                )
-                graph_hits.append(
-                    {
-                        "id": f"graph::{chosen}",
-                        "text": snippet,
-                        "meta": {
-                            "source": "graph",
-                            "part": chosen,
-                            "model_id": model_id,
-                        },
-                        "score": 1.0,
-                    }
-                )
-
-    except (Neo4jError, ServiceUnavailable, OSError):
+                graph_hits.append(_graph_hit(ctx, model_id))
+
+    except neo4j_client.errors:
         # If Neo4j misbehaves, we gracefully fall back to pure doc RAG.
         graph_hits = []
 
-    # ---------- 3) fuse results ----------
-    fused = _rrf(doc_hits, graph_hits)[: settings.MAX_CHUNKS]
+    return graph_hits
+
+
+async def _graph_stage(
+    question: str,
+    model_id: Optional[str],
+    model_name: Optional[str],
+    part_name: Optional[str],
+    budget: Budget,
+    dropped: List[str],
+) -> List[Dict]:
+    if not breakers["neo4j"].available():
+        _drop(dropped, "graph")  # skip at once instead of waiting out the driver timeout
+        return []
+    try:
+        return await run_stage(
+            "graph",
+            lambda: _graph_hits(question, model_id, model_name, part_name),
+            budget.timeout(settings.GRAPH_DEADLINE_MS),
+            hedge=True,
+        )
+    except StageTimeout:
+        _drop(dropped, "graph")
+        return []
+
+
+def _normalize_question(q: str) -> str:
+    """Case/whitespace/trailing-punctuation insensitive key for coalescing."""
+    return " ".join(q.lower().split()).rstrip(" ?!.")
+
+
+@traced("qa.ask_hybrid")
+async def ask_hybrid(
+    question: str,
+    model_id: Optional[str] = None,
+    model_name: Optional[str] = None,
+    part_name: Optional[str] = None,
+    scene: Optional[str] = None,
+    budget: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Caching front for _ask_hybrid, keyed on the normalized (question,
+    model, part, scene): concurrent requests share one pipeline run, and
+    complete answers (no dropped stage) are reused until the "qa" TTL or
+    the next ingest.
+
+    Usage budgets (app/infra/usage.py): a "reduced" request gets a smaller
+    context; a "cached_only" one only a cached answer, else
+    USAGE_EXHAUSTED_ANSWER. Either way the result carries "budget". Pass
+    budget when the caller already checked it (audio routes, before Whisper).
+    """
+    usage.tag(model_id)
+    mode = usage.budget_mode() if budget is None else budget
+    key = _answer_key(question, model_id, model_name, part_name, scene)
+    if mode == usage.CACHED_ONLY:
+        res = await _answers.get(key)
+        return exhausted_answer() if res is None else {**res, "budget": mode}
+
+    res = await _answers.get_or_compute(
+        key,
+        lambda: _ask_hybrid(question, model_id, model_name, part_name, scene, _max_context_tokens(mode)),
+        store_if=_storable,
+        flight=mode,  # a reduced run must not answer callers with the full budget
+    )
+    if mode != usage.OK and res.get("budget") is None:
+        res = {**res, "budget": mode}  # a cached full answer, as ask_hybrid_batch labels them
+    return res
+
+
+def _answer_key(
+    question: str,
+    model_id: Optional[str],
+    model_name: Optional[str],
+    part_name: Optional[str],
+    scene: Optional[str],
+) -> Tuple:
+    norm_part = _normalize_part_name(part_name)
+    return (
+        _normalize_question(question),
+        model_id,
+        model_name,
+        norm_part.lower() if norm_part else None,
+        scene,
+        settings.LLM_MODEL,
+    )
+
+
+def _storable(res: Dict[str, Any]) -> bool:
+    # a reduced-context answer is not what the next caller should get
+    return not res["dropped_stages"] and res.get("budget") is None
+
+
+def _max_context_tokens(mode: str) -> Optional[int]:
+    if mode == usage.REDUCED:
+        return int(settings.QA_CONTEXT_MAX_TOKENS * settings.USAGE_REDUCED_CONTEXT_RATIO)
+    return None
 
-    # ---------- 4) build context blocks ----------
-    blocks: List[str] = []
-    if graph_hits:
-        blocks.append("[GRAPH] " + graph_hits[0]["text"])
 
-    for i, c in enumerate(fused):
-        # avoid repeating the graph snippet
-        if c.get("meta", {}).get("source") == "graph":
-            continue
-        blocks.append(f"[DOC-{i+1}] {c['text']}")
+def exhausted_answer() -> Dict[str, Any]:
+    """What a "cached_only" request gets when nothing is cached for it."""
+    return {"answer": settings.USAGE_EXHAUSTED_ANSWER, "dropped_stages": ["budget"],
+            "context": None, "budget": usage.CACHED_ONLY}
 
-    # ---------- 5) construct prompt ----------
+
+async def _ask_hybrid(
+    question: str,
+    model_id: Optional[str] = None,
+    model_name: Optional[str] = None,
+    part_name: Optional[str] = None,
+    scene: Optional[str] = None,
+    max_context_tokens: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Hybrid RAG pipeline:
+
+      1. Dense retrieval from Postgres/pgvector (doc_chunk table),
+         optionally filtered by meta.model_id. The scene is not a filter
+         (ingested chunks carry none); it only boosts hits in step 3.
+
+      2. Structured retrieval from Neo4j:
+         - If part_name is provided, resolve it tolerantly.
+         - Otherwise, infer a part via function mapping from the user question.
+
+      Steps 1 and 2 are independent and run concurrently, so retrieval
+      costs max(dense, graph) rather than their sum. Each stage (embedding,
+      ann, graph) has a deadline inside QA_RETRIEVAL_BUDGET_MS; a stage that
+      misses it is dropped and we continue with whatever hits we have.
+
+      3. Re-ranking: the RERANK_CANDIDATES over-fetched doc hits are
+         re-scored by exact cosine plus part/scene boosts and narrowed to
+         TOP_K_CHROMA by MMR (app/infra/rerank.py).
+
+      4. Reciprocal Rank Fusion of doc + graph hits.
+
+      5. Context packing: adjacent chunks merged, near-duplicates dropped,
+         the rest fitted into max_context_tokens, default QA_CONTEXT_MAX_TOKENS
+         (app/infra/context_packer.py).
+
+      6. LLM answer constrained to retrieved context.
+
+    Returns {"answer": str, "dropped_stages": [stage, ...], "context":
+    {"tokens", "tokens_saved", "citations": [...]}}, plus "budget":
+    "reduced" when max_context_tokens was lowered for a usage budget.
+    """
+
+    # ---------- 1+2) dense (embed -> ANN) and graph retrieval, concurrently ----------
+    filters: Dict[str, str] = {}
+    if model_id:
+        filters["model_id"] = model_id
+
+    t0 = time.perf_counter()
+    budget = Budget(settings.QA_RETRIEVAL_BUDGET_MS)
+    dropped: List[str] = []
+    (doc_hits, q_emb), graph_hits = await asyncio.gather(
+        _dense_hits(question, filters, budget, dropped),
+        _graph_stage(question, model_id, model_name, part_name, budget, dropped),
+    )
+    _retrieval_seconds.observe(time.perf_counter() - t0)
+    return await _answer(
+        question, doc_hits, q_emb, graph_hits, dropped, part_name, scene, max_context_tokens, t0,
+    )
+
+
+async def _answer(
+    question: str,
+    doc_hits: List[Dict],
+    q_emb: Optional[List[float]],
+    graph_hits: List[Dict],
+    dropped: List[str],
+    part_name: Optional[str],
+    scene: Optional[str],
+    max_context_tokens: Optional[int],
+    t0: float,
+) -> Dict[str, Any]:
+    """Steps 3-6 of _ask_hybrid, from one question's retrieved hits."""
+    sp = current_span()
+
+    # ---------- 3) re-rank the over-fetched doc hits ----------
+    if settings.RERANK_ENABLED and doc_hits:
+        # the part the graph resolved beats the raw request field
+        part = graph_hits[0]["meta"]["part"] if graph_hits else _normalize_part_name(part_name)
+        t1 = time.perf_counter()
+        sp.set("qa.rerank_candidates", len(doc_hits))
+        doc_hits = rerank(doc_hits, q_emb, settings.TOP_K_CHROMA, part=part, scene=scene)
+        elapsed = time.perf_counter() - t1
+        _rerank_seconds.observe(elapsed)
+        sp.set("qa.rerank_ms", round(elapsed * 1000, 2))
+
+    # ---------- 4) fuse results ----------
+    fused = _rrf(doc_hits, graph_hits)[: settings.MAX_CHUNKS]
+    sp.set("qa.doc_hits", len(doc_hits))
+    sp.set("qa.graph_hits", len(graph_hits))
+    sp.set("qa.dropped_stages", dropped)
+
+    # ---------- 5) pack context blocks ----------
+    with _pack_seconds.time():
+        packed = pack_context(fused, graph_hits[0] if graph_hits else None, max_context_tokens)
+    blocks = packed["blocks"]
+    QA_CONTEXT_TOKENS.labels("packed").observe(packed["tokens"])
+    QA_CONTEXT_TOKENS.labels("baseline").observe(packed["tokens_baseline"])
+    QA_CONTEXT_TOKENS_SAVED.inc(packed["tokens_saved"])
+    sp.set("qa.context_tokens", packed["tokens"])
+    sp.set("qa.context_tokens_saved", packed["tokens_saved"])
+
+    # ---------- 6) construct prompt ----------
     if not blocks:
         prompt = (
             "You are an honest tutor. The system could not retrieve any useful "
@@ -197,5 +454,237 @@ def ask_hybrid(
             "Answer in 3–6 short, clear sentences."
         )
 
-    msg = llm.invoke(prompt)
-    return msg.content
+    with _llm_seconds.time():
+        completion = await gateway.chat(
+            [{"role": "user", "content": prompt}],
+            temperature=0.2,
+            priority=Priority.INTERACTIVE,
+        )
+    answer = completion.choices[0].message.content
+    _total_seconds.observe(time.perf_counter() - t0)
+    res = {
+        "answer": answer,
+        "dropped_stages": dropped,
+        "context": {
+            "tokens": packed["tokens"],
+            "tokens_saved": packed["tokens_saved"],
+            "citations": packed["citations"],
+        },
+    }
+    if max_context_tokens is not None:
+        res["budget"] = usage.REDUCED
+    return res
+
+
+# ---------- batch ----------
+
+async def _embed_queries(questions: List[str], timeout: float) -> List[List[float]]:
+    """Embeddings for questions: cached ones reused, the rest in one upstream call."""
+    keys = [(settings.EMBEDDING_MODEL, q) for q in questions]
+    embs = list(await asyncio.gather(*(_embeddings.get(k) for k in keys)))
+    missing = [i for i, e in enumerate(embs) if e is None]
+    if missing:
+        fresh = await run_stage(
+            "embedding",
+            lambda: gateway.embed([questions[i] for i in missing], priority=Priority.INTERACTIVE),
+            timeout,
+        )
+        for i, e in zip(missing, fresh):
+            embs[i] = e
+        await asyncio.gather(*(_embeddings.set(keys[i], embs[i]) for i in missing))
+    return embs
+
+
+async def _dense_hits_batch(
+    questions: List[str],
+    filters: Dict[str, str],
+    budget: Budget,
+    dropped: List[str],
+) -> Tuple[List[List[Dict]], List[Optional[List[float]]]]:
+    """_dense_hits for several questions: one embedding call, one batched ANN."""
+    n = len(questions)
+    if not breakers["postgres"].available() and not vector_tier.serves(filters.get("model_id")):
+        _drop(dropped, "ann")
+        return [[] for _ in range(n)], [None] * n
+
+    try:
+        q_embs = await _embed_queries(questions, budget.timeout(settings.EMBED_DEADLINE_MS))
+    except StageTimeout:
+        _drop(dropped, "embedding")
+        return [[] for _ in range(n)], [None] * n
+    except Exception as e:
+        # breaker open or an OpenAI error: carry on graph-only rather than fail every question
+        log.warning("qa batch: embedding failed, answering from the graph: %r", e)
+        _drop(dropped, "embedding")
+        return [[] for _ in range(n)], [None] * n
+
+    n_results = settings.TOP_K_CHROMA
+    if settings.RERANK_ENABLED:
+        n_results = max(n_results, settings.RERANK_CANDIDATES)
+    try:
+        hits = await run_stage(
+            "ann",
+            lambda: ann_search_batch(
+                question_embeddings=q_embs,
+                n_results=n_results,
+                filters=filters or None,
+                with_embeddings=settings.RERANK_ENABLED and settings.RERANK_FETCH_EMBEDDINGS,
+            ),
+            budget.timeout(settings.ANN_DEADLINE_MS),
+        )
+    except (StageTimeout, CircuitOpenError):
+        _drop(dropped, "ann")
+        return [[] for _ in range(n)], q_embs
+    except psycopg.Error as e:
+        log.warning("qa batch: ANN search failed, answering from the graph: %r", e)
+        _drop(dropped, "ann")
+        return [[] for _ in range(n)], q_embs
+    return hits, q_embs
+
+
+async def _graph_hits_batch(
+    questions: List[str],
+    part_names: List[Optional[str]],
+    model_id: Optional[str],
+    model_name: Optional[str],
+) -> List[List[Dict]]:
+    """
+    _graph_hits for several questions: parts are inferred from the question
+    where none was given (cached per question), then the union of parts is
+    fetched in one query. A given part that doesn't resolve falls back to
+    inference, at the cost of a second fetch.
+    """
+    n = len(questions)
+    try:
+        chosen: List[Optional[str]] = [_normalize_part_name(p) for p in part_names]
+
+        async def infer(idx: List[int]) -> None:
+            found = await asyncio.gather(*(
+                graph.find_part_by_function(user_question=questions[i], model_id=model_id, model_name=model_name)
+                for i in idx
+            ))
+            for i, part in zip(idx, found):
+                chosen[i] = part or None
+
+        await infer([i for i in range(n) if not chosen[i]])
+        ctxs = await graph.get_parts_context(sorted({c for c in chosen if c}), model_id=model_id)
+
+        unresolved = [i for i in range(n) if chosen[i] and chosen[i] not in ctxs and part_names[i]]
+        if unresolved:
+            await infer(unresolved)
+            more = sorted({chosen[i] for i in unresolved if chosen[i]} - set(ctxs))
+            if more:
+                ctxs.update(await graph.get_parts_context(more, model_id=model_id))
+
+        return [[_graph_hit(ctxs[c], model_id)] if c in ctxs else [] for c in chosen]
+    except neo4j_client.errors:
+        return [[] for _ in range(n)]
+
+
+async def _graph_stage_batch(
+    questions: List[str],
+    part_names: List[Optional[str]],
+    model_id: Optional[str],
+    model_name: Optional[str],
+    budget: Budget,
+    dropped: List[str],
+) -> List[List[Dict]]:
+    if not breakers["neo4j"].available():
+        _drop(dropped, "graph")
+        return [[] for _ in questions]
+    try:
+        return await run_stage(
+            "graph",
+            lambda: _graph_hits_batch(questions, part_names, model_id, model_name),
+            budget.timeout(settings.GRAPH_DEADLINE_MS),
+        )
+    except StageTimeout:
+        _drop(dropped, "graph")
+        return [[] for _ in questions]
+
+
+@traced("qa.ask_batch")
+async def ask_hybrid_batch(
+    items: List[Tuple[str, Optional[str]]],
+    model_id: Optional[str] = None,
+    model_name: Optional[str] = None,
+    scene: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    ask_hybrid for several (question, part_name) pairs about one model and
+    scene, sharing the retrieval work:
+
+      - cached answers are served as they are; repeated questions run once
+      - the rest are embedded in one upstream call (cached embeddings reused)
+      - ANN for all of them in one round trip (ann_search_batch)
+      - graph: one fetch for the union of their parts
+      - re-rank, pack and answer per question, QA_BATCH_CONCURRENCY LLM
+        calls at a time
+
+    The retrieval deadlines apply to the batch as a whole. Returns one
+    result per item, in input order: ask_hybrid's dict, or {"error": str}
+    when that question failed.
+    """
+    usage.tag(model_id)
+    mode = usage.budget_mode()
+    sp = current_span()
+    sp.set("qa.batch_size", len(items))
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    slots: Dict[Tuple, List[int]] = {}
+    for i, (question, part_name) in enumerate(items):
+        slots.setdefault(_answer_key(question, model_id, model_name, part_name, scene), []).append(i)
+
+    def fill(key: Tuple, res: Dict[str, Any]) -> None:
+        for i in slots[key]:
+            results[i] = res
+
+    keys = list(slots)
+    pending: List[Tuple] = []
+    for key, res in zip(keys, await asyncio.gather(*(_answers.get(k) for k in keys))):
+        if res is not None:
+            fill(key, res if mode == usage.OK else {**res, "budget": mode})
+        elif mode == usage.CACHED_ONLY:
+            fill(key, exhausted_answer())
+        else:
+            pending.append(key)
+    sp.set("qa.batch_pending", len(pending))
+    if not pending:
+        return results
+
+    questions = [items[slots[k][0]][0] for k in pending]
+    part_names = [items[slots[k][0]][1] for k in pending]
+    filters: Dict[str, str] = {}
+    if model_id:
+        filters["model_id"] = model_id  # scene: re-rank boost only, as in _ask_hybrid
+
+    t0 = time.perf_counter()
+    budget = Budget(settings.QA_RETRIEVAL_BUDGET_MS)
+    dropped: List[str] = []
+    (doc_hits, q_embs), graph_hits = await asyncio.gather(
+        _dense_hits_batch(questions, filters, budget, dropped),
+        _graph_stage_batch(questions, part_names, model_id, model_name, budget, dropped),
+    )
+    _retrieval_seconds.observe(time.perf_counter() - t0)
+
+    max_tokens = _max_context_tokens(mode)
+    gate = asyncio.Semaphore(settings.QA_BATCH_CONCURRENCY)
+
+    async def answer(j: int) -> Dict[str, Any]:
+        async with gate:
+            return await _answer(
+                questions[j], doc_hits[j], q_embs[j], graph_hits[j], list(dropped),
+                part_names[j], scene, max_tokens, t0,
+            )
+
+    # through the cache: shares the LLM call with a concurrent single ask of the same question
+    outs = await asyncio.gather(
+        *(_answers.get_or_compute(key, lambda j=j: answer(j), store_if=_storable, flight=mode) for j, key in enumerate(pending)),
+        return_exceptions=True,
+    )
+    for key, res in zip(pending, outs):
+        if isinstance(res, BaseException):
+            log.warning("qa batch: question %d failed: %r", slots[key][0], res)
+            res = {"error": str(res) or type(res).__name__}
+        fill(key, res)
+    return results
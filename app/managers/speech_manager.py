@@ -0,0 +1,130 @@
+# app/managers/speech_manager.py
+import asyncio
+import io
+import logging
+import time
+from contextlib import asynccontextmanager, ExitStack
+from typing import AsyncIterator, Dict, Optional, Tuple
+from app.clients.openai_client import gateway, Priority
+from app.config.settings import settings
+from app.infra import usage
+from app.infra.audio import prepare_for_whisper
+from app.infra.tts_cache import TTSCache, tts_cache
+from app.infra.singleflight import SingleFlight
+from app.infra.metrics import (
+    AUDIO_INGRESS_BYTES,
+    AUDIO_UPSTREAM_BYTES,
+    WHISPER_LATENCY_SECONDS,
+)
+
+log = logging.getLogger(__name__)
+
+# concurrent misses for the same clip share one TTS call
+_tts_flight = SingleFlight("tts")
+
+
+async def transcribe(
+    audio_bytes: bytes,
+    filename: str = "audio.wav",
+    audio_seconds: Optional[float] = None,
+) -> str:
+    """
+    Whisper transcription of raw audio bytes.
+    The filename extension tells the API which container/codec it is.
+    """
+    audio_file = io.BytesIO(audio_bytes)
+    audio_file.name = filename
+    return await gateway.transcribe(audio_file, priority=Priority.INTERACTIVE, audio_seconds=audio_seconds)
+
+
+async def transcribe_upload(
+    audio_bytes: bytes,
+    content_type: Optional[str] = None,
+    filename: Optional[str] = None,
+) -> Tuple[str, Dict[str, float]]:
+    """
+    Normalize client audio (decode, mono 16 kHz, silence trim, compact
+    re-encode) and transcribe it. Returns (text, stats) where stats has
+    bytes_in, bytes_upstream and transcribe_ms for this request.
+    """
+    # decode/resample/encode is CPU work: keep it off the event loop
+    payload, upstream_name, stats = await asyncio.to_thread(
+        prepare_for_whisper, audio_bytes, content_type, filename
+    )
+
+    t0 = time.perf_counter()
+    text = await transcribe(payload, filename=upstream_name, audio_seconds=stats.get("seconds_upstream"))
+    elapsed = time.perf_counter() - t0
+
+    stats["transcribe_ms"] = round(elapsed * 1000, 1)
+    AUDIO_INGRESS_BYTES.observe(stats["bytes_in"])
+    AUDIO_UPSTREAM_BYTES.observe(stats["bytes_upstream"])
+    WHISPER_LATENCY_SECONDS.observe(elapsed)
+    log.info("whisper: %s", stats)
+    return text, stats
+
+
+async def _synthesize_upstream(text: str) -> bytes:
+    return await gateway.speech(text, priority=Priority.INTERACTIVE)
+
+
+async def _synthesize_into_cache(key: str, text: str) -> None:
+    audio = await _synthesize_upstream(text)
+    await asyncio.to_thread(tts_cache.put, key, audio)
+
+
+async def synthesize_to_cache(text: str) -> str:
+    """
+    Return the TTS cache key for text, calling OpenAI TTS only on a miss.
+    Read the audio with tts_cache.open(key) or serve it via GET /tts/{key}.
+    Raises usage.BudgetExhausted on a miss when the request is over budget.
+    """
+    key = TTSCache.key(text, settings.TTS_VOICE, settings.TTS_MODEL, settings.TTS_FORMAT)
+    if tts_cache.get(key) is None:
+        if usage.budget_mode(count=False) == usage.CACHED_ONLY:
+            raise usage.BudgetExhausted("TTS")
+        await _tts_flight.do(key, lambda: _synthesize_into_cache(key, text))
+    return key
+
+
+@asynccontextmanager
+async def open_synthesized(text: str) -> AsyncIterator[Tuple[str, memoryview]]:
+    """
+    (key, audio) for text, synthesized on a miss; audio is a memoryview
+    over the cached file (see tts_cache.open). If another worker evicts the
+    file between the lookup and the read, the clip is synthesized again.
+    """
+    for attempt in range(2):
+        key = await synthesize_to_cache(text)
+        with ExitStack() as stack:
+            try:
+                audio = stack.enter_context(tts_cache.open(key))
+            except FileNotFoundError:
+                if attempt:
+                    raise
+                continue
+            yield key, audio
+            return
+
+
+@asynccontextmanager
+async def open_cached(text: str) -> AsyncIterator[Optional[Tuple[str, memoryview]]]:
+    """
+    (key, audio) for text when its clip is already in the TTS cache, else
+    None. Never calls TTS: for requests that may only be served from cache.
+    """
+    key = TTSCache.key(text, settings.TTS_VOICE, settings.TTS_MODEL, settings.TTS_FORMAT)
+    with ExitStack() as stack:
+        hit = None
+        if tts_cache.get(key) is not None:
+            try:
+                hit = key, stack.enter_context(tts_cache.open(key))
+            except FileNotFoundError:
+                pass  # evicted by another worker since the lookup
+        yield hit
+
+
+async def synthesize(text: str) -> bytes:
+    """Text-to-speech, returned as raw audio bytes (TTS_FORMAT, WAV by default)."""
+    async with open_synthesized(text) as (_, audio):
+        return bytes(audio)
@@ -0,0 +1,72 @@
+# scripts/bench_chunker.py
+"""
+Benchmark for app/infra/chunking.py: the legacy chunker vs. the streaming
+one as chunks get bigger. The legacy loop rebuilds the current chunk string
+per sentence (quadratic in chunk length); the new one should stay flat per
+MB of input. The legacy chunker is the frozen copy in tests/test_chunking.py,
+whose golden tests check that CharMeasure reproduces it exactly.
+
+Usage:
+  python scripts/bench_chunker.py
+  python scripts/bench_chunker.py --mb 8 --sizes 1200 120000 1000000
+
+The token-measure run needs the tiktoken encoding for EMBEDDING_MODEL (it is
+downloaded on first use); it is skipped with a note when unavailable.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.infra.chunking import CharMeasure, TokenMeasure, iter_chunks  # noqa: E402
+from tests.test_chunking import legacy_chunk, make_text  # noqa: E402
+
+
+def _time(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def bench(mb: float, sizes: List[int]) -> None:
+    rng = random.Random(11)
+    text = make_text(rng, 10)
+    while len(text) < mb * 1_000_000:
+        text += " " + make_text(rng, 2000)
+    mb_in = len(text) / 1_000_000
+
+    try:
+        tokens = TokenMeasure()
+    except Exception as e:
+        tokens = None
+        print(f"token measure unavailable ({type(e).__name__}); skipping token runs")
+
+    print(f"\n{mb_in:.1f} MB of text, one page")
+    print(f"  {'max chars':>10}{'legacy s':>10}{'chars s':>10}{'tokens s':>10}")
+    for size in sizes:
+        legacy = _time(lambda: legacy_chunk(text, size, size // 2, 150))
+        chars = _time(lambda: list(iter_chunks(
+            [(1, text)], size, size // 2, 150, span_pages=False, measure=CharMeasure())))
+        tok = "-"
+        if tokens is not None:
+            # ~4 chars per token keeps the chunk sizes comparable
+            tok = "%.2f" % _time(lambda: list(iter_chunks(
+                [(1, text)], size // 4, size // 8, 40, span_pages=False, measure=tokens)))
+        print(f"  {size:>10}{legacy:>10.2f}{chars:>10.2f}{tok:>10}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mb", type=float, default=4.0)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1200, 120000, 1000000])
+    args = ap.parse_args()
+    bench(args.mb, args.sizes)
+
+
+if __name__ == "__main__":
+    main()
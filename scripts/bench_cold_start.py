@@ -0,0 +1,148 @@
+# scripts/bench_cold_start.py
+"""
+Cold start to first successful request: spawns `uvicorn app.main:app` on a
+free port --runs times and measures process spawn -> first 200 on --path.
+Exits non-zero when the median exceeds --budget-ms, so it can gate CI.
+
+Usage:
+  python scripts/bench_cold_start.py
+  python scripts/bench_cold_start.py --runs 10 --budget-ms 1500 --path /health/live
+  python scripts/bench_cold_start.py --profile          # per-module import time
+
+--profile runs `python -X importtime -c "import app.main"` and sums the
+self time per app module and per third-party top-level package, so a
+heavy import that sneaks back into the import path is easy to spot.
+Upstreams don't need to be reachable: clients are built lazily and the
+health monitor only probes in the background.
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# enough for Settings() to validate; nothing is contacted during startup
+_ENV_DEFAULTS = {
+    "OPENAI_API_KEY": "sk-bench",
+    "NEO4J_URI": "bolt://127.0.0.1:7687",
+    "NEO4J_USERNAME": "neo4j",
+    "NEO4J_PASSWORD": "bench",
+}
+
+
+def _env() -> Dict[str, str]:
+    env = {**_ENV_DEFAULTS, **os.environ}
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# ---------- cold start ----------
+
+def cold_start(path: str, timeout_s: float) -> float:
+    """Seconds from spawning uvicorn to the first 200 on `path`."""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}{path}"
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        while time.perf_counter() - t0 < timeout_s:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with {proc.returncode}:\n{proc.stderr.read().decode()}")
+            try:
+                with urllib.request.urlopen(url, timeout=1.0) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - t0
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.005)
+        raise TimeoutError(f"no 200 from {url} within {timeout_s:g}s")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+# ---------- import profile ----------
+
+def import_profile() -> Tuple[float, List[Tuple[str, float]], List[Tuple[str, float]]]:
+    """(total seconds, [(app module, self s)], [(third-party package, self s)])."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, env=_env(), capture_output=True, text=True, check=True,
+    ).stderr
+    app_modules: Dict[str, float] = {}
+    packages: Dict[str, float] = defaultdict(float)
+    total = 0.0
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (p.strip() for p in line[len("import time:"):].split("|"))
+        if name == "app.main":
+            total = int(cumulative_us) / 1e6
+        if name.startswith("app.") or name == "app":
+            app_modules[name] = int(self_us) / 1e6
+        else:
+            packages[name.split(".")[0]] += int(self_us) / 1e6
+    by_time = lambda kv: -kv[1]  # noqa: E731
+    return total, sorted(app_modules.items(), key=by_time), sorted(packages.items(), key=by_time)
+
+
+def print_profile(top: int) -> None:
+    total, app_modules, packages = import_profile()
+    print(f"import app.main: {total * 1000:.0f} ms\n")
+    print(f"{'third-party package':<32} {'self ms':>9}")
+    for name, s in packages[:top]:
+        print(f"{name:<32} {s * 1000:>9.1f}")
+    print(f"\n{'app module':<45} {'self ms':>9}")
+    for name, s in app_modules[:top]:
+        print(f"{name:<45} {s * 1000:>9.1f}")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--path", default="/health/live")
+    ap.add_argument("--budget-ms", type=float, default=2000.0, help="fail if the median is above this")
+    ap.add_argument("--timeout-s", type=float, default=30.0)
+    ap.add_argument("--profile", action="store_true", help="print the import-time breakdown instead")
+    ap.add_argument("--top", type=int, default=15)
+    args = ap.parse_args()
+
+    if args.profile:
+        print_profile(args.top)
+        return 0
+
+    samples = []
+    for i in range(args.runs):
+        s = cold_start(args.path, args.timeout_s)
+        samples.append(s)
+        print(f"run {i + 1}: {s * 1000:.0f} ms")
+    p50 = statistics.median(samples)
+    verdict = "ok" if p50 * 1000 <= args.budget_ms else "OVER BUDGET"
+    print(f"cold start -> first 200 on {args.path}: p50 {p50 * 1000:.0f} ms, "
+          f"max {max(samples) * 1000:.0f} ms (budget {args.budget_ms:.0f} ms) {verdict}")
+    return 0 if verdict == "ok" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+# scripts/bench_pdf_extract.py
+"""
+Pages/second of PDF text extraction: in-process serial vs. the process pool
+(app/infra/pdf_extract.py) at several worker counts.
+
+Usage:
+  python scripts/bench_pdf_extract.py
+  python scripts/bench_pdf_extract.py --pages 300 600 --workers 1 2 4 8
+  python scripts/bench_pdf_extract.py --pdf path/to/manual.pdf
+
+Without --pdf, synthetic fixtures of --pages pages (dense text, ~45 lines
+per page) are generated in a temp dir. Every run is checked against the
+serial output so ordering bugs show up as a failure, not a fast number.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.infra.pdf_extract import _extract_range, iter_page_texts, read_metadata  # noqa: E402
+
+_WORDS = (
+    "compressor turbine blade shaft bearing combustor nozzle fan stator rotor "
+    "airflow pressure temperature thrust bypass ratio spool casing seal fuel"
+).split()
+
+
+# ---------- fixture ----------
+
+def _page_stream(page_no: int, lines: int = 45) -> bytes:
+    out = ["BT", "/F1 10 Tf", "12 TL", "50 800 Td"]
+    for ln in range(lines):
+        words = [_WORDS[(page_no * 7 + ln * 3 + k) % len(_WORDS)] for k in range(12)]
+        text = f"Page {page_no} line {ln}: " + " ".join(words) + "."
+        out.append(f"({text}) Tj T*")
+    out.append("ET")
+    return "\n".join(out).encode("latin-1")
+
+
+def write_fixture(path: str, pages: int) -> None:
+    """Minimal hand-rolled PDF: one Helvetica font, one text stream per page."""
+    objs: List[bytes] = []
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(pages))
+    objs.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objs.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+    objs.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for i in range(pages):
+        stream = _page_stream(i + 1)
+        objs.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode()
+        )
+        objs.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    buf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, body in enumerate(objs, start=1):
+        offsets.append(len(buf))
+        buf += b"%d 0 obj\n" % n + body + b"\nendobj\n"
+    xref = len(buf)
+    buf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    for off in offsets:
+        buf += b"%010d 00000 n \n" % off
+    buf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(buf)
+
+
+# ---------- runs ----------
+
+def bench(path: str, worker_counts: List[int], pages_per_task: int) -> None:
+    _, page_count = read_metadata(path)
+
+    t0 = time.perf_counter()
+    baseline = _extract_range(path, 0, page_count)
+    serial_s = time.perf_counter() - t0
+    print(f"\n{os.path.basename(path)}: {page_count} pages, {os.cpu_count()} CPUs")
+    print(f"  {'mode':<12}{'seconds':>10}{'pages/s':>10}{'speedup':>10}")
+    print(f"  {'serial':<12}{serial_s:>10.2f}{page_count / serial_s:>10.1f}{1.0:>10.2f}")
+
+    for w in worker_counts:
+        with ProcessPoolExecutor(w, mp_context=multiprocessing.get_context("spawn")) as pool:
+            # start the workers outside the timed region, as the app's shared pool would be
+            list(pool.map(int, range(w)))
+            t0 = time.perf_counter()
+            got = [text for _, text in iter_page_texts(path, page_count, pool, pages_per_task)]
+            elapsed = time.perf_counter() - t0
+        if got != baseline:
+            raise SystemExit(f"workers={w}: output differs from serial extraction")
+        print(f"  {f'{w} workers':<12}{elapsed:>10.2f}{page_count / elapsed:>10.1f}{serial_s / elapsed:>10.2f}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pdf", action="append", help="benchmark an existing PDF (repeatable)")
+    ap.add_argument("--pages", type=int, nargs="+", default=[200, 500])
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    ap.add_argument("--pages-per-task", type=int, default=16)
+    args = ap.parse_args()
+
+    if args.pdf:
+        for path in args.pdf:
+            bench(path, args.workers, args.pages_per_task)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.pages:
+            path = os.path.join(tmp, f"fixture_{n}p.pdf")
+            write_fixture(path, n)
+            bench(path, args.workers, args.pages_per_task)
+
+
+if __name__ == "__main__":
+    main()
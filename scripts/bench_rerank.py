@@ -0,0 +1,115 @@
+# scripts/bench_rerank.py
+"""
+Per-request cost of re-ranking (app/infra/rerank.py) on synthetic hits.
+
+For each candidate count, builds that many 1536-d hits the way ann_search
+returns them with with_embeddings=True (vectors in pgvector's binary
+vector_send form, with ingest-shaped meta and a share of their texts
+naming the part and scene) and
+times, over --iterations runs:
+
+  parse    vector_send bytes -> float32 arrays (done in ann_search)
+  rerank   exact cosine + boosts + MMR down to --k
+
+Exits non-zero when p99 of parse + rerank at the configured
+RERANK_CANDIDATES exceeds --budget-ms. No database or upstream is needed.
+BLAS thread wake-ups dominate the tail on small matrices; compare with
+OPENBLAS_NUM_THREADS=1 (or OMP_NUM_THREADS=1) when p99 looks noisy.
+
+Usage:
+  python scripts/bench_rerank.py
+  python scripts/bench_rerank.py --candidates 40 80 160 --k 6 --iterations 500
+"""
+
+import argparse
+import os
+import struct
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.config.settings import settings  # noqa: E402
+from app.infra.rerank import parse_vector, rerank  # noqa: E402
+
+DIM = 1536  # doc_chunk.embedding is vector(1536)
+FILLER = "Remove the inlet cowl and inspect the rotor stage for damage before the next flight. " * 12
+
+
+def vector_send(v: np.ndarray) -> bytes:
+    """pgvector's binary output for v: int16 dim, int16 unused, float4 big-endian."""
+    return struct.pack(">hh", len(v), 0) + v.astype(">f4").tobytes()
+
+
+def make_rows(n: int, rng: np.random.Generator):
+    """(query, rows): rows are (id, text, meta, score, vector_send bytes) near the query."""
+    q = rng.standard_normal(DIM).astype(np.float32)
+    q /= np.linalg.norm(q)
+    E = q + rng.standard_normal((n, DIM)).astype(np.float32) * 0.05
+    E /= np.linalg.norm(E, axis=1, keepdims=True)
+    rows = []
+    for i, e in enumerate(E):
+        meta = {"page": i // 4, "page_end": i // 4, "chunk_index": i, "model_id": "jet-engine-v1",
+                "model_name": "Jet Engine", "subject": "manual"}
+        text = FILLER
+        if i % 5 == 0:
+            text += " Check the fan blades for nicks."
+        if i % 7 == 0:
+            text += " The overview shows the whole engine."
+        rows.append((f"c{i}", text, meta, float(e @ q), vector_send(e)))
+    return q, rows
+
+
+def bench(n: int, k: int, iterations: int, rng: np.random.Generator) -> Dict[str, float]:
+    q, rows = make_rows(n, rng)
+    parse_ms: List[float] = []
+    rerank_ms: List[float] = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        hits = [
+            {"id": rid, "text": text, "meta": meta, "score": score, "embedding": parse_vector(blob)}
+            for rid, text, meta, score, blob in rows
+        ]
+        t1 = time.perf_counter()
+        rerank(hits, q.tolist(), k, part="Fan Blades", scene="overview")
+        t2 = time.perf_counter()
+        parse_ms.append((t1 - t0) * 1000)
+        rerank_ms.append((t2 - t1) * 1000)
+    total = np.array(parse_ms) + np.array(rerank_ms)
+    return {
+        "parse_p50": float(np.percentile(parse_ms, 50)),
+        "rerank_p50": float(np.percentile(rerank_ms, 50)),
+        "total_p50": float(np.percentile(total, 50)),
+        "total_p99": float(np.percentile(total, 99)),
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--candidates", type=int, nargs="+", default=[20, 40, 80, 160],
+                    help="RERANK_CANDIDATES is always included")
+    ap.add_argument("--k", type=int, default=6, help="matches TOP_K_CHROMA")
+    ap.add_argument("--iterations", type=int, default=300)
+    ap.add_argument("--budget-ms", type=float, default=5.0, help="fail if p99 at RERANK_CANDIDATES is above this")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    gate = settings.RERANK_CANDIDATES
+    print(f"{'candidates':>10}{'parse p50':>11}{'rerank p50':>12}{'total p50':>11}{'total p99':>11}  (ms)")
+    gated = 0.0
+    for n in sorted(set(args.candidates) | {gate}):
+        r = bench(n, args.k, args.iterations, rng)
+        if n == gate:
+            gated = r["total_p99"]
+        print(f"{n:>10}{r['parse_p50']:>11.3f}{r['rerank_p50']:>12.3f}{r['total_p50']:>11.3f}{r['total_p99']:>11.3f}")
+    verdict = "ok" if gated <= args.budget_ms else "OVER BUDGET"
+    print(f"p99 at RERANK_CANDIDATES={gate}: {gated:.3f} ms (budget {args.budget_ms:g} ms) {verdict}")
+    return 0 if verdict == "ok" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
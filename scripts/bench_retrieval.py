@@ -0,0 +1,283 @@
+# scripts/bench_retrieval.py
+"""
+Recall/latency benchmark for ann_search (pgvector HNSW) on synthetic corpora.
+
+For each corpus size:
+  1. generate clustered unit vectors spread over --models model_ids with
+     Zipf skew (a few big models, a long tail of small ones)
+  2. load them through the ingest write path (replace_document_version,
+     one document per model) with the HNSW index dropped
+  3. for each --m / --ef-construction pair: build the index, record build
+     time and index size
+  4. for each --ef-search: run the query set through the same SQL as
+     ann_search, unfiltered and filtered on meta->>'model_id', and compare
+     with exact brute-force ground truth computed in NumPy
+
+Filtered results are split into head (models in the top 10% by size) and
+tail, since tail filters are where HNSW post-filtering loses recall.
+
+Everything lives in a separate schema (--schema, default bench_retrieval)
+selected via PGOPTIONS search_path, so app tables are never touched. Use a
+local/disposable database (e.g. scripts/loadtest/docker-compose.yml); the
+pooled Supabase DSN does not accept startup options.
+
+Usage:
+  python scripts/bench_retrieval.py --sizes 10000
+  python scripts/bench_retrieval.py --sizes 10000 100000 1000000 --m 16 32 --ef-search 40 100 200
+  python scripts/bench_retrieval.py --sizes 100000 --iterative-scan relaxed_order --out bench.json
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+DIM = 1536  # doc_chunk.embedding is vector(1536)
+SCHEMA_SQL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pg_schema.sql")
+
+
+# ---------- synthetic corpus ----------
+
+def zipf_sizes(n: int, models: int, s: float) -> np.ndarray:
+    """Rows per model, Zipf(s) over model rank, every model gets at least one row."""
+    w = 1.0 / np.arange(1, models + 1) ** s
+    sizes = np.maximum(1, np.floor(w / w.sum() * n)).astype(np.int64)
+    sizes[0] += n - sizes.sum()  # rounding goes to the biggest model
+    return sizes
+
+
+def _unit(x: np.ndarray) -> np.ndarray:
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+class Corpus:
+    """
+    Vectors are topic centers plus noise, so neighbourhoods are meaningful.
+    Stored in a float32 memmap so 1M x 1536 does not need 6 GB of RAM.
+    """
+
+    def __init__(self, n: int, models: int, topics: int, skew: float, noise: float, seed: int, tmp: str):
+        rng = np.random.default_rng(seed)
+        self.n = n
+        self.sizes = zipf_sizes(n, models, skew)
+        self.model_of = np.repeat(np.arange(models), self.sizes)  # rows grouped by model
+        self.centers = _unit(rng.standard_normal((topics, DIM)).astype(np.float32))
+        self.noise = noise
+        self.vectors = np.lib.format.open_memmap(
+            os.path.join(tmp, f"corpus_{n}.npy"), mode="w+", dtype=np.float32, shape=(n, DIM))
+        block = 20_000
+        for lo in range(0, n, block):
+            hi = min(n, lo + block)
+            t = rng.integers(0, topics, hi - lo)
+            x = self.centers[t] + noise * rng.standard_normal((hi - lo, DIM)).astype(np.float32) / np.sqrt(DIM)
+            self.vectors[lo:hi] = _unit(x)
+        self.vectors.flush()
+
+    def queries(self, count: int, seed: int):
+        """Query vectors and, per query, a model_id drawn with the same skew as the data."""
+        rng = np.random.default_rng(seed + 1)
+        t = rng.integers(0, len(self.centers), count)
+        q = _unit(self.centers[t] + self.noise * rng.standard_normal((count, DIM)).astype(np.float32) / np.sqrt(DIM))
+        models = self.model_of[rng.integers(0, self.n, count)]
+        return q, models
+
+
+def ground_truth(corpus: Corpus, q: np.ndarray, q_models: np.ndarray, k: int):
+    """Exact top-k row indices by cosine: unfiltered and filtered to each query's model."""
+    nq = len(q)
+    best_all = np.full((nq, k), -np.inf, dtype=np.float32), np.full((nq, k), -1, dtype=np.int64)
+    best_flt = np.full((nq, k), -np.inf, dtype=np.float32), np.full((nq, k), -1, dtype=np.int64)
+    block = 50_000
+    for lo in range(0, corpus.n, block):
+        hi = min(corpus.n, lo + block)
+        scores = q @ np.asarray(corpus.vectors[lo:hi]).T  # (nq, block)
+        idx = np.arange(lo, hi)
+        for (bs, bi), s in ((best_all, scores),
+                            (best_flt, np.where(corpus.model_of[lo:hi][None, :] == q_models[:, None], scores, -np.inf))):
+            cat_s = np.concatenate([bs, s], axis=1)
+            cat_i = np.concatenate([bi, np.broadcast_to(idx, s.shape)], axis=1)
+            top = np.argpartition(-cat_s, k - 1, axis=1)[:, :k]
+            bs[:] = np.take_along_axis(cat_s, top, axis=1)
+            bi[:] = np.take_along_axis(cat_i, top, axis=1)
+    gt_all = [set(row.tolist()) for row in best_all[1]]
+    gt_flt = [set(i for i, s in zip(ri, rs) if np.isfinite(s)) for ri, rs in zip(best_flt[1], best_flt[0])]
+    return gt_all, gt_flt
+
+
+# ---------- database ----------
+
+def load_corpus(corpus: Corpus, batch: int) -> float:
+    """Write every row through replace_document_version (one document per model)."""
+    from app.config.settings import settings
+    from app.infra.doc_repository import replace_document_version
+
+    t0 = time.perf_counter()
+    start = 0
+    for m, size in enumerate(corpus.sizes):
+        rows = []
+        for i in range(start, start + int(size)):
+            text = f"bench chunk {i} of model {m}"
+            h = hashlib.sha256(f"{settings.EMBEDDING_MODEL}\0{text}".encode()).hexdigest()
+            meta = {"model_id": f"bench-model-{m}", "bench_idx": i}
+            rows.append((1, i - start, text, meta, h, corpus.vectors[i].tolist()))
+        # big models are written in slices, each its own document version
+        for part, lo in enumerate(range(0, len(rows), batch)):
+            replace_document_version(
+                doc_key=f"bench:{m}:{part}", fingerprint="bench", title=f"bench model {m}",
+                source="bench", subject=None, tags=None, rows=rows[lo:lo + batch],
+            )
+        start += int(size)
+    return time.perf_counter() - t0
+
+
+def build_index(m: int, ef_construction: int) -> Dict[str, float]:
+    from app.clients.postgres_client import get_conn
+
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("DROP INDEX IF EXISTS idx_doc_chunk_hnsw")
+    t0 = time.perf_counter()
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("SET maintenance_work_mem = '2GB'")
+        cur.execute(
+            f"CREATE INDEX idx_doc_chunk_hnsw ON doc_chunk USING hnsw (embedding vector_cosine_ops) "
+            f"WITH (m = {int(m)}, ef_construction = {int(ef_construction)})"
+        )
+    build_s = time.perf_counter() - t0
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("ANALYZE doc_chunk")
+        cur.execute("SELECT pg_relation_size('idx_doc_chunk_hnsw')")
+        size = cur.fetchone()[0]
+    return {"build_s": round(build_s, 2), "index_mb": round(size / 2**20, 1)}
+
+
+async def run_queries(q: np.ndarray, q_models: np.ndarray, k: int, filtered: bool) -> List[Any]:
+    """Same SQL and session tuning as ann_search, on one persistent connection."""
+    import psycopg
+    from app.clients.postgres_client import _conninfo
+    from app.infra.doc_repository import _ann_query, _ann_tuning
+
+    out = []
+    tuning = _ann_tuning()
+    async with await psycopg.AsyncConnection.connect(**_conninfo()) as conn:
+        for vec, model in zip(q, q_models):
+            filters = {"model_id": f"bench-model-{int(model)}"} if filtered else None
+            sql, params = _ann_query(vec.tolist(), k, filters)
+            t0 = time.perf_counter()
+            async with conn.transaction(), conn.cursor() as cur:
+                if tuning:
+                    await cur.execute(*tuning)
+                await cur.execute(sql, params)
+                rows = await cur.fetchall()
+            out.append((time.perf_counter() - t0, [r[2]["bench_idx"] for r in rows]))
+    return out
+
+
+def summarize(results, truth, k: int) -> Dict[str, Any]:
+    lat = np.array([r[0] for r in results]) * 1000
+    recalls = []
+    for (_, got), gt in zip(results, truth):
+        if gt:
+            recalls.append(len(set(got) & gt) / min(k, len(gt)))
+    return {
+        "queries": len(results),
+        f"recall@{k}": round(float(np.mean(recalls)), 4) if recalls else None,
+        "short_results": sum(1 for (_, got), gt in zip(results, truth) if len(got) < min(k, len(gt))),
+        "p50_ms": round(float(np.percentile(lat, 50)), 2),
+        "p95_ms": round(float(np.percentile(lat, 95)), 2),
+        "p99_ms": round(float(np.percentile(lat, 99)), 2),
+    }
+
+
+# ---------- main ----------
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="ann_search recall/latency benchmark.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    ap.add_argument("--models", type=int, default=200, help="distinct model_ids")
+    ap.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of rows per model")
+    ap.add_argument("--topics", type=int, default=500, help="vector clusters")
+    ap.add_argument("--noise", type=float, default=0.6)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=6, help="matches TOP_K_CHROMA")
+    ap.add_argument("--m", type=int, nargs="+", default=[16])
+    ap.add_argument("--ef-construction", type=int, nargs="+", default=[64])
+    ap.add_argument("--ef-search", type=int, nargs="+", default=[40, 100, 200])
+    ap.add_argument("--iterative-scan", default=None, help="hnsw.iterative_scan for all runs (pgvector >= 0.8)")
+    ap.add_argument("--batch", type=int, default=5000, help="rows per document version on load")
+    ap.add_argument("--schema", default="bench_retrieval")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--out", default="bench_retrieval.json")
+    args = ap.parse_args()
+
+    # must be set before the first connection is opened
+    os.environ["PGOPTIONS"] = f"-c search_path={args.schema},public"
+    from app.clients.postgres_client import get_conn
+    from app.config.settings import settings
+
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute(f"CREATE SCHEMA IF NOT EXISTS {args.schema}")
+    with get_conn() as conn, conn.cursor() as cur, open(SCHEMA_SQL) as f:
+        cur.execute(f.read())
+
+    settings.ANN_ITERATIVE_SCAN = args.iterative_scan
+    report: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            print(f"\n== {n} chunks, {args.models} models (Zipf {args.skew}) ==", flush=True)
+            corpus = Corpus(n, args.models, args.topics, args.skew, args.noise, args.seed, tmp)
+            q, q_models = corpus.queries(args.queries, args.seed)
+            t0 = time.perf_counter()
+            gt_all, gt_flt = ground_truth(corpus, q, q_models, args.k)
+            print(f"ground truth: {time.perf_counter() - t0:.1f}s", flush=True)
+
+            with get_conn() as conn, conn.cursor() as cur:
+                cur.execute("TRUNCATE document CASCADE")
+                cur.execute("DROP INDEX IF EXISTS idx_doc_chunk_hnsw")
+            load_s = load_corpus(corpus, args.batch)
+            print(f"loaded via replace_document_version: {load_s:.1f}s ({n / load_s:.0f} rows/s)", flush=True)
+
+            head_cut = max(1, args.models // 10)
+            head = q_models < head_cut  # models are numbered by size rank
+            for m in args.m:
+                for efc in args.ef_construction:
+                    idx = build_index(m, efc)
+                    print(f"index m={m} ef_construction={efc}: {idx['build_s']}s, {idx['index_mb']} MB", flush=True)
+                    print(f"  {'ef_search':>9} {'query':<15}{'recall':>8}{'short':>7}{'p50':>8}{'p95':>8}{'p99':>8}")
+                    for ef in args.ef_search:
+                        settings.ANN_EF_SEARCH = ef
+                        unf = asyncio.run(run_queries(q, q_models, args.k, filtered=False))
+                        flt = asyncio.run(run_queries(q, q_models, args.k, filtered=True))
+                        rows = {
+                            "unfiltered": summarize(unf, gt_all, args.k),
+                            "filtered": summarize(flt, gt_flt, args.k),
+                            "filtered_head": summarize([r for r, h in zip(flt, head) if h],
+                                                       [g for g, h in zip(gt_flt, head) if h], args.k),
+                            "filtered_tail": summarize([r for r, h in zip(flt, head) if not h],
+                                                       [g for g, h in zip(gt_flt, head) if not h], args.k),
+                        }
+                        for name, s in rows.items():
+                            print(f"  {ef:>9} {name:<15}{s[f'recall@{args.k}'] or 0:>8.3f}{s['short_results']:>7}"
+                                  f"{s['p50_ms']:>8.2f}{s['p95_ms']:>8.2f}{s['p99_ms']:>8.2f}", flush=True)
+                        report.append({
+                            "chunks": n, "m": m, "ef_construction": efc, "ef_search": ef,
+                            "iterative_scan": args.iterative_scan, "load_s": round(load_s, 1),
+                            **idx, "results": rows,
+                        })
+            del corpus
+
+    with open(args.out, "w") as f:
+        json.dump({"args": vars(args), "runs": report}, f, indent=2)
+    print(f"\nwritten to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
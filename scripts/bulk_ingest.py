@@ -0,0 +1,241 @@
+# scripts/bulk_ingest.py
+"""
+Bulk-ingest a directory tree of PDFs through the same pipeline as
+/docs/ingest-pdf (ingest_pdf_to_pg).
+
+- files run in parallel (--jobs), sharing the OpenAI gateway and PDF pool
+- documents get the same default doc_key as /docs/ingest-pdf (the file
+  name within its model_id, see default_doc_key), so a PDF ingested both
+  ways is stored once and a revised PDF replaces its previous version; a
+  manifest title or doc_key overrides it
+- a file that changed since the checkpoint replaces the document it
+  produced last time; identical files are skipped
+- finished files are appended to a checkpoint; after a crash, re-running
+  the same command skips everything already done (unless the file changed)
+- prints per-stage throughput at the end
+
+Usage:
+  python scripts/bulk_ingest.py library/
+  python scripts/bulk_ingest.py library/ --manifest library/manifest.json --jobs 4
+  python scripts/bulk_ingest.py library/ --dry-run
+
+Manifest (JSON); entries are matched against the relative path with
+fnmatch, later entries override earlier ones:
+  {
+    "defaults": {"subject": "aviation"},
+    "entries": [
+      {"match": "jet-engine/*", "model_id": "jet-engine-v1", "model_name": "Jet Engine"},
+      {"match": "jet-engine/fan.pdf", "subject": "fans", "tags": ["module"]}
+    ]
+  }
+Recognized keys: model_id, model_name, subject, tags, title, doc_key.
+"""
+
+import argparse
+import asyncio
+import fnmatch
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.clients.openai_client import gateway  # noqa: E402
+from app.infra import pdf_extract  # noqa: E402
+from app.infra.doc_repository import delete_document  # noqa: E402
+from app.managers.document_ingest_pg import ingest_pdf_to_pg  # noqa: E402
+
+_PARAM_KEYS = ("model_id", "model_name", "subject", "tags", "title", "doc_key")
+
+
+# ---------- discovery ----------
+
+def find_pdfs(root: str) -> List[str]:
+    """Relative paths of all PDFs under root, sorted."""
+    out = []
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            if name.lower().endswith(".pdf"):
+                out.append(os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, "/"))
+    return sorted(out)
+
+
+def load_manifest(path: str | None) -> Dict[str, Any]:
+    if not path:
+        return {"defaults": {}, "entries": []}
+    with open(path) as f:
+        manifest = json.load(f)
+    manifest.setdefault("defaults", {})
+    manifest.setdefault("entries", [])
+    return manifest
+
+
+def params_for(rel: str, manifest: Dict[str, Any]) -> Dict[str, Any]:
+    params = {k: v for k, v in manifest["defaults"].items() if k in _PARAM_KEYS}
+    for entry in manifest["entries"]:
+        if fnmatch.fnmatch(rel, entry.get("match", "")):
+            params.update({k: v for k, v in entry.items() if k in _PARAM_KEYS})
+    params.setdefault("title", os.path.basename(rel))
+    return params
+
+
+# ---------- checkpoint ----------
+
+def _file_state(path: str) -> Dict[str, int]:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _is_done(prev: Dict[str, Any] | None, state: Dict[str, int]) -> bool:
+    return bool(prev) and prev.get("size") == state["size"] and prev.get("mtime_ns") == state["mtime_ns"]
+
+
+def load_checkpoint(path: str) -> Dict[str, Dict[str, Any]]:
+    done: Dict[str, Dict[str, Any]] = {}
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # torn last line after a crash
+            done[rec["path"]] = rec
+    return done
+
+
+class Checkpoint:
+    """Append-only JSONL; one line per finished file, flushed immediately."""
+
+    def __init__(self, path: str):
+        self._f = open(path, "a")
+
+    def record(self, rel: str, state: Dict[str, int], result: Dict[str, Any]) -> None:
+        rec = {"path": rel, **state, "document_id": result["document_id"], "at": time.time()}
+        self._f.write(json.dumps(rec) + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def close(self) -> None:
+        self._f.close()
+
+
+# ---------- throughput ----------
+
+class Totals:
+    def __init__(self):
+        self.files = self.skipped = self.unchanged = self.failed = 0
+        self.pages = self.chunks = self.embeddings = self.rows = 0
+        self.parse_s = self.embed_s = self.write_s = 0.0
+
+    def add(self, stats: Dict[str, Any]) -> None:
+        self.files += 1
+        self.pages += stats.get("pages", 0)
+        self.chunks += stats.get("chunks", 0)
+        self.embeddings += stats.get("embeddings_created", 0)
+        self.rows += stats.get("chunks_inserted", 0) + stats.get("chunks_kept", 0)
+        self.parse_s += stats.get("parse_seconds", 0.0)
+        self.embed_s += stats.get("embed_seconds", 0.0)
+        self.write_s += stats.get("write_seconds", 0.0)
+
+    def report(self, wall_s: float) -> None:
+        def rate(n, s):
+            return f"{n / s:10.1f}" if s > 0 else f"{'-':>10}"
+
+        print(f"\nfiles: {self.files} ingested, {self.unchanged} unchanged, "
+              f"{self.skipped} skipped (checkpoint), {self.failed} failed; {wall_s:.1f}s wall")
+        # stage rate = work / time spent in that stage (summed over files);
+        # wall rate = work / elapsed time with --jobs files in parallel
+        print(f"  {'stage':<12}{'items':>10}{'stage s':>10}{'stage /s':>10}{'wall /s':>10}")
+        for name, n, s in (
+            ("pages", self.pages, self.parse_s),
+            ("chunks", self.chunks, self.parse_s),
+            ("embeddings", self.embeddings, self.embed_s),
+            ("rows", self.rows, self.write_s),
+        ):
+            print(f"  {name:<12}{n:>10}{s:>10.1f}{rate(n, s)}{rate(n, wall_s)}")
+
+
+# ---------- run ----------
+
+async def run(args) -> int:
+    root = os.path.abspath(args.root)
+    manifest = load_manifest(args.manifest)
+    files = find_pdfs(root)
+    done = load_checkpoint(args.checkpoint)
+
+    if args.dry_run:
+        for rel in files:
+            mark = "done" if _is_done(done.get(rel), _file_state(os.path.join(root, rel))) else "todo"
+            print(f"{mark:<5} {rel} {json.dumps(params_for(rel, manifest))}")
+        return 0
+
+    totals = Totals()
+    checkpoint = Checkpoint(args.checkpoint)
+    sem = asyncio.Semaphore(args.jobs)
+    n = len(files)
+
+    async def one(i: int, rel: str) -> None:
+        path = os.path.join(root, rel)
+        state = _file_state(path)
+        if _is_done(done.get(rel), state):
+            totals.skipped += 1
+            return
+        async with sem:
+            p = params_for(rel, manifest)
+            t0 = time.perf_counter()
+            try:
+                res = await ingest_pdf_to_pg(
+                    path,
+                    title=p.get("title"),
+                    subject=p.get("subject"),
+                    tags=p.get("tags"),
+                    model_id=p.get("model_id"),
+                    model_name=p.get("model_name"),
+                    doc_key=p.get("doc_key"),
+                )
+                prev_id = (done.get(rel) or {}).get("document_id")
+                shared = any(r.get("document_id") == prev_id for k, r in done.items() if k != rel)
+                if prev_id and prev_id != res["document_id"] and not shared:
+                    # its doc_key changed (manifest edit): drop the document it used to be
+                    await asyncio.to_thread(delete_document, prev_id)
+            except Exception as e:
+                totals.failed += 1
+                print(f"[{i}/{n}] FAILED {rel}: {e}", flush=True)
+                return
+        checkpoint.record(rel, state, res)
+        st = res["stats"]
+        if res["unchanged"]:
+            totals.unchanged += 1
+            print(f"[{i}/{n}] unchanged {rel}", flush=True)
+            return
+        totals.add(st)
+        print(f"[{i}/{n}] {rel}: {st['pages']} pages, {st['chunks']} chunks "
+              f"({st['embeddings_created']} embedded), {time.perf_counter() - t0:.1f}s", flush=True)
+
+    t0 = time.perf_counter()
+    try:
+        await asyncio.gather(*(one(i, rel) for i, rel in enumerate(files, start=1)))
+    finally:
+        checkpoint.close()
+        pdf_extract.shutdown()
+        await gateway.aclose()
+    totals.report(time.perf_counter() - t0)
+    return 1 if totals.failed else 0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Bulk-ingest a directory of PDFs.")
+    ap.add_argument("root", help="directory to scan for *.pdf")
+    ap.add_argument("--manifest", help="JSON manifest with per-path model_id/subject/...")
+    ap.add_argument("--jobs", type=int, default=4, help="files ingested concurrently")
+    ap.add_argument("--checkpoint", default="bulk_ingest.checkpoint.jsonl")
+    ap.add_argument("--dry-run", action="store_true", help="list files and resolved params only")
+    args = ap.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
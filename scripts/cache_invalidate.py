@@ -0,0 +1,53 @@
+# scripts/cache_invalidate.py
+"""
+Drop whole namespaces of the manager cache (app/infra/cache.py), e.g.
+after re-seeding or editing the graph.
+
+Usage:
+  python scripts/cache_invalidate.py graph playbook quiz
+  python scripts/cache_invalidate.py --all
+
+Namespaces: embedding, graph, playbook, quiz (snapshots), quiz_generated, qa. Only the shared backends
+(CACHE_BACKEND=shm or redis) can be reached from here; with the per-worker
+memory backend, restart the app instead.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.config.settings import settings  # noqa: E402
+from app.infra.cache import cache  # noqa: E402
+
+
+async def run(names) -> int:
+    try:
+        for name in names:
+            n = await cache.namespace(name).invalidate()
+            print(f"{name}: {n} entries dropped")
+    finally:
+        await cache.close()
+    return 0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("namespaces", nargs="*")
+    ap.add_argument("--all", action="store_true", help="every namespace in CACHE_TTL_S")
+    args = ap.parse_args()
+
+    names = list(settings.CACHE_TTL_S) if args.all else args.namespaces
+    if not names:
+        ap.error("name at least one namespace, or --all")
+    if not cache.backend.shared:
+        print(f"CACHE_BACKEND={settings.CACHE_BACKEND} is per process; restart the app to clear it",
+              file=sys.stderr)
+        return 1
+    return asyncio.run(run(names))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
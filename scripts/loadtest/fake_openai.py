@@ -0,0 +1,228 @@
+# scripts/loadtest/fake_openai.py
+"""
+Local stand-in for the OpenAI API used by the load tests.
+
+Implements the four endpoints the gateway calls:
+  POST /v1/chat/completions       deterministic answer (or quiz JSON for json_object)
+  POST /v1/embeddings             deterministic hashed bag-of-words vectors
+  POST /v1/audio/transcriptions   one of a fixed set of questions, picked by audio hash
+  POST /v1/audio/speech           WAV of silence, length proportional to the text
+
+Latency per call type is configurable (mean +/- jitter) and drawn from a
+seeded RNG, so two runs with the same flags see the same latency sequence.
+--error-rate returns that share of 429s (with Retry-After) to exercise the
+gateway's retry path. Every response carries x-ratelimit-* headers.
+
+Usage:
+  python scripts/loadtest/fake_openai.py --port 8099
+  python scripts/loadtest/fake_openai.py --chat-ms 800 --embed-ms 40 --jitter 0.3 --error-rate 0.02
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:8099/v1.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import struct
+import time
+from typing import Dict, List
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+EMBED_DIM = 1536  # must match doc_chunk.embedding in scripts/pg_schema.sql
+
+QUESTIONS = [
+    "What does the combustion canister do?",
+    "How do the turbine blades extract energy?",
+    "Which part guides the flow into the turbine?",
+    "What is the purpose of the engine mount?",
+    "Which lines carry fuel and oil?",
+]
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+# ---------- deterministic outputs ----------
+
+def fake_embedding(text: str, dim: int = EMBED_DIM) -> List[float]:
+    """
+    Hashed bag of words, L2-normalized: texts that share words get similar
+    vectors, so ANN over seeded chunks returns sensible neighbours.
+    scripts/loadtest/seed.py uses the same function for the seeded corpus.
+    """
+    vec = [0.0] * dim
+    for tok in _TOKEN_RE.findall(text.lower()):
+        h = hashlib.blake2b(tok.encode(), digest_size=8).digest()
+        idx = int.from_bytes(h[:4], "little") % dim
+        vec[idx] += 1.0 if h[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()[:12]
+
+
+def _quiz(prompt: str) -> Dict:
+    m = re.search(r"Generate exactly (\d+) MCQs", prompt)
+    n = int(m.group(1)) if m else 3
+    parts = re.findall(r"- Part: (.+)", prompt) or ["Turbine Blades", "Engine Mount"]
+    questions = []
+    for i in range(n):
+        part = parts[i % len(parts)]
+        others = [p for p in parts if p != part][:3]
+        options = [part] + others + [f"Distractor {j}" for j in range(3 - len(others))]
+        questions.append({
+            "id": f"q-{_digest(prompt)}-{i}",
+            "stem": f"Which component is described as '{part}'?",
+            "options": options,
+            "correct_index": 0,
+            "explanation": f"{part} is listed in the context.",
+            "sources": [part],
+        })
+    return {"questions": questions}
+
+
+def _silence_wav(seconds: float, rate: int = 24000) -> bytes:
+    n = int(seconds * rate)
+    data = b"\x00\x00" * n
+    header = b"RIFF" + struct.pack("<I", 36 + len(data)) + b"WAVE"
+    header += b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, rate, rate * 2, 2, 16)
+    header += b"data" + struct.pack("<I", len(data))
+    return header + data
+
+
+# ---------- server ----------
+
+def build_app(args) -> FastAPI:
+    app = FastAPI(title="fake-openai")
+    rng = random.Random(args.seed)
+    latency_ms = {
+        "chat": args.chat_ms,
+        "embeddings": args.embed_ms,
+        "transcription": args.whisper_ms,
+        "speech": args.tts_ms,
+    }
+    counts: Dict[str, int] = {k: 0 for k in latency_ms}
+
+    def headers() -> Dict[str, str]:
+        return {
+            "x-ratelimit-limit-requests": "100000",
+            "x-ratelimit-remaining-requests": "99999",
+            "x-ratelimit-reset-requests": "1ms",
+            "x-ratelimit-limit-tokens": "100000000",
+            "x-ratelimit-remaining-tokens": "99999999",
+            "x-ratelimit-reset-tokens": "1ms",
+        }
+
+    async def simulate(kind: str):
+        """Sleep for this call's latency; returns a 429 response for injected errors."""
+        counts[kind] += 1
+        mean = latency_ms[kind]
+        delay = max(0.0, rng.uniform(mean * (1 - args.jitter), mean * (1 + args.jitter)))
+        fail = rng.random() < args.error_rate
+        await asyncio.sleep(delay / 1000.0)
+        if fail:
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached (injected)", "type": "requests", "code": "rate_limit_exceeded"}},
+                status_code=429,
+                headers={**headers(), "retry-after": "0.05"},
+            )
+        return None
+
+    @app.post("/v1/chat/completions")
+    async def chat(request: Request):
+        body = await request.json()
+        if (err := await simulate("chat")) is not None:
+            return err
+        prompt = "\n".join(m.get("content") or "" for m in body.get("messages", []))
+        if (body.get("response_format") or {}).get("type") == "json_object":
+            content = json.dumps(_quiz(prompt))
+        else:
+            content = f"[fake {_digest(prompt)}] Based on the provided context, the part works as described."
+        p_tok = max(1, len(prompt) // 4)
+        c_tok = max(1, len(content) // 4)
+        return JSONResponse({
+            "id": f"chatcmpl-{_digest(prompt)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": p_tok, "completion_tokens": c_tok, "total_tokens": p_tok + c_tok},
+        }, headers=headers())
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        if (err := await simulate("embeddings")) is not None:
+            return err
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        tokens = sum(len(t) // 4 + 1 for t in inputs)
+        return JSONResponse({
+            "object": "list",
+            "model": body.get("model"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": fake_embedding(t)}
+                for i, t in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }, headers=headers())
+
+    @app.post("/v1/audio/transcriptions")
+    async def transcriptions(request: Request):
+        form = await request.form()
+        audio = await form["file"].read()
+        if (err := await simulate("transcription")) is not None:
+            return err
+        idx = int(hashlib.sha256(audio).hexdigest(), 16) % len(QUESTIONS)
+        return JSONResponse({"text": QUESTIONS[idx]}, headers=headers())
+
+    @app.post("/v1/audio/speech")
+    async def speech(request: Request):
+        body = await request.json()
+        if (err := await simulate("speech")) is not None:
+            return err
+        # ~15 characters per second of speech
+        wav = _silence_wav(min(30.0, len(body.get("input", "")) / 15.0))
+        return Response(wav, media_type="audio/wav", headers=headers())
+
+    @app.get("/v1/models")
+    async def models():
+        # health-probe target; no simulated latency or errors
+        return {"object": "list", "data": [{"id": "fake", "object": "model", "owned_by": "loadtest"}]}
+
+    @app.get("/_stats")
+    async def stats():
+        return {"calls": counts, "latency_ms": latency_ms, "jitter": args.jitter,
+                "error_rate": args.error_rate, "seed": args.seed}
+
+    return app
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Fake OpenAI API for load tests.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8099)
+    ap.add_argument("--chat-ms", type=float, default=400.0)
+    ap.add_argument("--embed-ms", type=float, default=60.0)
+    ap.add_argument("--whisper-ms", type=float, default=300.0)
+    ap.add_argument("--tts-ms", type=float, default=250.0)
+    ap.add_argument("--jitter", type=float, default=0.2, help="latency spread as a fraction of the mean")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered with 429")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+    uvicorn.run(build_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+# scripts/loadtest/run.py
+"""
+Closed-loop load driver for the API.
+
+Every endpoint is driven by --concurrency workers for --duration seconds
+(after --warmup seconds whose samples are discarded), one endpoint at a
+time, or all together with --mixed. Per endpoint it reports requests,
+errors, throughput and p50/p95/p99 latency, and writes a JSON summary
+that can be diffed between commits with --compare.
+
+Usage:
+  python scripts/loadtest/run.py --base-url http://127.0.0.1:8000
+  python scripts/loadtest/run.py --endpoints qa_ask health --concurrency 32 --duration 60
+  python scripts/loadtest/run.py --mixed --out after.json --compare before.json
+
+Endpoints: health, qa_ask, qa_find_part, qa_audio, qa_audio_raw,
+actions_resolve, quiz_generate, docs_ingest. docs_ingest also reports
+docs_ingest_job: upload -> job done, polled via GET /docs/jobs/{id}.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import math
+import os
+import random
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(HERE, "..")))
+
+from bench_pdf_extract import write_fixture  # noqa: E402
+
+MODEL_ID = "jet-engine-v1"
+ACTION_ID = "lt-inspect-turbine"
+
+QUESTIONS = [
+    "What does the combustion canister do?",
+    "How do the turbine blades extract energy?",
+    "Which part guides the flow into the turbine?",
+    "What is the purpose of the engine mount?",
+    "Which lines carry fuel and oil?",
+    "Why is there an inner turbine casing?",
+    "What are the fastening screws for?",
+    "How is the access panel used during maintenance?",
+]
+PARTS = ["Combustion Canister", "Turbine Blades", "Engine Mount", "Access Panel", None]
+FUNCTION_QUESTIONS = [
+    "Which part is responsible for fuel burning?",
+    "What handles energy extraction?",
+    "Show me the part for structural mounting.",
+    "Which component does flow guidance?",
+]
+
+
+# ---------- payloads ----------
+
+def _tone_wav(seconds: float = 2.0, rate: int = 16000, freq: float = 220.0) -> bytes:
+    """Mono 16-bit WAV: a tone padded with silence, so VAD trimming has work to do."""
+    n = int(seconds * rate)
+    pad = rate // 2
+    frames = bytearray()
+    for i in range(n + 2 * pad):
+        v = 0.0 if i < pad or i >= n + pad else 0.3 * math.sin(2 * math.pi * freq * i / rate)
+        frames += struct.pack("<h", int(v * 32767))
+    header = b"RIFF" + struct.pack("<I", 36 + len(frames)) + b"WAVE"
+    header += b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, rate, rate * 2, 2, 16)
+    header += b"data" + struct.pack("<I", len(frames))
+    return header + bytes(frames)
+
+
+def _fixture_pdf(pages: int) -> bytes:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "loadtest.pdf")
+        write_fixture(path, pages)
+        with open(path, "rb") as f:
+            return f.read()
+
+
+# ---------- recording ----------
+
+class Recorder:
+    def __init__(self):
+        self.latencies: List[float] = []  # seconds, successful requests only
+        self.statuses: Counter = Counter()
+        self.errors = 0
+        self.recording = False
+
+    def add(self, seconds: float, status: str, ok: bool) -> None:
+        if not self.recording:
+            return
+        self.statuses[status] += 1
+        if ok:
+            self.latencies.append(seconds)
+        else:
+            self.errors += 1
+
+    def summary(self, window_s: float) -> Dict[str, Any]:
+        lat = sorted(self.latencies)
+        n = len(lat) + self.errors
+
+        def pct(p: float) -> Optional[float]:
+            if not lat:
+                return None
+            return round(lat[min(len(lat) - 1, math.ceil(p * len(lat)) - 1)] * 1000, 1)
+
+        return {
+            "requests": n,
+            "ok": len(lat),
+            "errors": self.errors,
+            "status_counts": dict(self.statuses),
+            "rps": round(n / window_s, 2) if window_s > 0 else None,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": round(lat[-1] * 1000, 1) if lat else None,
+            "mean_ms": round(sum(lat) / len(lat) * 1000, 1) if lat else None,
+        }
+
+
+# ---------- scenarios ----------
+
+Scenario = Callable[[httpx.AsyncClient, random.Random], Awaitable[httpx.Response]]
+
+
+class Scenarios:
+    def __init__(self, args, recorders: Dict[str, Recorder]):
+        self.args = args
+        self.recorders = recorders
+        self.wav = _tone_wav()
+        self.wav_b64 = base64.b64encode(self.wav).decode()
+        self.pdf = _fixture_pdf(args.pdf_pages)
+        self._ingest_seq = 0
+
+    def all(self) -> Dict[str, Scenario]:
+        return {
+            "health": self.health,
+            "qa_ask": self.qa_ask,
+            "qa_find_part": self.qa_find_part,
+            "qa_audio": self.qa_audio,
+            "qa_audio_raw": self.qa_audio_raw,
+            "actions_resolve": self.actions_resolve,
+            "quiz_generate": self.quiz_generate,
+            "docs_ingest": self.docs_ingest,
+        }
+
+    async def health(self, c, rng):
+        return await c.get("/health")
+
+    async def qa_ask(self, c, rng):
+        return await c.post("/qa/ask-about-part", json={
+            "model_id": MODEL_ID,
+            "part_name": rng.choice(PARTS),
+            "user_question": rng.choice(QUESTIONS),
+        })
+
+    async def qa_find_part(self, c, rng):
+        return await c.post("/qa/find-part-by-function", json={"user_question": rng.choice(FUNCTION_QUESTIONS)})
+
+    async def qa_audio(self, c, rng):
+        return await c.post("/qa/ask-about-part-audio", json={
+            "model_id": MODEL_ID,
+            "part_name": rng.choice(PARTS),
+            "audio_data": self.wav_b64,
+        })
+
+    async def qa_audio_raw(self, c, rng):
+        params = {"model_id": MODEL_ID}
+        part = rng.choice(PARTS)
+        if part:
+            params["part_name"] = part
+        return await c.post("/qa/ask-about-part-audio-raw", params=params, content=self.wav,
+                            headers={"content-type": "audio/wav"})
+
+    async def actions_resolve(self, c, rng):
+        return await c.post("/actions/resolve", json={"modelId": MODEL_ID, "actionId": ACTION_ID})
+
+    async def quiz_generate(self, c, rng):
+        return await c.post("/quiz/generate", json={
+            "model_id": MODEL_ID,
+            "num_questions": rng.randint(3, 5),
+            "difficulty": rng.choice(["beginner", "intermediate", "advanced"]),
+        })
+
+    async def docs_ingest(self, c, rng):
+        self._ingest_seq += 1
+        t0 = time.perf_counter()
+        r = await c.post(
+            "/docs/ingest-pdf",
+            params={"model_id": MODEL_ID, "subject": "Aerospace",
+                    "doc_key": f"loadtest:ingest:{self._ingest_seq}"},
+            files={"file": ("loadtest.pdf", self.pdf, "application/pdf")},
+        )
+        if r.status_code == 202 and self.args.ingest_wait:
+            asyncio.create_task(self._wait_job(c, r.json()["job_id"], t0))
+        return r
+
+    async def _wait_job(self, c, job_id: str, t0: float) -> None:
+        rec = self.recorders["docs_ingest_job"]
+        deadline = t0 + self.args.ingest_timeout
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(0.25)
+            try:
+                job = (await c.get(f"/docs/jobs/{job_id}")).json()
+            except httpx.HTTPError:
+                continue
+            if job.get("status") in ("done", "failed", "cancelled"):
+                rec.add(time.perf_counter() - t0, job["status"], job["status"] == "done")
+                return
+        rec.add(time.perf_counter() - t0, "timeout", False)
+
+
+# ---------- phases ----------
+
+async def run_phase(
+    client: httpx.AsyncClient,
+    scenarios: Dict[str, Scenario],
+    weights: Dict[str, float],
+    recorders: Dict[str, Recorder],
+    args,
+) -> float:
+    """Drive the given scenarios; returns the measured window in seconds."""
+    names = list(weights)
+    w = [weights[n] for n in names]
+    loop = asyncio.get_running_loop()
+    stop_at = loop.time() + args.warmup + args.duration
+
+    async def worker(seed: int) -> None:
+        rng = random.Random(seed)
+        while loop.time() < stop_at:
+            name = rng.choices(names, w)[0]
+            t0 = time.perf_counter()
+            try:
+                r = await scenarios[name](client, rng)
+                status, ok = str(r.status_code), r.status_code < 400
+            except httpx.HTTPError as e:
+                status, ok = type(e).__name__, False
+            recorders[name].add(time.perf_counter() - t0, status, ok)
+
+    workers = [asyncio.create_task(worker(args.seed * 1000 + i)) for i in range(args.concurrency)]
+    await asyncio.sleep(args.warmup)
+    for name in names:
+        recorders[name].recording = True
+    if "docs_ingest" in names:
+        recorders["docs_ingest_job"].recording = True
+    t0 = time.perf_counter()
+    await asyncio.gather(*workers)
+    return time.perf_counter() - t0
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=HERE, text=True).strip()
+    except Exception:
+        return None
+
+
+async def _fake_stats(url: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not url:
+        return None
+    try:
+        async with httpx.AsyncClient() as c:
+            return (await c.get(url.rstrip("/") + "/_stats")).json()
+    except httpx.HTTPError:
+        return None
+
+
+def print_table(endpoints: Dict[str, Dict[str, Any]], previous: Optional[Dict[str, Any]] = None) -> None:
+    cols = ("requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms")
+    print(f"\n{'endpoint':<18}" + "".join(f"{c:>10}" for c in cols) + ("   p95 vs prev" if previous else ""))
+    for name, s in endpoints.items():
+        line = f"{name:<18}" + "".join(f"{'-' if s[c] is None else s[c]:>10}" for c in cols)
+        if previous:
+            old = previous.get("endpoints", {}).get(name, {}).get("p95_ms")
+            if old and s["p95_ms"] is not None:
+                line += f"   {100.0 * (s['p95_ms'] - old) / old:+.1f}%"
+        print(line)
+
+
+async def main_async(args) -> int:
+    recorders = {name: Recorder() for name in (
+        "health", "qa_ask", "qa_find_part", "qa_audio", "qa_audio_raw",
+        "actions_resolve", "quiz_generate", "docs_ingest", "docs_ingest_job",
+    )}
+    scen = Scenarios(args, recorders)
+    scenarios = scen.all()
+    selected = args.endpoints or list(scenarios)
+
+    started = time.time()
+    windows: Dict[str, float] = {}
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        if args.mixed:
+            window = await run_phase(client, scenarios, {n: 1.0 for n in selected}, recorders, args)
+            windows = {n: window for n in recorders}
+        else:
+            for name in selected:
+                print(f"[loadtest] {name}: {args.concurrency} workers for {args.duration}s", flush=True)
+                windows[name] = await run_phase(client, scenarios, {name: 1.0}, recorders, args)
+                if name == "docs_ingest":
+                    windows["docs_ingest_job"] = windows[name]
+        # let in-flight ingest polls finish
+        pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        if pending:
+            await asyncio.wait(pending, timeout=args.ingest_timeout)
+
+    endpoints = {
+        name: rec.summary(windows.get(name, 0.0))
+        for name, rec in recorders.items()
+        if rec.recording
+    }
+    summary = {
+        "meta": {
+            "commit": _git_commit(),
+            "started_at": started,
+            "base_url": args.base_url,
+            "mode": "mixed" if args.mixed else "isolated",
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "seed": args.seed,
+            "fake_openai": await _fake_stats(args.fake_openai_url),
+        },
+        "endpoints": endpoints,
+    }
+    with open(args.out, "w") as f:
+        json.dump(summary, f, indent=2, sort_keys=True)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    print_table(endpoints, previous)
+    print(f"\nsummary written to {args.out}")
+    return 1 if any(s["ok"] == 0 for s in endpoints.values()) else 0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Load-test the AR-Learn API.")
+    ap.add_argument("--base-url", default="http://127.0.0.1:8000")
+    ap.add_argument("--endpoints", nargs="+", help="subset to run (default: all)")
+    ap.add_argument("--mixed", action="store_true", help="drive all endpoints at once instead of one by one")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--duration", type=float, default=30.0, help="measured seconds per phase")
+    ap.add_argument("--warmup", type=float, default=5.0)
+    ap.add_argument("--timeout", type=float, default=60.0, help="per-request timeout")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--pdf-pages", type=int, default=20, help="pages in the uploaded ingest fixture")
+    ap.add_argument("--no-ingest-wait", dest="ingest_wait", action="store_false",
+                    help="do not poll ingest jobs to completion")
+    ap.add_argument("--ingest-timeout", type=float, default=120.0)
+    ap.add_argument("--fake-openai-url", default="http://127.0.0.1:8099",
+                    help="fake server to record call counts from ('' to skip)")
+    ap.add_argument("--out", default="loadtest-summary.json")
+    ap.add_argument("--compare", help="earlier summary to compare p95 against")
+    args = ap.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# scripts/loadtest/seed.py
+"""
+Seed the load-test Postgres and Neo4j with deterministic data.
+
+- Postgres: applies scripts/pg_schema.sql, then inserts --chunks synthetic
+  doc_chunk rows. Embeddings come from fake_openai.fake_embedding, so
+  questions answered through the fake server retrieve related chunks.
+- Neo4j: runs scripts/seed_neo4j.py (jet-engine-v1 parts, functions,
+  processes) and adds one demo Action for /actions/resolve.
+
+Usage (with the env from scripts/loadtest/loadtest.env):
+  python scripts/loadtest/seed.py
+  python scripts/loadtest/seed.py --chunks 20000 --wipe
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(HERE, "..", "..")))
+sys.path.insert(0, os.path.abspath(os.path.join(HERE, "..")))
+sys.path.insert(0, HERE)
+
+import seed_neo4j  # noqa: E402
+from fake_openai import fake_embedding  # noqa: E402
+from app.clients.postgres_client import get_conn  # noqa: E402
+from app.config.settings import settings  # noqa: E402
+
+ACTION_ID = "lt-inspect-turbine"
+MODEL_ID = seed_neo4j.JET_ENGINE_MODEL["id"]
+DOC_KEY_PREFIX = "loadtest:"
+
+_FILLER = (
+    "Inspect the component during scheduled maintenance. "
+    "Operating temperature and pressure limits are listed in the manual. "
+    "Wear patterns indicate the load history of the engine. "
+    "Technicians record findings in the maintenance log. "
+    "Replacement intervals depend on flight cycles."
+).split(". ")
+
+
+# ---------- postgres ----------
+
+def _text_hash(text: str) -> str:
+    # same scheme as document_ingest_pg._text_hash
+    return hashlib.sha256(f"{settings.EMBEDDING_MODEL}\0{text}".encode()).hexdigest()
+
+
+def seed_postgres(n_chunks: int, wipe: bool) -> None:
+    with open(os.path.join(HERE, "..", "pg_schema.sql")) as f:
+        schema = f.read()
+
+    rng = random.Random(42)
+    parts = seed_neo4j.PARTS
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute(schema)
+        if wipe:
+            cur.execute("DELETE FROM document WHERE doc_key LIKE %s", (DOC_KEY_PREFIX + "%",))
+
+        # one document per part, chunks spread round-robin; every 4th chunk
+        # belongs to an unrelated model so filters actually filter
+        doc_ids = {}
+        for p in parts:
+            key = f"{DOC_KEY_PREFIX}{p['unityId']}"
+            cur.execute(
+                """
+                INSERT INTO document (doc_key, fingerprint, title, source, subject, tags)
+                VALUES (%s, %s, %s, 'loadtest', 'Aerospace', %s)
+                ON CONFLICT (doc_key) DO UPDATE SET title = EXCLUDED.title
+                RETURNING id::text
+                """,
+                (key, key, f"{p['name']} manual", ["loadtest"]),
+            )
+            doc_ids[p["unityId"]] = cur.fetchone()[0]
+            cur.execute("DELETE FROM doc_chunk WHERE document_id = %s", (doc_ids[p["unityId"]],))
+
+        rows = []
+        for i in range(n_chunks):
+            p = parts[i % len(parts)]
+            model_id = MODEL_ID if i % 4 else "other-model"
+            filler = ". ".join(rng.sample(_FILLER, 3))
+            text = f"{p['name']}: {p['description']} {filler}. Section {i}."
+            meta = {
+                "page": i // 5 + 1,
+                "chunk_index": i % 5,
+                "model_id": model_id,
+                "model_name": "Jet Engine",
+                "part_name": p["name"],
+                "subject": "Aerospace",
+            }
+            rows.append((doc_ids[p["unityId"]], meta["page"], meta["chunk_index"], text,
+                         json.dumps(meta), _text_hash(text), fake_embedding(text)))
+            if len(rows) == 500:
+                _insert_chunks(cur, rows)
+                rows = []
+        if rows:
+            _insert_chunks(cur, rows)
+    print(f"[seed] postgres: {n_chunks} chunks across {len(parts)} documents")
+
+
+def _insert_chunks(cur, rows) -> None:
+    cur.executemany(
+        """
+        INSERT INTO doc_chunk (document_id, page, chunk_index, text, meta, text_hash, embedding)
+        VALUES (%s, %s, %s, %s, %s, %s, %s::vector)
+        """,
+        rows,
+    )
+
+
+# ---------- neo4j ----------
+
+ACTION_STEPS = [
+    {"order": 1, "effect": "highlight", "target": "Engine Mount"},
+    {"order": 2, "effect": "highlight", "target": "Combustion Canister"},
+    {"order": 3, "effect": "explode", "target": "Turbine Blades"},
+]
+
+
+def seed_graph(wipe: bool) -> None:
+    driver = seed_neo4j.get_driver()
+    db = seed_neo4j.get_database()
+    with driver.session(database=db) if db else driver.session() as session:
+        seed_neo4j.ensure_constraints(session)
+        if wipe:
+            seed_neo4j.wipe_all(session)
+        mid = seed_neo4j.seed_model(session, seed_neo4j.JET_ENGINE_MODEL)
+        seed_neo4j.seed_parts_for_model(session, mid, seed_neo4j.PARTS)
+        seed_neo4j.seed_processes(session, seed_neo4j.PROCESSES)
+        seed_neo4j.seed_part_of_for_model(session, mid, seed_neo4j.PART_OF_MAP)
+        seed_neo4j.seed_functions(session, seed_neo4j.FUNCTIONS)
+        seed_neo4j.seed_performs_for_model(session, mid, seed_neo4j.PERFORMS_MAP)
+
+        session.execute_write(lambda tx: tx.run(
+            """
+            MATCH (m:Model {id:$modelId})
+            MERGE (a:Action {id:$aid})
+            SET a.name = 'Load-test inspection'
+            MERGE (m)-[:HAS_ACTION]->(a)
+            WITH a
+            OPTIONAL MATCH (a)-[:HAS_STEP]->(old:Step)
+            DETACH DELETE old
+            WITH DISTINCT a
+            UNWIND $steps AS st
+            CREATE (a)-[:HAS_STEP]->(s:Step {order: st.order, effect: st.effect})
+            WITH s, st
+            CALL {
+              WITH st
+              MATCH (:Model {id:$modelId})-[:HAS_PART]->(p:Part {name: st.target})
+              RETURN p LIMIT 1
+            }
+            MERGE (s)-[:TARGETS]->(p)
+            """,
+            modelId=mid, aid=ACTION_ID, steps=ACTION_STEPS,
+        ))
+    driver.close()
+    print(f"[seed] neo4j: model {mid}, action {ACTION_ID}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Seed load-test databases.")
+    ap.add_argument("--chunks", type=int, default=5000)
+    ap.add_argument("--wipe", action="store_true", help="remove earlier load-test data first")
+    ap.add_argument("--skip-graph", action="store_true")
+    ap.add_argument("--skip-postgres", action="store_true")
+    args = ap.parse_args()
+    if not args.skip_postgres:
+        seed_postgres(args.chunks, args.wipe)
+    if not args.skip_graph:
+        seed_graph(args.wipe)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,10 @@ create table if not exists document (
   source text,
   subject text,
   tags text[],
-  created_at timestamptz default now()
+  doc_key text,       -- logical identity; re-ingests with the same key replace the document
+  fingerprint text,   -- sha256 of the source file
+  created_at timestamptz default now(),
+  updated_at timestamptz default now()
 );
 
 create table if not exists doc_chunk (
@@ -16,9 +19,25 @@ create table if not exists doc_chunk (
   chunk_index int,
   text text not null,
   meta jsonb,
+  text_hash text,         -- sha256 of embedding model + text, for embedding reuse
   embedding vector(1536)  -- 3-small
 );
 
+-- upgrade databases created before doc_key/fingerprint/text_hash existed
+alter table document add column if not exists doc_key text;
+alter table document add column if not exists fingerprint text;
+alter table document add column if not exists updated_at timestamptz default now();
+alter table doc_chunk add column if not exists text_hash text;
+
+create unique index if not exists idx_document_doc_key
+on document (doc_key);
+
+create index if not exists idx_doc_chunk_document
+on doc_chunk (document_id);
+
+create index if not exists idx_doc_chunk_text_hash
+on doc_chunk (text_hash);
+
 create index if not exists idx_doc_chunk_hnsw
 on doc_chunk
 using hnsw (embedding vector_cosine_ops);
@@ -31,3 +50,50 @@ on doc_chunk ((meta->>'scene'));
 
 create index if not exists idx_doc_chunk_meta_model
 on doc_chunk ((meta->>'model_id'));
+
+-- Background PDF ingest jobs (/docs/ingest-pdf). Workers claim rows with
+-- FOR UPDATE SKIP LOCKED; a stale heartbeat (updated_at) lets another
+-- worker pick a job back up after a crash/restart.
+create table if not exists ingest_job (
+  id uuid primary key default gen_random_uuid(),
+  status text not null default 'queued',  -- queued | running | done | failed | cancelled
+  file_path text not null,                -- spooled upload
+  spool_host text,                        -- host whose INGEST_SPOOL_DIR has it; null = shared storage
+  filename text,
+  params jsonb not null default '{}',
+  progress jsonb not null default '{}',
+  result jsonb,
+  error text,
+  attempts int not null default 0,
+  claim_token uuid,                       -- set by each claim; only its holder may write
+  cancel_requested boolean not null default false,
+  created_at timestamptz default now(),
+  updated_at timestamptz default now()
+);
+
+create index if not exists idx_ingest_job_status
+on ingest_job (status, created_at);
+
+-- One row per upstream (OpenAI) call, written in batches by app/infra/usage.py.
+-- Read by GET /usage and for budget enforcement (USAGE_BUDGETS_USD).
+create table if not exists usage_event (
+  id bigserial primary key,
+  ts timestamptz not null default now(),
+  request_id text,              -- x-request-id / trace id; ingest job id for background ingest
+  endpoint text not null,       -- route template, or 'ingest' / 'background'
+  tenant text not null,         -- USAGE_TENANT_HEADER, 'default' when absent
+  model_id text,                -- AR model the request was about
+  kind text not null,           -- chat | embeddings | transcription | speech
+  upstream_model text not null,
+  input_tokens int not null default 0,
+  output_tokens int not null default 0,
+  audio_seconds real not null default 0,
+  characters int not null default 0,  -- TTS input
+  cost_usd double precision not null default 0  -- estimate from USAGE_PRICES_USD
+);
+
+create index if not exists idx_usage_event_ts
+on usage_event (ts);
+
+create index if not exists idx_usage_event_request
+on usage_event (request_id);
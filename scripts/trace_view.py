@@ -0,0 +1,117 @@
+# scripts/trace_view.py
+"""
+Print traces from the JSONL file written by app/infra/tracing.py as trees.
+
+Usage:
+  python scripts/trace_view.py                        # 5 slowest traces in ./traces.jsonl
+  python scripts/trace_view.py --slowest 20 --root "POST /qa"
+  python scripts/trace_view.py --trace 4bf92f3577b34da6a3ce929d0e0e4736
+  python scripts/trace_view.py --summary              # p50/p95/max per span name
+
+Each line shows the span's start offset from the trace root, its duration,
+name, status and a few attributes (statements and params are shortened).
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+from typing import Dict, List
+
+_SHOWN_ATTRS = (
+    "http.status_code", "db.operation", "db.rows", "db.response_bytes", "db.batch_size",
+    "model", "attempts", "usage_tokens", "hedged", "qa.dropped_stages", "error",
+)
+
+
+def load(path: str) -> Dict[str, List[dict]]:
+    traces: Dict[str, List[dict]] = defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                sp = json.loads(line)
+            except ValueError:
+                continue  # partially flushed last line
+            traces[sp["trace_id"]].append(sp)
+    return traces
+
+
+def _root(spans: List[dict]) -> dict:
+    ids = {s["span_id"] for s in spans}
+    roots = [s for s in spans if s["parent_id"] not in ids]
+    return min(roots, key=lambda s: s["start_ns"])
+
+
+def print_trace(spans: List[dict], show_statements: bool) -> None:
+    children: Dict[str, List[dict]] = defaultdict(list)
+    for s in spans:
+        children[s["parent_id"]].append(s)
+    root = _root(spans)
+    t0 = root["start_ns"]
+
+    def walk(sp: dict, depth: int) -> None:
+        attrs = sp["attributes"]
+        extra = " ".join(f"{k}={attrs[k]}" for k in _SHOWN_ATTRS if k in attrs)
+        status = "" if sp["status"] == "ok" else f" [{sp['status']}]"
+        print(f"{(sp['start_ns'] - t0) / 1e6:9.1f} {sp['duration_ms']:9.1f} ms  "
+              f"{'  ' * depth}{sp['name']}{status}  {extra}".rstrip())
+        if show_statements and "db.statement" in attrs:
+            print(f"{'':23}{'  ' * depth}  {attrs['db.statement'][:160]}")
+        for c in sorted(children[sp["span_id"]], key=lambda s: s["start_ns"]):
+            walk(c, depth + 1)
+
+    print(f"trace {root['trace_id']}  {root['duration_ms']:.1f} ms  ({len(spans)} spans)")
+    print(f"{'start':>9} {'duration':>12}")
+    walk(root, 0)
+    print()
+
+
+def summary(traces: Dict[str, List[dict]]) -> None:
+    by_name: Dict[str, List[float]] = defaultdict(list)
+    for spans in traces.values():
+        for s in spans:
+            by_name[s["name"]].append(s["duration_ms"])
+    print(f"{'span':<40} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for name, ds in sorted(by_name.items(), key=lambda kv: -sum(kv[1])):
+        ds.sort()
+        p50 = ds[int(0.50 * (len(ds) - 1))]
+        p95 = ds[int(0.95 * (len(ds) - 1))]
+        print(f"{name[:40]:<40} {len(ds):>7} {p50:>9.1f} {p95:>9.1f} {ds[-1]:>9.1f}")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("file", nargs="?", default="traces.jsonl")
+    ap.add_argument("--slowest", type=int, default=5, help="print the N slowest traces")
+    ap.add_argument("--root", help="only traces whose root span name contains this")
+    ap.add_argument("--trace", help="print one trace by id")
+    ap.add_argument("--summary", action="store_true", help="latency percentiles per span name")
+    ap.add_argument("--statements", action="store_true", help="also print SQL/Cypher text")
+    args = ap.parse_args()
+
+    traces = load(args.file)
+    if not traces:
+        print(f"no spans in {args.file}", file=sys.stderr)
+        return 1
+
+    if args.summary:
+        summary(traces)
+        return 0
+    if args.trace:
+        if args.trace not in traces:
+            print(f"trace {args.trace} not found", file=sys.stderr)
+            return 1
+        print_trace(traces[args.trace], args.statements)
+        return 0
+
+    picked = [(t, _root(spans)) for t, spans in traces.items()]
+    if args.root:
+        picked = [(t, r) for t, r in picked if args.root in r["name"]]
+    picked.sort(key=lambda tr: -tr[1]["duration_ms"])
+    for t, _ in picked[: args.slowest]:
+        print_trace(traces[t], args.statements)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+# scripts/vector_tier_export.py
+"""
+Re-export models of the in-process vector tier (app/infra/vector_tier.py)
+from Postgres, e.g. after a bulk ingest on another host, and time local
+search against the export.
+
+Usage:
+  python scripts/vector_tier_export.py                  # every VECTOR_TIER_MODELS model
+  python scripts/vector_tier_export.py jet-engine-v1 --queries 200
+
+Run it on each app host: the export lives in VECTOR_TIER_DIR on that host,
+and running workers pick the new generation up on their next search.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.config.settings import settings  # noqa: E402
+from app.infra.vector_tier import vector_tier  # noqa: E402
+
+
+def time_search(model: str, queries: int, k: int) -> str:
+    snap = vector_tier._snapshot(model)
+    if snap is None or not len(snap):
+        return "nothing to search"
+    rng = np.random.default_rng(7)
+    lat = []
+    for _ in range(queries):
+        q = rng.standard_normal(snap.vectors.shape[1]).astype(np.float32)
+        t0 = time.perf_counter()
+        snap.search(q, k, {"model_id": model}, with_embeddings=True)
+        lat.append((time.perf_counter() - t0) * 1000)
+    return f"search k={k}: p50 {np.percentile(lat, 50):.2f} ms, p99 {np.percentile(lat, 99):.2f} ms"
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("models", nargs="*", help="default: VECTOR_TIER_MODELS")
+    ap.add_argument("--queries", type=int, default=100, help="random queries to time per model (0 = skip)")
+    ap.add_argument("--k", type=int, default=settings.RERANK_CANDIDATES)
+    args = ap.parse_args()
+
+    models = args.models or sorted(vector_tier.models)
+    if not models:
+        ap.error("VECTOR_TIER_MODELS is empty; name the models to export")
+    vector_tier.models.update(models)
+    status = 0
+    for model in models:
+        t0 = time.perf_counter()
+        n = vector_tier.export(model, force=True)
+        if n is None:
+            print(f"{model}: more than VECTOR_TIER_MAX_ROWS={settings.VECTOR_TIER_MAX_ROWS} chunks, not exported")
+            status = 1
+            continue
+        print(f"{model}: {n} chunks in {time.perf_counter() - t0:.2f}s -> {vector_tier._dir(model)}")
+        if args.queries:
+            print(f"  {time_search(model, args.queries, args.k)}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,13 @@
+import os
+import sys
+
+# settings need these to load; the tests never reach the services
+for key, value in {
+    "OPENAI_API_KEY": "sk-test",
+    "NEO4J_URI": "bolt://localhost:7687",
+    "NEO4J_USERNAME": "neo4j",
+    "NEO4J_PASSWORD": "test",
+}.items():
+    os.environ.setdefault(key, value)
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
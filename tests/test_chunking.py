@@ -0,0 +1,81 @@
+import random
+import re
+from typing import List
+
+import pytest
+
+from app.infra.chunking import CharMeasure, iter_chunks
+
+
+def legacy_chunk(text: str,
+                 max_chars: int = 1200,
+                 min_chars: int = 600,
+                 overlap: int = 150) -> List[str]:
+    """document_ingest_pg._chunk as it was before the token-aware chunker (frozen)."""
+    sentences = re.split(r"(?<=[.!?])\s+", text)
+    chunks, cur = [], ""
+    for s in sentences:
+        if len(cur) + len(s) + 1 <= max_chars:
+            cur = (cur + " " + s).strip()
+        else:
+            if len(cur) >= min_chars:
+                chunks.append(cur)
+                cur = s
+            else:
+                cur = (cur + " " + s).strip()
+    if cur:
+        chunks.append(cur)
+
+    if overlap and len(chunks) > 1:
+        out = [chunks[0]]
+        for i in range(1, len(chunks)):
+            out.append((chunks[i-1][-overlap:] + " " + chunks[i]).strip())
+        return out
+    return chunks
+
+
+_WORDS = (
+    "the compressor raises air pressure before the combustor where fuel burns "
+    "and hot gas drives the turbine which turns the shaft and the fan blades"
+).split()
+
+
+def make_text(rng: random.Random, n_sentences: int, max_words: int = 30) -> str:
+    out = []
+    for _ in range(n_sentences):
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(1, max_words))]
+        out.append(" ".join(words).capitalize() + rng.choice(".!?"))
+    return " ".join(out)
+
+
+def _golden_cases() -> List[str]:
+    # inputs are whitespace-normalized, as _clean() leaves page text
+    rng = random.Random(7)
+    return [
+        "",
+        "One sentence only.",
+        ("No terminal punctuation at all " * 200).strip(),  # one huge sentence
+        make_text(rng, 5),
+        make_text(rng, 400),
+        make_text(rng, 400, max_words=200),                 # sentences near max_chars
+        make_text(rng, 400, max_words=3),                   # many tiny sentences
+        "A. " * 1000 + make_text(rng, 50),
+    ] + [make_text(rng, rng.randint(1, 300), rng.randint(2, 120)) for _ in range(40)]
+
+
+@pytest.mark.parametrize("text", _golden_cases())
+def test_char_measure_reproduces_legacy_chunks(text):
+    # CharMeasure with the old defaults (1200/600/150 chars, no page spanning)
+    got = [t for t, _, _ in iter_chunks(
+        [(1, text)], 1200, 600, 150, span_pages=False, measure=CharMeasure())]
+    assert got == legacy_chunk(text)
+
+
+def test_char_measure_restarts_chunks_on_every_page_like_legacy():
+    # page by page, as ingest did before
+    rng = random.Random(8)
+    pages = [(p, make_text(rng, rng.randint(0, 60))) for p in range(1, 30)]
+    want = [(c, p) for p, text in pages for c in legacy_chunk(text)]
+    got = [(t, a) for t, a, b in iter_chunks(
+        pages, 1200, 600, 150, span_pages=False, measure=CharMeasure())]
+    assert got == want
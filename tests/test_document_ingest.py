@@ -0,0 +1,90 @@
+import asyncio
+import uuid
+
+import pytest
+
+from app.managers import document_ingest_pg as ingest
+
+
+class FakeStore:
+    """The document/doc_chunk tables, as far as ingest_pdf_to_pg uses them."""
+
+    def __init__(self):
+        self.docs = {}  # doc_key -> {"id", "fingerprint", "texts"}
+
+    def find_document(self, doc_key):
+        d = self.docs.get(doc_key)
+        return d and {"document_id": d["id"], "fingerprint": d["fingerprint"], "chunks": len(d["texts"])}
+
+    def document_texts(self, document_id):
+        return next(d["texts"] for d in self.docs.values() if d["id"] == document_id)
+
+    def replace_document_version(self, doc_key, fingerprint, title, source, subject, tags, rows, fence=None):
+        d = self.docs.setdefault(doc_key, {"id": str(uuid.uuid4())})
+        old = set(d.get("texts", []))
+        d.update(fingerprint=fingerprint, texts=[r[2] for r in rows])
+        new = set(d["texts"])
+        return {"document_id": d["id"], "kept": len(old & new), "inserted": len(new - old),
+                "deleted": len(old - new)}
+
+
+# fake PDFs: the file content names the manual text it "contains"
+MANUALS = {
+    b"fan-v1": ["The fan draws air into the engine.", "Blades are made of titanium."],
+    b"fan-v2": ["The fan draws air into the engine.", "Blades are made of titanium.",
+                "Inspect the blades every 500 hours."],
+    b"pump": ["The fuel pump feeds the combustor at high pressure.", "Filters are changed yearly."],
+}
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = FakeStore()
+    for name in ("find_document", "document_texts", "replace_document_version"):
+        monkeypatch.setattr(ingest, name, getattr(store, name))
+    monkeypatch.setattr(ingest, "adopt_legacy_document", lambda *a: None)
+    monkeypatch.setattr(ingest, "known_text_hashes", lambda hashes: set())
+    monkeypatch.setattr(ingest, "read_metadata", lambda path: ("", 1))
+
+    def read_pdf(path, page_count, progress=None):
+        with open(path, "rb") as f:
+            texts = MANUALS[f.read()]
+        # several copies so the texts are long enough to compare
+        return [(" ".join([t] * 20), 1, 1) for t in texts], 1
+
+    async def embed_many(texts, progress=None):
+        return [[0.0] for _ in texts], 1
+
+    async def invalidate(*names):
+        return 0
+
+    monkeypatch.setattr(ingest, "_read_pdf", read_pdf)
+    monkeypatch.setattr(ingest, "_embed_many", embed_many)
+    monkeypatch.setattr(ingest.vector_tier, "refresh_document", lambda doc_id: None)
+    monkeypatch.setattr(ingest.cache, "invalidate", invalidate)
+    return store
+
+
+def _ingest(tmp_path, content, filename, **kw):
+    path = tmp_path / f"{uuid.uuid4()}.pdf"  # spooled uploads get random names
+    path.write_bytes(content)
+    return asyncio.run(ingest.ingest_pdf_to_pg(str(path), title=filename, model_id="jet-engine-v1", **kw))
+
+
+def test_revised_manual_replaces_previous_version(store, tmp_path):
+    v1 = _ingest(tmp_path, b"fan-v1", "Fan Manual.pdf")
+    v2 = _ingest(tmp_path, b"fan-v2", "fan manual.PDF")
+
+    assert len(store.docs) == 1
+    assert v2["document_id"] == v1["document_id"]
+    assert v2["stats"]["chunks_deleted"] == 0 and v2["stats"]["chunks_inserted"] == 1
+
+
+def test_same_name_different_document_is_refused(store, tmp_path):
+    _ingest(tmp_path, b"fan-v1", "manual.pdf")
+    with pytest.raises(ingest.DocKeyConflict):
+        _ingest(tmp_path, b"pump", "manual.pdf")
+
+    assert len(store.docs) == 1
+    _ingest(tmp_path, b"pump", "manual.pdf", doc_key="pump-manual")  # an explicit key keeps both
+    assert len(store.docs) == 2
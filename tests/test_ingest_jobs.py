@@ -0,0 +1,24 @@
+import asyncio
+import os
+import time
+
+from app.config.settings import settings
+from app.managers import ingest_job_manager
+
+
+def test_spool_sweep_removes_files_of_finished_and_abandoned_jobs(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "INGEST_SPOOL_DIR", str(tmp_path))
+    manager = ingest_job_manager.IngestJobManager()
+    files = {name: manager.spool_path() for name in ("queued", "running", "cancelled", "failed", "fresh", "abandoned")}
+    for path in files.values():
+        open(path, "wb").close()
+    old = time.time() - settings.INGEST_SPOOL_ORPHAN_S - 1
+    os.utime(files["abandoned"], (old, old))  # upload that never became a job
+
+    async def spool_file_statuses(paths):
+        return {files[s]: s for s in ("queued", "running", "cancelled", "failed")}
+
+    monkeypatch.setattr(ingest_job_manager.jobs, "spool_file_statuses", spool_file_statuses)
+
+    assert asyncio.run(manager.sweep_spool()) == 3
+    assert sorted(n for n, p in files.items() if os.path.exists(p)) == ["fresh", "queued", "running"]
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from app.config.settings import settings
+from app.infra.rerank import rerank
+
+
+def _meta(i):
+    # what ingest_pdf_to_pg stores with each chunk
+    return {"page": i + 1, "page_end": i + 1, "chunk_index": i, "model_id": "jet-engine-v1",
+            "model_name": "Jet Engine", "subject": "manual"}
+
+
+def _hit(i, emb, text, meta=None):
+    return {"id": f"c{i}", "text": text, "meta": meta or _meta(i), "score": 0.0,
+            "embedding": np.array(emb, dtype=np.float32)}
+
+
+def test_part_boost_for_chunks_that_name_the_part():
+    # equally relevant chunks: only the boost can order them
+    q = [1.0, 0.0]
+    hits = [
+        _hit(0, [1.0, 0.0], "Remove the inlet cowl before inspection."),
+        _hit(1, [1.0, 0.0], "Check the FAN\nblades for nicks and dents."),
+    ]
+    top = rerank(hits, q, k=1, part="Fan Blades", lam=1.0)
+    assert top[0]["id"] == "c1"
+    assert top[0]["rerank"] == pytest.approx(top[0]["score"] + settings.RERANK_PART_BOOST, abs=1e-6)
+
+
+def test_part_boost_needs_whole_words():
+    q = [1.0, 0.0]
+    hits = [_hit(0, [1.0, 0.0], "The turbofan blades and the fanblades are balanced at the factory.")]
+    top = rerank(hits, q, k=1, part="Fan Blades", lam=1.0)
+    assert top[0]["rerank"] == top[0]["score"]
+
+
+def test_scene_boost_adds_to_part_boost():
+    q = [1.0, 0.0]
+    hits = [
+        _hit(0, [1.0, 0.0], "Fan blades, shown in the exploded view."),
+        _hit(1, [1.0, 0.0], "Fan blades are made of titanium."),
+    ]
+    top = rerank(hits, q, k=2, part="Fan Blades", scene="exploded view", lam=1.0)
+    assert [h["id"] for h in top] == ["c0", "c1"]
+    assert top[0]["rerank"] - top[1]["rerank"] == pytest.approx(settings.RERANK_SCENE_BOOST, abs=1e-6)
+
+
+def test_part_boost_matches_tagged_part_names():
+    q = [1.0, 0.0]
+    hits = [
+        _hit(0, [1.0, 0.0], "", {**_meta(0), "part_name": "Compressor"}),
+        _hit(1, [1.0, 0.0], "", {**_meta(1), "part_name": ["Compressor", "Fan Blades"]}),
+    ]
+    top = rerank(hits, q, k=2, part="Fan Blades", lam=1.0)
+    assert [h["id"] for h in top] == ["c1", "c0"]
+    assert top[0]["rerank"] - top[1]["rerank"] == pytest.approx(settings.RERANK_PART_BOOST, abs=1e-6)
+
+
+def test_no_boost_without_a_part():
+    q = [1.0, 0.0]
+    hits = [_hit(0, [1.0, 0.0], "Check the fan blades.")]
+    top = rerank(hits, q, k=1, part=None, lam=1.0)
+    assert top[0]["rerank"] == top[0]["score"]
+    assert "embedding" not in top[0]